@@ -66,9 +66,7 @@ class AlpacaBenchmark:
         parseFn = (in: String) =>
           val (_, tokens) = MathLexer.tokenize(in)
           MathParser.parse(tokens)
-        fullParseFn = (in: String) =>
-          val (_, tokens) = MathLexer.tokenize(in)
-          MathParser.parse(tokens)
+        fullParseFn = (in: String) => MathParser.parse(MathLexer, in)
         val (_, preTokenized) = MathLexer.tokenize(input)
         preTokenizedParseFn = () => MathParser.parse(preTokenized)
 
@@ -77,9 +75,7 @@ class AlpacaBenchmark:
         parseFn = (in: String) =>
           val (_, tokens) = JsonLexer.tokenize(in)
           JsonParser.parse(tokens)
-        fullParseFn = (in: String) =>
-          val (_, tokens) = JsonLexer.tokenize(in)
-          JsonParser.parse(tokens)
+        fullParseFn = (in: String) => JsonParser.parse(JsonLexer, in)
         val (_, preTokenized) = JsonLexer.tokenize(input)
         preTokenizedParseFn = () => JsonParser.parse(preTokenized)
 
@@ -88,9 +84,7 @@ class AlpacaBenchmark:
         parseFn = (in: String) =>
           val (_, tokens) = BigGrammarLexer.tokenize(in)
           BigGrammarParser.parse(tokens)
-        fullParseFn = (in: String) =>
-          val (_, tokens) = BigGrammarLexer.tokenize(in)
-          BigGrammarParser.parse(tokens)
+        fullParseFn = (in: String) => BigGrammarParser.parse(BigGrammarLexer, in)
         val (_, preTokenized) = BigGrammarLexer.tokenize(input)
         preTokenizedParseFn = () => BigGrammarParser.parse(preTokenized)
 
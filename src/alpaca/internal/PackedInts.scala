@@ -0,0 +1,71 @@
+package alpaca
+package internal
+
+/**
+ * Compact encoding of `Int` arrays as string literals.
+ *
+ * Large array literals produced by macros quickly exceed the JVM method size limit,
+ * while string constants live in the constant pool and cost a single instruction.
+ * Every value is zigzag-encoded and written as base-32 digits, least significant first:
+ * continuation digits use the characters `'0'..'O'` and the final digit of a value uses `'P'..'o'`.
+ * The result is split into chunks that fit into a single class-file constant.
+ */
+private[alpaca] object PackedInts:
+  private final val ChunkSize = 32768
+  private final val Continuation = '0'
+  private final val Terminal = 'P'
+
+  /**
+   * Encodes the values as a list of printable string chunks.
+   *
+   * @param values the values to encode
+   * @return the encoded chunks
+   */
+  def pack(values: Array[Int]): List[String] =
+    val builder = new StringBuilder
+    values.foreach: value =>
+      var rest = (value << 1) ^ (value >> 31)
+      while (rest & ~31) != 0 do
+        builder.append((Continuation + (rest & 31)).toChar)
+        rest >>>= 5
+      builder.append((Terminal + rest).toChar)
+    builder.result().grouped(ChunkSize).toList
+
+  /**
+   * Decodes chunks produced by [[pack]].
+   *
+   * @param size the number of encoded values
+   * @param chunks the encoded chunks, in order
+   * @return the decoded values
+   */
+  def unpack(size: Int, chunks: String*): Array[Int] =
+    val result = new Array[Int](size)
+    var idx = 0
+    var acc = 0
+    var shift = 0
+    chunks.foreach: chunk =>
+      var i = 0
+      while i < chunk.length do
+        val c = chunk.charAt(i)
+        if c >= Terminal then
+          val zigzag = acc | ((c - Terminal) << shift)
+          result(idx) = (zigzag >>> 1) ^ -(zigzag & 1)
+          idx += 1
+          acc = 0
+          shift = 0
+        else
+          acc |= (c - Continuation) << shift
+          shift += 5
+        i += 1
+    result
+
+  // $COVERAGE-OFF$
+  /**
+   * Creates an expression that rebuilds the array at runtime from its packed form.
+   *
+   * @param values the values to embed
+   * @return an expression evaluating to a copy of `values`
+   */
+  def expr(values: Array[Int])(using Quotes): Expr[Array[Int]] =
+    '{ PackedInts.unpack(${ Expr(values.length) }, ${ Varargs(pack(values).map(Expr(_))) }*) }
+  // $COVERAGE-ON$
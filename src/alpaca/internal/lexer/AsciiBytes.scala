@@ -0,0 +1,38 @@
+package alpaca
+package internal
+package lexer
+
+import java.nio.ByteBuffer
+import java.nio.charset.StandardCharsets
+
+/**
+ * A character sequence over ASCII bytes.
+ *
+ * Every byte is one char, so the bytes are read in place and never decoded or copied
+ * to a `char` array. Only the text of matched tokens is turned into strings.
+ * Bytes outside of ASCII are seen as the Latin-1 chars U+0080 to U+00FF, which no
+ * pattern of an [[AsciiMatching]] lexer can match.
+ *
+ * @param bytes the bytes between their position and limit, which are not modified
+ */
+private[lexer] final class AsciiBytes(bytes: ByteBuffer) extends CharSequence:
+  private val origin = bytes.position
+
+  def length: Int = bytes.limit - origin
+
+  def charAt(index: Int): Char =
+    if index < 0 || index >= length then
+      throw new IndexOutOfBoundsException(s"Position $index is out of bounds for AsciiBytes of size $length")
+    (bytes.get(origin + index) & 0xff).toChar
+
+  def subSequence(start: Int, end: Int): CharSequence =
+    require(0 <= start && start <= end && end <= length, s"Invalid subsequence range: start=$start, end=$end")
+    val chunk = new Array[Byte](end - start)
+    bytes.get(origin + start, chunk)
+    new String(chunk, StandardCharsets.ISO_8859_1)
+
+  override def toString: String = subSequence(0, length).toString
+
+private[lexer] object AsciiBytes:
+  /** The greatest ASCII character. */
+  final val MaxChar = 0x7f
@@ -0,0 +1,17 @@
+package alpaca
+package internal
+package lexer
+
+/**
+ * A marker trait for contexts whose lexer only ever matches ASCII characters.
+ *
+ * When the context of a `lexer` mixes this trait in, the macro checks that no token pattern
+ * can match a character outside of ASCII, U+0000 to U+007F, so negated classes like `[^"]` have to be
+ * narrowed, e.g. to `[ !#-~]`. In exchange, the lexer can tokenize bytes directly with
+ * [[Tokenization.tokenizeBytes]], without decoding them to chars first.
+ *
+ * Patterns outside of the regular subset supported by [[DfaMatching]] cannot be checked
+ * and are reported as compile errors.
+ */
+trait AsciiMatching:
+  this: LexerCtx =>
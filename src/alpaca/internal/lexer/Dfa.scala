@@ -0,0 +1,104 @@
+package alpaca
+package internal
+package lexer
+
+/**
+ * A deterministic automaton recognizing all tokens of a lexer.
+ *
+ * Code units are first mapped to character classes, then the next state is read from
+ * a row-major transition table. Matching is a single forward scan without backtracking.
+ *
+ * @param rangeStarts sorted first code units of the ranges that share a character class; starts with 0
+ * @param rangeClasses the character class of every range
+ * @param classCount the number of character classes, i.e. the width of a transition table row
+ * @param transitions the next state for `state * classCount + class`, or -1 for the dead state
+ * @param accepting the index of the token accepted in every state, or -1
+ */
+private[alpaca] final class Dfa(
+  private[lexer] val rangeStarts: Array[Int],
+  private[lexer] val rangeClasses: Array[Int],
+  private[lexer] val classCount: Int,
+  private[lexer] val transitions: Array[Int],
+  private[lexer] val accepting: Array[Int],
+):
+  private val asciiClasses: Array[Int] = Array.tabulate(128)(Dfa.lookup(rangeStarts, rangeClasses, _))
+
+  /** Number of states of the automaton. */
+  def stateCount: Int = accepting.length
+
+  /**
+   * Finds the token matching at `from`.
+   *
+   * The first token in definition order that matches wins and the longest of its matches is taken.
+   * For the usual greedy token patterns this is the match the regex alternation finds;
+   * unlike the regex engine, empty matches are never reported.
+   *
+   * @param text the input
+   * @param from the offset to match at
+   * @return the match packed with [[Dfa.pack]], or [[Dfa.NoMatch]]
+   */
+  def matchAt(text: CharSequence, from: Int): Long =
+    val length = text.length
+    var state = 0
+    var i = from
+    var token = -1
+    var end = -1
+    while state >= 0 && i < length do
+      val c = text.charAt(i)
+      val cls = if c < 128 then asciiClasses(c) else Dfa.lookup(rangeStarts, rangeClasses, c)
+      state = transitions(state * classCount + cls)
+      i += 1
+      if state >= 0 then
+        val accepted = accepting(state)
+        if accepted >= 0 && (token < 0 || accepted <= token) then
+          token = accepted
+          end = i
+    if token < 0 then Dfa.NoMatch else Dfa.pack(token, end)
+
+  /**
+   * Checks whether scanning from `from` is still alive at the end of the input.
+   *
+   * If it is, the result of [[matchAt]] could change once more input is appended.
+   *
+   * @param text the input
+   * @param from the offset to match at
+   * @return true if no dead state is reached before the end of `text`
+   */
+  def reachesEnd(text: CharSequence, from: Int): Boolean =
+    val length = text.length
+    var state = 0
+    var i = from
+    while state >= 0 && i < length do
+      val c = text.charAt(i)
+      val cls = if c < 128 then asciiClasses(c) else Dfa.lookup(rangeStarts, rangeClasses, c)
+      state = transitions(state * classCount + cls)
+      i += 1
+    state >= 0
+
+private[alpaca] object Dfa:
+  /** Result of [[Dfa.matchAt]] when no token matches. */
+  final val NoMatch = -1L
+
+  inline def pack(token: Int, end: Int): Long = (token.toLong << 32) | (end & 0xffffffffL)
+
+  inline def token(packed: Long): Int = (packed >>> 32).toInt
+
+  inline def end(packed: Long): Int = packed.toInt
+
+  private def lookup(starts: Array[Int], classes: Array[Int], c: Int): Int =
+    java.util.Arrays.binarySearch(starts, c) match
+      case found if found >= 0 => classes(found)
+      case insertion => classes(-insertion - 2)
+
+  // $COVERAGE-OFF$
+  given ToExpr[Dfa]:
+    def apply(dfa: Dfa)(using Quotes): Expr[Dfa] = '{
+      Dfa(
+        ${ PackedInts.expr(dfa.rangeStarts) },
+        ${ PackedInts.expr(dfa.rangeClasses) },
+        ${ Expr(dfa.classCount) },
+        ${ PackedInts.expr(dfa.transitions) },
+        ${ PackedInts.expr(dfa.accepting) },
+      )
+    }
+  // $COVERAGE-ON$
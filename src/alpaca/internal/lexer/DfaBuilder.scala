@@ -0,0 +1,127 @@
+package alpaca
+package internal
+package lexer
+
+import scala.annotation.tailrec
+import scala.collection.immutable.BitSet
+import scala.collection.mutable
+
+/**
+ * Compiles token patterns into a single [[Dfa]].
+ *
+ * Every pattern is parsed into a [[RegexAst]], turned into a Thompson NFA fragment
+ * and all fragments are joined under a common start state. The union is then determinized
+ * with the subset construction over an alphabet of character classes, i.e. maximal ranges
+ * of code units that no pattern distinguishes.
+ */
+private[lexer] object DfaBuilder:
+  private final val MaxStates = 20000
+
+  /**
+   * Builds the automaton recognizing the given patterns.
+   *
+   * The accepting token of a state is the smallest index of a pattern that accepts in it,
+   * so the automaton reproduces the priority of the alternation used by the regex engine.
+   *
+   * @param patterns the token patterns, in priority order
+   * @return the compiled automaton
+   * @throws UnsupportedPatternException if any of the patterns is not regular or the automaton is too large
+   */
+  def apply(patterns: List[String])(using Log): Dfa =
+    logger.trace("building DFA from token patterns")
+    val nfa = Nfa()
+    val start = nfa.newState()
+    patterns.zipWithIndex.foreach: (pattern, token) =>
+      val tokenStart = nfa.newState()
+      nfa.epsilon(start, tokenStart)
+      nfa.accepts(nfa.build(RegexAst.parse(pattern), tokenStart)) = token
+    determinize(nfa, patterns)
+
+  private final class Nfa:
+    val epsilons: mutable.ArrayBuffer[List[Int]] = mutable.ArrayBuffer.empty
+    val edges: mutable.ArrayBuffer[List[(CharRanges, Int)]] = mutable.ArrayBuffer.empty
+    val accepts: mutable.ArrayBuffer[Int] = mutable.ArrayBuffer.empty
+
+    def newState(): Int =
+      epsilons += Nil
+      edges += Nil
+      accepts += -1
+      accepts.length - 1
+
+    def epsilon(from: Int, to: Int): Unit = epsilons(from) = to :: epsilons(from)
+
+    def build(ast: RegexAst, from: Int): Int = ast match
+      case RegexAst.Chars(set) =>
+        newState().tap(to => edges(from) = (set, to) :: edges(from))
+      case RegexAst.Concat(parts) =>
+        parts.foldLeft(from)((state, part) => build(part, state))
+      case RegexAst.Alternation(options) =>
+        newState().tap: end =>
+          options.foreach: option =>
+            val start = newState()
+            epsilon(from, start)
+            epsilon(build(option, start), end)
+      case RegexAst.Repeat(node, min, RegexAst.Unbounded) =>
+        val loop = newState()
+        epsilon((0 until min).foldLeft(from)((state, _) => build(node, state)), loop)
+        epsilon(build(node, loop), loop)
+        loop
+      case RegexAst.Repeat(node, min, max) =>
+        (min until max).foldLeft((0 until min).foldLeft(from)((state, _) => build(node, state))): (state, _) =>
+          newState().tap: end =>
+            epsilon(state, end)
+            epsilon(build(node, state), end)
+
+  private def determinize(nfa: Nfa, patterns: List[String])(using Log): Dfa =
+    val sets = nfa.edges.iterator.flatMap(_.iterator.map(_._1)).distinct.toVector
+    val setIndex = sets.zipWithIndex.toMap
+
+    // elementary intervals in which membership in every set is constant
+    val boundaries = (Iterator(0) ++ sets.iterator.flatMap(_.ranges.iterator.flatMap((lo, hi) => Iterator(lo, hi + 1))))
+      .filter(_ <= CharRanges.MaxChar)
+      .distinct
+      .toVector
+      .sorted
+    val classIds = mutable.LinkedHashMap.empty[Set[Int], Int]
+    val intervals = boundaries.map: start =>
+      (start, classIds.getOrElseUpdate(sets.indices.filter(sets(_).contains(start)).toSet, classIds.size))
+    val ranges = intervals.foldLeft(Vector.empty[(Int, Int)]):
+      case (acc, (_, cls)) if acc.lastOption.exists(_._2 == cls) => acc
+      case (acc, interval) => acc :+ interval
+    val classSignatures = classIds.keys.toVector
+
+    def closure(states: List[Int]): BitSet =
+      val seen = mutable.BitSet.empty
+      @tailrec def loop(pending: List[Int]): Unit = pending match
+        case Nil => ()
+        case state :: rest => if seen.add(state) then loop(nfa.epsilons(state) ::: rest) else loop(rest)
+      loop(states)
+      seen.toImmutable
+
+    val dfaStates = mutable.ArrayBuffer(closure(0 :: Nil))
+    val stateIds = mutable.HashMap(dfaStates.head -> 0)
+    val transitions = mutable.ArrayBuffer.empty[Int]
+
+    def addState(states: BitSet): Int =
+      if dfaStates.length == MaxStates then
+        throw UnsupportedPatternException(patterns.mkString("|"), s"more than $MaxStates automaton states")
+      dfaStates += states
+      dfaStates.length - 1
+
+    var current = 0
+    while current < dfaStates.length do
+      val nfaStates = dfaStates(current)
+      classSignatures.foreach: signature =>
+        val target = closure:
+          nfaStates.toList.flatMap(nfa.edges(_).collect { case (set, to) if signature(setIndex(set)) => to })
+        transitions += (if target.isEmpty then -1 else stateIds.getOrElseUpdate(target, addState(target)))
+      current += 1
+
+    logger.trace(show"DFA built with ${dfaStates.length} states and ${classSignatures.length} character classes")
+    Dfa(
+      rangeStarts = ranges.map(_._1).toArray,
+      rangeClasses = ranges.map(_._2).toArray,
+      classCount = classSignatures.length,
+      transitions = transitions.toArray,
+      accepting = dfaStates.iterator.map(_.iterator.map(nfa.accepts).filter(_ >= 0).minOption.getOrElse(-1)).toArray,
+    )
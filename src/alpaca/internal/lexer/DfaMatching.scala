@@ -0,0 +1,17 @@
+package alpaca
+package internal
+package lexer
+
+/**
+ * A marker trait for contexts whose lexer matches tokens with a deterministic automaton.
+ *
+ * When the context of a `lexer` mixes this trait in, the macro compiles all token patterns
+ * into a single [[Dfa]] at compile time instead of relying on a `java.util.regex` alternation.
+ * Tokenization then becomes a table-driven scan without backtracking or group bookkeeping.
+ *
+ * Only regular patterns are supported: lazy and possessive quantifiers, anchors, lookaround,
+ * backreferences, inline flags and character class set operations are reported as compile errors.
+ * Patterns operate on UTF-16 code units, so `.` matches a single surrogate rather than a whole code point.
+ */
+trait DfaMatching:
+  this: LexerCtx =>
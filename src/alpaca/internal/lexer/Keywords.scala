@@ -0,0 +1,92 @@
+package alpaca
+package internal
+package lexer
+
+/**
+ * A perfect hash table of keyword tokens, looked up by the text another token matched.
+ *
+ * The table is built at compile time with hash and displace: every keyword is first hashed
+ * into a bucket, and every bucket gets a seed for which its keywords hash to free slots.
+ * Since no two keywords share a slot, a lookup hashes the text twice and compares it with
+ * at most one keyword, however many keywords there are.
+ *
+ * @tparam Ctx the global context type
+ * @param table the table built by [[Keywords.table]], empty if there are no keywords
+ * @param keywords the keyword tokens, in the order their texts were given to [[Keywords.table]]
+ */
+private[lexer] final class Keywords[Ctx <: LexerCtx](table: Array[Int], keywords: Array[Token[?, Ctx, ?]]):
+  private val buckets = if table.isEmpty then 0 else table(0)
+  private val slots = table.length - 1 - buckets
+
+  /**
+   * Finds the keyword with the given text.
+   *
+   * @param text the text of a match
+   * @return the index of the keyword in `keywords`, or -1 if the text is not a keyword
+   */
+  def apply(text: String): Int =
+    if slots <= 0 then -1
+    else
+      val seed = table(1 + (Keywords.hash(0, text) & (buckets - 1)))
+      table(1 + buckets + (Keywords.hash(seed, text) & (slots - 1))) match
+        case -1 => -1
+        case index => if keywords(index).info.literal == text then index else -1
+
+private[lexer] object Keywords:
+  private final val MaxSeed = 1 << 16
+  private final val MaxSlots = 1 << 20
+
+  /**
+   * Hashes a text with FNV-1a, finalized with the mixer of MurmurHash3.
+   *
+   * @param seed the seed of the hash
+   * @param text the text to hash
+   * @return the hash
+   */
+  def hash(seed: Int, text: String): Int =
+    var h = seed ^ 0x811c9dc5
+    for i <- 0 until text.length do h = (h ^ text.charAt(i)) * 0x01000193
+    h ^= h >>> 16
+    h *= 0x85ebca6b
+    h ^= h >>> 13
+    h *= 0xc2b2ae35
+    h ^ (h >>> 16)
+
+  /**
+   * Builds a perfect hash table of distinct texts.
+   *
+   * The table holds the number of buckets, the seed of every bucket and the index of
+   * the text in every slot, or -1 for a free slot. There are at least twice as many
+   * slots as texts; both counts are powers of two.
+   *
+   * @param texts the distinct texts of the keywords
+   * @return the table, or an empty array if there are no texts
+   */
+  def table(texts: List[String]): Array[Int] =
+    if texts.isEmpty then Array.emptyIntArray
+    else
+      val buckets = powerOfTwo(texts.size)
+      LazyList
+        .iterate(powerOfTwo(texts.size * 2))(_ * 2)
+        .takeWhile(_ <= MaxSlots)
+        .flatMap(slots => place(texts, buckets, slots))
+        .headOption
+        .getOrElse(throw AlgorithmError(s"no perfect hash found for keywords ${texts.mkString(", ")}"))
+
+  private def powerOfTwo(atLeast: Int): Int = Integer.highestOneBit(math.max(1, atLeast * 2 - 1))
+
+  private def place(texts: List[String], buckets: Int, slots: Int): Option[Array[Int]] =
+    val table = Array.fill(1 + buckets + slots)(-1)
+    table(0) = buckets
+    val byBucket = texts.zipWithIndex.groupBy((text, _) => hash(0, text) & (buckets - 1))
+    // the largest buckets are the hardest to place, so they go first, while most slots are free
+    val placed = byBucket.toList.sortBy((_, members) => -members.size).forall: (bucket, members) =>
+      (1 until MaxSeed)
+        .find: seed =>
+          val targets = members.map((text, _) => 1 + buckets + (hash(seed, text) & (slots - 1)))
+          targets.distinct.size == targets.size && targets.forall(table(_) == -1)
+        .map: seed =>
+          table(1 + bucket) = seed
+          for (text, index) <- members do table(1 + buckets + (hash(seed, text) & (slots - 1))) = index
+        .isDefined
+    Option.when(placed)(table)
@@ -5,8 +5,6 @@ package lexer
 import java.io.{Closeable, Reader}
 import java.nio.charset.{Charset, StandardCharsets}
 import java.nio.file.{Files, Path}
-import scala.annotation.tailrec
-import scala.collection.mutable
 
 /**
  * A lazy character sequence that reads from a Reader on demand.
@@ -16,13 +14,23 @@ import scala.collection.mutable
  * can efficiently skip over processed characters.
  *
  * @param reader the underlying Reader to read from
- * @param size   the total size of the input (if known)
+ * @param size   computes the total size of the input, evaluated the first time [[length]] is needed
  */
 //todo: use Ox
-final class LazyReader(private val reader: Reader, private var size: Long) extends CharSequence, Closeable:
-  private val buffer = mutable.ArrayDeque.empty[Char]
-  private val chunk = new Array[Char](8192)
-  private var offset: Int = 0 // logical offset into buffer
+final class LazyReader private[lexer] (private val reader: Reader, size: () => Long) extends CharSequence, Closeable:
+  private var buffer = new Array[Char](LazyReader.InitialCapacity)
+  private var start: Int = 0 // buffer index of the logical position 0
+  private var filled: Int = 0 // buffer index past the last character read
+  private var consumed: Long = 0 // characters skipped by from
+  private lazy val total: Long = size()
+
+  /**
+   * Creates a LazyReader of an input of known size.
+   *
+   * @param reader the underlying Reader to read from
+   * @param size   the total size of the input
+   */
+  def this(reader: Reader, size: Long) = this(reader, () => size)
 
   /**
    * Gets the character at the specified position.
@@ -34,15 +42,22 @@ final class LazyReader(private val reader: Reader, private var size: Long) exten
    * @throws IndexOutOfBoundsException if the position is beyond the end of input
    */
   def charAt(pos: Int): Char =
-    ensure(pos + offset)
-    buffer(pos + offset)
+    ensure(pos)
+    buffer(start + pos)
 
   /**
    * Gets the length of the input.
    *
    * @return the length, capped at Int.MaxValue
    */
-  def length: Int = math.min(Int.MaxValue, size).toInt
+  def length: Int = math.min(Int.MaxValue, total - consumed).toInt
+
+  /**
+   * Checks whether the input is exhausted by reading ahead, without computing [[length]].
+   *
+   * @return true if no character is left
+   */
+  override def isEmpty: Boolean = !readable(0)
 
   /**
    * Creates a subsequence.
@@ -52,59 +67,75 @@ final class LazyReader(private val reader: Reader, private var size: Long) exten
    * @return a string containing the subsequence
    */
   def subSequence(start: Int, end: Int): CharSequence =
-    ensure(end - 1 + offset)
     val len = end - start
     require(len >= 0, s"Invalid subsequence range: start=$start, end=$end")
-    val base = start + offset
-    val out = Array.better.tabulate(len)(i => buffer(base + i))
-    new String(out)
+    if len == 0 then ""
+    else
+      ensure(end - 1)
+      new String(buffer, this.start + start, len)
 
   /**
    * Skips the first count characters.
    *
    * This is used to advance past tokens that have been processed.
-   * Uses O(1) logical offset advancement instead of O(n) buffer shifting.
-   * Periodically compacts the buffer when offset exceeds 64KB to bound memory waste.
+   * Advancing is O(1); consumed characters are discarded the next time
+   * the window needs room for new input, so memory is bounded by the
+   * longest lookahead rather than by the size of the input.
    *
    * @param count the number of characters to skip
    * @return this LazyReader for chaining
    */
   def from(count: Int): LazyReader =
-    offset += count
-    size -= count
-    // Compact when offset exceeds 64KB to bound memory waste
-    if offset > 65536 then
-      buffer.remove(0, offset)
-      offset = 0
+    start += count
+    consumed += count
     this
 
   override def toString: String = subSequence(0, length).toString
 
   override def close(): Unit = reader.close()
 
-  @tailrec
   private def ensure(pos: Int): Unit =
-    if pos >= buffer.length then
-      val charsRead = reader.read(chunk)
-      if charsRead == -1 then
-        throw new IndexOutOfBoundsException(s"Position $pos is out of bounds for LazyReader of size $size")
-      else
-        buffer.appendAll(chunk.iterator.take(charsRead))
-        ensure(pos)
+    if !readable(pos) then
+      throw new IndexOutOfBoundsException(s"Position $pos is out of bounds for LazyReader of size $length")
+
+  private def readable(pos: Int): Boolean =
+    var eof = false
+    while !eof && filled <= start + pos do
+      if filled == buffer.length then makeRoom()
+      val charsRead = reader.read(buffer, filled, buffer.length - filled)
+      if charsRead == -1 then eof = true else filled += charsRead
+    !eof
+
+  private def makeRoom(): Unit =
+    if start >= filled then
+      // everything buffered has been consumed, possibly even more that was never read
+      start -= filled
+      filled = 0
+    else
+      val live = filled - start
+      System.arraycopy(buffer, start, buffer, 0, live)
+      start = 0
+      filled = live
+      if live > buffer.length / 2 then buffer = java.util.Arrays.copyOf(buffer, buffer.length * 2).nn
 
 /**
  * Factory methods for creating LazyReader instances.
  */
 object LazyReader:
+  private final val InitialCapacity = 16384
 
   /**
    * Creates a LazyReader from a file path.
    *
+   * The length is the number of chars the file decodes to, which differs
+   * from its size in bytes for multi-byte encodings. For those, it is only
+   * counted when the length is first needed. The DFA matcher and the end of input
+   * check never need it, but the regex matcher reads it as soon as it is reset on the reader,
+   * so only lexers mixing in [[DfaMatching]] start without scanning the file.
+   *
    * @param path the path to the file
    * @param charset the character encoding (defaults to UTF-8)
    * @return a new LazyReader
    */
   def from(path: Path, charset: Charset = StandardCharsets.UTF_8): LazyReader =
-    val reader = Files.newBufferedReader(path, charset)
-    val size = Files.size(path)
-    LazyReader(reader, size)
+    new LazyReader(Files.newBufferedReader(path, charset), () => MappedInput.charLength(path, charset))
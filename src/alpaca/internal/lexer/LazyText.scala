@@ -0,0 +1,21 @@
+package alpaca
+package internal
+package lexer
+
+/**
+ * A marker trait for contexts whose lexemes take their text from the input only when it is read.
+ *
+ * By default the text of every match is copied out of the input into [[LexerCtx.lastRawMatched]]
+ * and into its lexeme. When the context of a `lexer` mixes this trait in, a token whose context update
+ * and value never read the matched text creates a lexeme holding the input and the start and end offsets
+ * of the match instead, and builds its `text` the first time it is accessed. `lastRawMatched` is then
+ * not updated for such a token. A token whose context update or value passes the context to another method,
+ * or calls a method of the context other than the accessors of its fields, is taken to read the text.
+ *
+ * Only matches of a `String` input are handled this way, as other inputs may change or be dropped
+ * once consumed, and only while the context runs no other [[OnTokenMatch]] hooks than the ones of
+ * [[PositionTracking]], [[LineTracking]] and [[OffsetTracking]], as other hooks receive the matched text.
+ * The lexemes keep the whole input reachable for as long as they are.
+ */
+trait LazyText:
+  this: LexerCtx =>
@@ -22,16 +22,46 @@ import scala.util.boundary.break
  * @tparam Value the value type
  * @param name the token name
  * @param value the extracted value
+ * @param matched the matched text, or null if it is taken from `source` when first read
+ * @param id the id of the token name in [[TokenIds]], used by the parser to find its table column
+ * @param source the input the text was matched in, if it is not known yet
+ * @param start the offset of the start of the match in `source`
+ * @param end the offset of the end of the match in `source`
  */
 private[alpaca] final class Lexeme[+Name <: ValidName, +Value](
   val name: Name,
   val value: Value,
-  val text: String,
+  private var matched: String | Null,
   private[alpaca] val fieldNames: Array[String],
   private[alpaca] val fieldValues: Array[Any],
+  private[alpaca] val id: Int = TokenIds.of(name),
+  private val source: String | Null = null,
+  private val start: Int = 0,
+  private val end: Int = 0,
 ) extends Selectable:
   type Fields <: AnyNamedTuple
 
+  /** The matched text, taken from the input the first time it is read if the lexeme was created by [[LazyText]]. */
+  def text: String =
+    if matched == null then matched = source.nn.substring(start, end).nn
+    matched.nn
+
+  /**
+   * Compares the texts of two lexemes without building the ones of lexemes created by [[LazyText]].
+   *
+   * @param that another lexeme
+   * @return true if both lexemes matched the same text
+   */
+  private[alpaca] def sameText(that: Lexeme[?, ?]): Boolean =
+    textLength == that.textLength && textSource.regionMatches(textStart, that.textSource, that.textStart, textLength)
+
+  // the input of a lazy lexeme is kept even once its text is built, so these agree however they interleave with it
+  private def textSource: String = if source != null then source.nn else matched.nn
+
+  private def textStart: Int = if source != null then start else 0
+
+  private def textLength: Int = if source != null then end - start else matched.nn.length
+
   def selectDynamic(name: String): Any =
     boundary:
       for i <- fieldNames.indices if fieldNames(i) == name do break(fieldValues(i))
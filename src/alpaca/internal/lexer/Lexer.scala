@@ -31,7 +31,7 @@ def lexerImpl[Ctx <: LexerCtx: Type, lexemeFields <: AnyNamedTuple: Type](
 
   if cases.isEmpty then report.errorAndAbort("Lexer definition must contain at least one case")
 
-  val (tokens, infos) = cases.foldLeft(
+  val (definedTokens, definedInfos) = cases.foldLeft(
     (
       tokens = List.empty[(expr: Expr[Token[?, Ctx, ?] & TokenRefn], name: ValidName)],
       infos = List.empty[TokenInfo],
@@ -45,6 +45,13 @@ def lexerImpl[Ctx <: LexerCtx: Type, lexemeFields <: AnyNamedTuple: Type](
 
       def extractSimple(ctxManipulation: Expr[CtxManipulation[Ctx]])
         : PartialFunction[Expr[TokenDef[ValidName, Ctx, Any]], List[(TokenInfo, Expr[Token[?, Ctx, ?]])]] =
+        case '{ type name <: ValidName; Token.Keyword[name](using $_) } =>
+          logger.trace("extractSimple(keyword)")
+          compileNameAndPattern[name](tree).unsafeMap:
+            case ('[type name <: ValidName; name], tokenInfo) =>
+              val keywordInfo = tokenInfo.copy(keyword = true)
+              (keywordInfo, '{ DefinedToken[name, Ctx, Unit](${ Expr(keywordInfo) }, $ctxManipulation, _ => ()) })
+
         case '{ Token.Ignored(using $_) } =>
           logger.trace("extractSimple(1)")
           compileNameAndPattern[Nothing](tree).unsafeMap:
@@ -78,7 +85,7 @@ def lexerImpl[Ctx <: LexerCtx: Type, lexemeFields <: AnyNamedTuple: Type](
               raiseShouldNeverBeCalled[(TokenInfo, Expr[Token[?, Ctx, ?]])](tokenInfo)
 
       logger.trace("extracting tokens from body")
-      val (infos, tokens) = extractSimple('{ _ => () })
+      val (infos, tokens) = extractSimple('{ NoCtxManipulation })
         .lift(body.asExprOf[TokenDef[ValidName, Ctx, Any]])
         .orElse:
           body match
@@ -108,7 +115,7 @@ def lexerImpl[Ctx <: LexerCtx: Type, lexemeFields <: AnyNamedTuple: Type](
     case (_, CaseDef(_, Some(_), body)) => report.errorAndAbort("Guards are not supported yet")
 
   logger.trace("checking for duplicate token names")
-  infos
+  definedInfos
     .groupBy(_.name)
     .iterator
     .filter(_._2.sizeIs > 1)
@@ -117,6 +124,11 @@ def lexerImpl[Ctx <: LexerCtx: Type, lexemeFields <: AnyNamedTuple: Type](
         show"Token name \"$name\" is defined ${duplicates.size.toString} times. Combine the patterns into a single case using alternatives, e.g.: case x @ (\"pattern1\" | \"pattern2\") => Token[x]",
       )
 
+  // keywords are not matched on their own but looked up by the text of other tokens, so they go last
+  val (keywords, matched) = definedTokens.zip(definedInfos).partition((_, info) => info.keyword)
+  val tokens = matched.map(_._1) ::: keywords.map(_._1)
+  val infos = matched.map(_._2)
+
   logger.trace("checking regex patterns")
   RegexChecker.checkPatterns(infos.map(_.pattern))
 
@@ -149,10 +161,203 @@ def lexerImpl[Ctx <: LexerCtx: Type, lexemeFields <: AnyNamedTuple: Type](
       val regex = Expr:
         infos
           .map:
-            case TokenInfo(_, regexGroupName, pattern) => show"(?<$regexGroupName>$pattern)"
+            case TokenInfo(_, regexGroupName, pattern, _, _) => show"(?<$regexGroupName>$pattern)"
           .mkString("|")
           .tap(Pattern.compile) // we'd like to compile it here to fail in compile time if regex is invalid
 
+      val dfaExpr: Expr[Dfa | Null] =
+        if TypeRepr.of[Ctx] <:< TypeRepr.of[DfaMatching] then
+          logger.trace("compiling token patterns into a DFA")
+          try Expr(DfaBuilder(infos.map(_.pattern)))
+          catch case e: UnsupportedPatternException => report.errorAndAbort(e.getMessage.nn)
+        else '{ null }
+
+      if TypeRepr.of[Ctx] <:< TypeRepr.of[AsciiMatching] then
+        logger.trace("checking that token patterns are ASCII-only")
+        infos.foreach: info =>
+          val chars =
+            try RegexAst.chars(RegexAst.parse(info.pattern))
+            catch case e: UnsupportedPatternException => report.errorAndAbort(e.getMessage.nn)
+          if chars.ranges.exists((_, hi) => hi > AsciiBytes.MaxChar) then
+            report.errorAndAbort(
+              show"Pattern \"${info.pattern}\" of token \"${info.name}\" can match non-ASCII characters. Narrow its character classes, e.g. [ !#-~] instead of [^\"]",
+            )
+
+      logger.trace("finding the characters tokens can span")
+      val innerCharsExpr = PackedInts.expr:
+        infos
+          .foldLeft(CharRanges.empty): (acc, info) =>
+            val inner =
+              try RegexAst.innerChars(RegexAst.parse(info.pattern))
+              catch case _: UnsupportedPatternException => CharRanges.range(0, CharRanges.MaxChar)
+            acc.union(inner)
+          .ranges
+          .flatMap((lo, hi) => lo :: hi :: Nil)
+          .toArray
+
+      logger.trace("dispatching tokens on their first character")
+      val asts = infos.toVector.map: info =>
+        try Some(RegexAst.parse(info.pattern))
+        catch case _: UnsupportedPatternException => None
+      val firstChars = asts.map(_.fold(CharRanges.range(0, CharRanges.MaxChar))(RegexAst.firstChars))
+      val runs = asts.map(_.flatMap(RegexAst.run))
+      // literal tokens are tried before the regex until a token with another pattern can start there,
+      // which is tried next if it matches a run of characters; its index is stored negated
+      val candidates = List.tabulate(Tokenization.DispatchChars): c =>
+        val (literals, others) = infos.indices.filter(firstChars(_).contains(c)).span(infos(_).literal != null)
+        literals.toList ::: others.headOption.filter(runs(_).isDefined).map(~_).toList
+      val dispatchTableExpr = PackedInts.expr:
+        if candidates.forall(_.isEmpty) then Array.emptyIntArray
+        else candidates.flatMap(entries => entries.size :: entries).toArray
+      val runTableExpr = PackedInts.expr:
+        def encode(chars: CharRanges) = chars.ranges.size :: chars.ranges.flatMap((lo, hi) => lo :: hi :: Nil)
+        candidates.flatten
+          .filter(_ < 0)
+          .distinct
+          .flatMap: entry =>
+            runs(~entry).toList.flatMap: (head, tail) =>
+              ~entry :: head.size :: head.flatMap(encode) ::: encode(tail)
+          .toArray
+
+      logger.trace("building the perfect hash table of keywords")
+      val matcher = Pattern.compile(regex.valueOrAbort).matcher("")
+      // the text of every keyword with the index of the token that matches it, the only one that is looked up
+      val keywordSources = keywords.map: (_, info) =>
+        info.literal match
+          case null =>
+            report.errorAndAbort(
+              show"Keyword \"${info.name}\" must match a fixed string, but its pattern is \"${info.pattern}\". Bind alternatives to give every keyword its own token, e.g.: case x @ (\"if\" | \"else\") => Token.Keyword[x.type]",
+            )
+          case text: String =>
+            val source =
+              if !matcher.reset(text).lookingAt || matcher.end != text.length then -1
+              else infos.indexWhere(info => matcher.start(info.regexGroupName) != -1)
+            if source == -1 || tokens(source).expr.asTerm.tpe <:< TypeRepr.of[IgnoredToken[?, ?]] then
+              report.errorAndAbort(
+                show"Keyword \"${info.name}\" is not matched in full by any other defined token, so it would never be recognized. Define a token matching \"$text\", e.g. an identifier",
+              )
+            (text, source)
+      val keywordTableExpr = PackedInts.expr:
+        val texts = keywordSources.map(_._1)
+        texts.diff(texts.distinct).headOption.foreach: text =>
+          report.errorAndAbort(show"Keyword text \"$text\" is defined more than once")
+        Keywords.table(texts)
+      val keywordSourcesExpr = PackedInts.expr(keywordSources.map(_._2).distinct.sorted.toArray)
+
+      // every read of the matched text, bound or not, is a read of lastRawMatched once the context is replaced;
+      // a context passed elsewhere or whose methods are called may have it read there, so it counts as a read too
+      val textFreeExpr = PackedInts.expr:
+        if TypeRepr.of[Ctx] <:< TypeRepr.of[LazyText] then
+          def isContext(term: Term) = term.tpe.widen <:< TypeRepr.of[LexerCtx]
+          def isField(symbol: Symbol) =
+            symbol.isValDef && !symbol.flags.is(Flags.Lazy) || symbol.flags.is(Flags.FieldAccessor)
+          val readsText = new TreeAccumulator[Boolean]:
+            override def foldTree(found: Boolean, tree: Tree)(owner: Symbol): Boolean = tree match
+              case _ if found => true
+              case Select(qualifier, name) if isContext(qualifier) => name == "lastRawMatched" || !isField(tree.symbol)
+              case Select(_, "lastRawMatched") => true
+              case ident: Ident if isContext(ident) => true
+              case _ => foldOverTree(found, tree)(owner)
+          tokens.indices.filterNot(i => readsText.foldTree(false, tokens(i).expr.asTerm)(Symbol.spliceOwner)).toArray
+        else Array.emptyIntArray
+
+      val matchHandlerExpr: Expr[MatchHandler[Ctx] | Null] =
+        if TypeRepr.of[Ctx] <:< TypeRepr.of[SpecializedMatching] then
+          logger.trace("generating the handler of matches")
+          val auto = '{ OnTokenMatch }.asTerm.symbol.methodMember("auto")
+          if Expr.summonIgnoring[OnTokenMatch[Ctx]](auto*).isDefined then
+            report.errorAndAbort(
+              show"${Type.of[Ctx]} defines its own OnTokenMatch, which SpecializedMatching would bypass. Define it for a trait the context extends instead",
+            )
+
+          // the hooks OnTokenMatch.auto would call, in the same order; None stands for the one of LexerCtx
+          val hooks = TypeRepr
+            .of[Ctx]
+            .baseClasses
+            .iterator
+            .map(_.typeRef)
+            .filter(_ <:< TypeRepr.of[LexerCtx])
+            .filterNot(_.typeSymbol == TypeRepr.of[Ctx].typeSymbol)
+            .map: parent =>
+              if parent.typeSymbol == TypeRepr.of[LexerCtx].typeSymbol then None
+              else
+                parent.asType match
+                  case '[type ctx >: Ctx <: LexerCtx; ctx] =>
+                    val hook = Expr
+                      .summonIgnoring[OnTokenMatch[ctx]](auto*)
+                      .getOrElse(report.errorAndAbort(show"No OnTokenMatch instance found for ${Type.of[ctx]}"))
+                    Some('{ $hook: ((Token[?, Ctx, ?], String, Ctx) => Unit) })
+            .toList
+          val fieldNames = TypeRepr.of[Ctx].typeSymbol.caseFields.map(_.name)
+
+          def handle(
+            tokenArray: Expr[Array[Token[?, Ctx, ?]]],
+            index: Expr[Int],
+            raw: Expr[String],
+            ctx: Expr[Ctx],
+            names: Expr[Array[String]],
+            chunk: List[(Expr[Token[?, Ctx, ?]], Int)],
+          )(using Quotes,
+          ): Expr[Lexeme[?, ?] | Null] =
+            def callHooks(token: Expr[Token[?, Ctx, ?]], own: Expr[Unit]): Expr[Unit] =
+              Expr.block(hooks.map(_.fold(own)(hook => '{ $hook.apply($token, $raw, $ctx) })), '{})
+
+            val fieldValues = Varargs(fieldNames.map(Select.unique(ctx.asTerm, _).asExpr))
+            val cases = chunk.map: (token, i) =>
+              val body =
+                if token.asTerm.tpe <:< TypeRepr.of[DefinedToken[?, Ctx, ?]] then
+                  '{
+                    val defined = $tokenArray(${ Expr(i) }).asInstanceOf[DefinedToken[ValidName, Ctx, Any]]
+                    ${
+                      callHooks(
+                        'defined,
+                        '{
+                          defined.ctxManipulation($ctx)
+                          $ctx.lastLexeme = Lexeme(
+                            name = defined.info.name,
+                            value = defined.remapping($ctx),
+                            matched = $raw,
+                            fieldNames = $names,
+                            fieldValues = Array[Any]($fieldValues*),
+                            id = defined.id,
+                          )
+                        },
+                      )
+                    }
+                    $ctx.lastLexeme
+                  }
+                else
+                  '{
+                    val ignored = $tokenArray(${ Expr(i) })
+                    ${ callHooks('ignored, '{ ignored.ctxManipulation($ctx) }) }
+                    null
+                  }
+              CaseDef(Literal(IntConstant(i)), None, body.asTerm)
+            Match(
+              '{ $index: @switch }.asTerm,
+              cases :+ CaseDef(Wildcard(), None, '{ throw AlgorithmError("No token with index " + $index) }.asTerm),
+            ).asExprOf[Lexeme[?, ?] | Null]
+
+          // a handler per chunk of tokens keeps every generated method far below the size the JIT compiles
+          def chunks(names: Expr[Array[String]])(using Quotes): List[Expr[MatchHandler[Ctx]]] =
+            tokens
+              .map(_.expr)
+              .zipWithIndex
+              .grouped(MatchHandler.ChunkSize)
+              .map: chunk =>
+                '{
+                  new MatchHandler[Ctx]:
+                    override def apply(tokens: Array[Token[?, Ctx, ?]], index: Int, raw: String, ctx: Ctx)
+                      : Lexeme[?, ?] | Null = ${ handle('tokens, 'index, 'raw, 'ctx, names, chunk) }
+                }
+              .toList
+
+          '{
+            val names = Array[String](${ Varargs(fieldNames.map(Expr(_))) }*)
+            MatchHandler.chunked(Array[MatchHandler[Ctx]](${ Varargs(chunks('names)) }*))
+          }
+        else '{ null }
+
       '{
         {
           new Tokenization[Ctx](using $betweenStages, $errorHandling, $empty):
@@ -162,6 +367,30 @@ def lexerImpl[Ctx <: LexerCtx: Type, lexemeFields <: AnyNamedTuple: Type](
             override def selectDynamic(name: String): Token[?, Ctx, ?] = ${ selectDynamicImpl('{ name }) }
 
             override protected val compiled: java.util.regex.Pattern = Pattern.compile($regex)
+
+            @publicInBinary
+            override private[alpaca] val dfa: Dfa | Null = $dfaExpr
+
+            @publicInBinary
+            override private[alpaca] val innerChars: Array[Int] = $innerCharsExpr
+
+            @publicInBinary
+            override private[alpaca] val dispatchTable: Array[Int] = $dispatchTableExpr
+
+            @publicInBinary
+            override private[alpaca] val runTable: Array[Int] = $runTableExpr
+
+            @publicInBinary
+            override private[alpaca] val keywordTable: Array[Int] = $keywordTableExpr
+
+            @publicInBinary
+            override private[alpaca] val keywordSources: Array[Int] = $keywordSourcesExpr
+
+            @publicInBinary
+            override private[alpaca] val textFree: Array[Int] = $textFreeExpr
+
+            @publicInBinary
+            override private[alpaca] val matchHandler: MatchHandler[Ctx] | Null = $matchHandlerExpr
         }.asInstanceOf[Tokenization[Ctx] { type LexemeFields = lexemeFields; type Fields = fields } & refinedTpe & types]
       }
 // $COVERAGE-ON$
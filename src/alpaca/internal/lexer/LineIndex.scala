@@ -0,0 +1,54 @@
+package alpaca
+package internal
+package lexer
+
+import java.util.Arrays
+
+/**
+ * Converts offsets in a text to lines and columns.
+ *
+ * The text is scanned for newlines once, on the first query, and their offsets are kept
+ * in a sorted array, so every query is a binary search. Together with [[OffsetTracking]]
+ * this replaces the per-token bookkeeping of [[LineTracking]] and [[PositionTracking]],
+ * and gives the right line and column even inside tokens spanning several lines.
+ *
+ * Lines and columns are 1-based; the column of an offset right after a token is the
+ * one [[PositionTracking]] would record for that token.
+ *
+ * @param text the whole input, which must not change
+ */
+final class LineIndex(text: CharSequence):
+  private lazy val newlines: Array[Int] =
+    val offsets = Array.newBuilder[Int]
+    for i <- 0 until text.length if text.charAt(i) == '\n' do offsets += i
+    offsets.result()
+
+  /**
+   * Finds the line and column of an offset.
+   *
+   * @param offset the offset, from 0 to the length of the text
+   * @return the line and the column of the offset
+   * @throws IllegalArgumentException if the offset is outside of the text
+   */
+  def apply(offset: Int): (line: Int, column: Int) =
+    require(0 <= offset && offset <= text.length, s"Offset $offset is outside of the text of length ${text.length}")
+    val found = Arrays.binarySearch(newlines, offset)
+    val before = if found >= 0 then found else -found - 1 // the number of newlines before the offset
+    val lineStart = if before == 0 then 0 else newlines(before - 1) + 1
+    (line = before + 1, column = offset - lineStart + 1)
+
+  /**
+   * Finds the line of an offset.
+   *
+   * @param offset the offset, from 0 to the length of the text
+   * @return the line of the offset
+   */
+  def line(offset: Int): Int = apply(offset).line
+
+  /**
+   * Finds the column of an offset.
+   *
+   * @param offset the offset, from 0 to the length of the text
+   * @return the column of the offset
+   */
+  def column(offset: Int): Int = apply(offset).column
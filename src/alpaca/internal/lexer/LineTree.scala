@@ -0,0 +1,197 @@
+package alpaca
+package internal
+package lexer
+
+import scala.annotation.tailrec
+
+/**
+ * A persistent sequence of lines, kept as a balanced tree so that it can be searched, split and joined in
+ * logarithmic time.
+ *
+ * Every line is stored with the length of its text and the number of its lexemes, and every subtree
+ * with their sums, so [[Tokenization.relex]] finds and replaces the edited lines without walking the
+ * rest of the document. The tree is height-balanced, and split and joined as in join-based AVL trees.
+ *
+ * @tparam A the type of the lines
+ */
+private[lexer] sealed abstract class LineTree[A]:
+  import LineTree.*
+
+  /** The number of lines. */
+  def size: Int
+
+  /** The total length of the texts of the lines. */
+  def length: Int
+
+  /** The total number of lexemes of the lines. */
+  def count: Int
+
+  private[lexer] def height: Int
+
+  /**
+   * Finds a line by its index.
+   *
+   * @param index the index of the line
+   * @return the line
+   */
+  final def apply(index: Int): A =
+    @tailrec def loop(tree: LineTree[A], index: Int): A = tree match
+      case node: Node[A] =>
+        if index < node.left.size then loop(node.left, index)
+        else if index == node.left.size then node.line
+        else loop(node.right, index - node.left.size - 1)
+      case _ => throw new IndexOutOfBoundsException(s"Line $index is out of bounds for $size lines")
+    loop(this, index)
+
+  /**
+   * Finds the line containing an offset, or the last line if the offset is at the end of the text.
+   *
+   * @param offset the offset in the text of the lines
+   * @return the index of the line and the offset of its start
+   */
+  final def locate(offset: Int): (index: Int, start: Int) =
+    @tailrec def loop(tree: Node[A], index: Int, start: Int): (index: Int, start: Int) =
+      val lineStart = start + tree.left.length
+      (tree.left, tree.right) match
+        case (left: Node[A], _) if offset < lineStart => loop(left, index, start)
+        case (_, right: Node[A]) if offset >= lineStart + tree.lineLength =>
+          loop(right, index + tree.left.size + 1, lineStart + tree.lineLength)
+        case _ => (index = index + tree.left.size, start = lineStart)
+    this match
+      case node: Node[A] => loop(node, 0, 0)
+      case _ => throw new IndexOutOfBoundsException("No lines to locate an offset in")
+
+  /**
+   * Counts the lexemes of the lines before an index.
+   *
+   * @param index the index of a line, or the number of lines
+   * @return the number of lexemes of the lines before it
+   */
+  final def countBefore(index: Int): Int =
+    @tailrec def loop(tree: LineTree[A], index: Int, before: Int): Int = tree match
+      case node: Node[A] if index <= node.left.size => loop(node.left, index, before)
+      case node: Node[A] => loop(node.right, index - node.left.size - 1, before + node.left.count + node.lineCount)
+      case _ => before
+    loop(this, index, 0)
+
+  /**
+   * Takes the first lines.
+   *
+   * @param n the number of lines to take
+   * @return the first `n` lines
+   */
+  final def take(n: Int): LineTree[A] = split(this, n)._1
+
+  /**
+   * Drops the first lines.
+   *
+   * @param n the number of lines to drop
+   * @return the lines after the first `n`
+   */
+  final def drop(n: Int): LineTree[A] = split(this, n)._2
+
+  /**
+   * Appends other lines.
+   *
+   * @param that the lines to append
+   * @return the lines of this tree followed by the ones of `that`
+   */
+  final def ++(that: LineTree[A]): LineTree[A] = that match
+    case _: Node[A] =>
+      val (first, rest) = split(that, 1)
+      val head = first.asInstanceOf[Node[A]]
+      join(this, head.line, head.lineLength, head.lineCount, rest)
+    case _ => this
+
+  /** The lines, in order. */
+  final def iterator: Iterator[A] = this match
+    case node: Node[A] => node.left.iterator ++ Iterator.single(node.line) ++ node.right.iterator
+    case _ => Iterator.empty
+
+private[lexer] object LineTree:
+  private final class Leaf[A] extends LineTree[A]:
+    def size: Int = 0
+    def length: Int = 0
+    def count: Int = 0
+    private[lexer] def height: Int = 0
+
+  private final class Node[A](
+    val left: LineTree[A],
+    val line: A,
+    val lineLength: Int,
+    val lineCount: Int,
+    val right: LineTree[A],
+  ) extends LineTree[A]:
+    val size: Int = left.size + 1 + right.size
+    val length: Int = left.length + lineLength + right.length
+    val count: Int = left.count + lineCount + right.count
+    private[lexer] val height: Int = math.max(left.height, right.height) + 1
+
+  private val Empty = new Leaf[Any]
+
+  /** An empty sequence of lines. */
+  def empty[A]: LineTree[A] = Empty.asInstanceOf[LineTree[A]]
+
+  /**
+   * Builds a balanced tree of lines in linear time.
+   *
+   * @param lines the lines
+   * @param length the length of the text of a line
+   * @param count the number of lexemes of a line
+   * @return the tree of the lines, in the same order
+   */
+  def from[A](lines: IndexedSeq[A])(length: A => Int, count: A => Int): LineTree[A] =
+    def build(start: Int, end: Int): LineTree[A] =
+      if start == end then empty
+      else
+        val mid = (start + end) >>> 1
+        Node(build(start, mid), lines(mid), length(lines(mid)), count(lines(mid)), build(mid + 1, end))
+    build(0, lines.length)
+
+  private def split[A](tree: LineTree[A], n: Int): (LineTree[A], LineTree[A]) = tree match
+    case node: Node[A] if n <= node.left.size =>
+      val (left, right) = split(node.left, n)
+      (left, join(right, node.line, node.lineLength, node.lineCount, node.right))
+    case node: Node[A] =>
+      val (left, right) = split(node.right, n - node.left.size - 1)
+      (join(node.left, node.line, node.lineLength, node.lineCount, left), right)
+    case _ => (tree, tree)
+
+  // joins two trees of any heights around a line, descending along the side of the higher one
+  private def join[A](left: LineTree[A], line: A, length: Int, count: Int, right: LineTree[A]): LineTree[A] =
+    (left, right) match
+      case (left: Node[A], _) if left.height > right.height + 1 =>
+        balance(left.left, left.line, left.lineLength, left.lineCount, join(left.right, line, length, count, right))
+      case (_, right: Node[A]) if right.height > left.height + 1 =>
+        balance(join(left, line, length, count, right.left), right.line, right.lineLength, right.lineCount, right.right)
+      case _ => Node(left, line, length, count, right)
+
+  // restores the balance of a node whose subtrees differ in height by two at most, with one or two rotations
+  private def balance[A](left: LineTree[A], line: A, length: Int, count: Int, right: LineTree[A]): LineTree[A] =
+    (left, right) match
+      case (left: Node[A], _) if left.height > right.height + 1 =>
+        left.right match
+          case inner: Node[A] if inner.height > left.left.height =>
+            Node(
+              Node(left.left, left.line, left.lineLength, left.lineCount, inner.left),
+              inner.line,
+              inner.lineLength,
+              inner.lineCount,
+              Node(inner.right, line, length, count, right),
+            )
+          case _ =>
+            Node(left.left, left.line, left.lineLength, left.lineCount, Node(left.right, line, length, count, right))
+      case (_, right: Node[A]) if right.height > left.height + 1 =>
+        right.left match
+          case inner: Node[A] if inner.height > right.right.height =>
+            Node(
+              Node(left, line, length, count, inner.left),
+              inner.line,
+              inner.lineLength,
+              inner.lineCount,
+              Node(inner.right, right.line, right.lineLength, right.lineCount, right.right),
+            )
+          case _ =>
+            val rotated = Node(left, line, length, count, right.left)
+            Node(rotated, right.line, right.lineLength, right.lineCount, right.right)
+      case _ => Node(left, line, length, count, right)
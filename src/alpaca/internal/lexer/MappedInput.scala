@@ -0,0 +1,208 @@
+package alpaca
+package internal
+package lexer
+
+import java.io.{Closeable, Reader}
+import java.nio.charset.{Charset, CharsetDecoder, CoderResult, CodingErrorAction, StandardCharsets}
+import java.nio.channels.FileChannel
+import java.nio.file.{Files, Path, StandardOpenOption}
+import java.nio.{ByteBuffer, ByteOrder, CharBuffer}
+
+/**
+ * A character sequence over a memory-mapped file.
+ *
+ * The file is mapped in regions of 1 GiB, so no read system calls are issued
+ * and the content is never copied to the heap as a whole. Single-byte content,
+ * i.e. Latin-1 or ASCII-only US-ASCII and UTF-8 files, is served directly from the
+ * mapped bytes. Anything else is decoded incrementally with a `CharsetDecoder` into
+ * a [[LazyReader]] window. In both cases [[length]] is the exact number of chars
+ * left, not the number of bytes.
+ *
+ * Like [[LazyReader]], the sequence is consumed by [[from]], which is what the lexer uses to advance.
+ *
+ * @param regions the mapped regions, overlapping by a few bytes so no character straddles two of them
+ * @param charCount the number of chars in the whole file
+ * @param decoded the decoding window, or null if the content is single-byte
+ */
+final class MappedInput private (
+  private var regions: Array[ByteBuffer],
+  private val charCount: Long,
+  private val decoded: LazyReader | Null,
+) extends CharSequence,
+    Closeable:
+  private var offset: Long = 0
+
+  def length: Int = decoded match
+    case null => math.min(Int.MaxValue, charCount - offset).toInt
+    case reader: LazyReader => reader.length
+
+  def charAt(index: Int): Char = decoded match
+    case null =>
+      val pos = offset + index
+      if index < 0 || pos >= charCount then
+        throw new IndexOutOfBoundsException(s"Position $index is out of bounds for MappedInput of size $length")
+      val region = (pos >>> MappedInput.RegionBits).toInt
+      (regions(region).get((pos - (region.toLong << MappedInput.RegionBits)).toInt) & 0xff).toChar
+    case reader: LazyReader => reader.charAt(index)
+
+  def subSequence(start: Int, end: Int): CharSequence = decoded match
+    case null =>
+      val len = end - start
+      require(len >= 0 && start >= 0 && offset + end <= charCount, s"Invalid subsequence range: start=$start, end=$end")
+      val bytes = new Array[Byte](len)
+      var copied = 0
+      while copied < len do
+        val pos = offset + start + copied
+        val region = (pos >>> MappedInput.RegionBits).toInt
+        val inRegion = (pos - (region.toLong << MappedInput.RegionBits)).toInt
+        val chunk = math.min(len - copied, regions(region).limit - inRegion)
+        regions(region).get(inRegion, bytes, copied, chunk)
+        copied += chunk
+      new String(bytes, StandardCharsets.ISO_8859_1)
+    case reader: LazyReader => reader.subSequence(start, end)
+
+  /**
+   * Skips the first count characters.
+   *
+   * @param count the number of characters to skip
+   * @return this MappedInput for chaining
+   */
+  def from(count: Int): MappedInput =
+    decoded match
+      case null => offset += count
+      case reader: LazyReader => reader.from(count)
+    this
+
+  override def toString: String = subSequence(0, length).toString
+
+  /** Drops the references to the mapped regions so they can be unmapped. */
+  override def close(): Unit =
+    regions = Array.empty
+    decoded match
+      case null => ()
+      case reader: LazyReader => reader.close()
+
+/**
+ * Factory methods for creating MappedInput instances.
+ */
+object MappedInput:
+  private[lexer] final val RegionBits = 30
+
+  /** Bytes shared by consecutive regions; longer than any multi-byte sequence of common charsets. */
+  private final val Overlap = 16
+
+  /**
+   * Maps a file into memory.
+   *
+   * @param path the path to the file
+   * @param charset the character encoding (defaults to UTF-8)
+   * @return a new MappedInput
+   */
+  def from(path: Path, charset: Charset = StandardCharsets.UTF_8): MappedInput =
+    val regions = map(path)
+    val singleByte = charset == StandardCharsets.ISO_8859_1 ||
+      (charset == StandardCharsets.UTF_8 || charset == StandardCharsets.US_ASCII) && isAscii(regions)
+    if singleByte then new MappedInput(regions, byteSize(regions), null)
+    else
+      val charCount = countChars(regions, charset)
+      new MappedInput(regions, charCount, LazyReader(MappedReader(regions, charset), charCount))
+
+  /**
+   * Computes the number of chars a file decodes to.
+   *
+   * @param path the path to the file
+   * @param charset the character encoding
+   * @return the number of UTF-16 code units of the decoded content
+   */
+  private[lexer] def charLength(path: Path, charset: Charset): Long =
+    if charset == StandardCharsets.ISO_8859_1 || charset == StandardCharsets.US_ASCII then Files.size(path)
+    else countChars(map(path), charset)
+
+  private def map(path: Path): Array[ByteBuffer] =
+    val channel = FileChannel.open(path, StandardOpenOption.READ)
+    try
+      val size = channel.size
+      val regionSize = 1L << RegionBits
+      Array.tabulate[ByteBuffer](((size + regionSize - 1) / regionSize).toInt): i =>
+        val start = i * regionSize
+        channel.map(FileChannel.MapMode.READ_ONLY, start, math.min(regionSize + Overlap, size - start))
+    finally channel.close() // mappings stay valid after the channel is closed
+
+  private def byteSize(regions: Array[ByteBuffer]): Long =
+    if regions.isEmpty then 0L else (regions.length - 1).toLong * (1L << RegionBits) + regions.last.limit
+
+  /** Calls `f` for every byte of the file exactly once, skipping the overlaps. */
+  private inline def foreachRegion(regions: Array[ByteBuffer])(inline f: (ByteBuffer, Int) => Unit): Unit =
+    var i = 0
+    while i < regions.length do
+      val region = regions(i)
+      f(region, if i == regions.length - 1 then region.limit else 1 << RegionBits)
+      i += 1
+
+  private def isAscii(regions: Array[ByteBuffer]): Boolean =
+    var ascii = true
+    foreachRegion(regions): (region, end) =>
+      val words = region.duplicate.order(ByteOrder.LITTLE_ENDIAN)
+      var i = 0
+      while ascii && i + 8 <= end do
+        ascii = (words.getLong(i) & 0x8080808080808080L) == 0
+        i += 8
+      while ascii && i < end do
+        ascii = region.get(i) >= 0
+        i += 1
+    ascii
+
+  private def countChars(regions: Array[ByteBuffer], charset: Charset): Long =
+    if charset == StandardCharsets.ISO_8859_1 || charset == StandardCharsets.US_ASCII then byteSize(regions)
+    else if charset == StandardCharsets.UTF_8 then
+      // every char starts with a non-continuation byte; 4-byte sequences decode to a surrogate pair
+      var count = 0L
+      foreachRegion(regions): (region, end) =>
+        var i = 0
+        while i < end do
+          val b = region.get(i)
+          if (b & 0xc0) != 0x80 then count += 1
+          if (b & 0xf8) == 0xf0 then count += 1
+          i += 1
+      count
+    else
+      val reader = MappedReader(regions, charset)
+      val scratch = new Array[Char](8192)
+      var count = 0L
+      var read = reader.read(scratch, 0, scratch.length)
+      while read != -1 do
+        count += read
+        read = reader.read(scratch, 0, scratch.length)
+      count
+
+  /**
+   * A Reader decoding the mapped regions.
+   *
+   * Decoding a region runs into the overlap with the next one, so a character that
+   * straddles the nominal region boundary is decoded completely from a single buffer.
+   */
+  private final class MappedReader(regions: Array[ByteBuffer], charset: Charset) extends Reader:
+    private val decoder: CharsetDecoder = charset.newDecoder
+      .onMalformedInput(CodingErrorAction.REPORT)
+      .onUnmappableCharacter(CodingErrorAction.REPORT)
+    private val size = byteSize(regions)
+    private var position = 0L
+    private var finished = false
+
+    override def read(cbuf: Array[Char], off: Int, len: Int): Int =
+      val out = CharBuffer.wrap(cbuf, off, len)
+      while len > 0 && out.position == off && !finished do
+        if position >= size then
+          check(decoder.flush(out))
+          finished = true
+        else
+          val index = (position >>> RegionBits).toInt
+          val in = regions(index).duplicate
+          in.position((position - (index.toLong << RegionBits)).toInt)
+          check(decoder.decode(in, out, index == regions.length - 1))
+          position = (index.toLong << RegionBits) + in.position
+      if len > 0 && out.position == off then -1 else out.position - off
+
+    override def close(): Unit = ()
+
+    private def check(result: CoderResult): Unit = if result.isError then result.throwException()
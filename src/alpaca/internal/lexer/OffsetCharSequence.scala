@@ -14,7 +14,7 @@ package lexer
  * @param offset     the current logical start position (advanced by `from`)
  */
 private[alpaca] final class OffsetCharSequence(
-  private val underlying: CharSequence,
+  private var underlying: CharSequence,
   private var offset: Int = 0,
 ) extends CharSequence:
 
@@ -38,4 +38,23 @@ private[alpaca] final class OffsetCharSequence(
     offset += count
     this
 
+  /**
+   * Starts over with another input, so the wrapper can be reused.
+   *
+   * @param input the new underlying input
+   * @return this instance (for fluent use)
+   */
+  def reset(input: CharSequence): OffsetCharSequence =
+    underlying = input
+    offset = 0
+    this
+
+  /** The whole input, if it is a `String`, which cannot change under the lexemes created from it. */
+  private[lexer] def input: String | Null = underlying match
+    case input: String => input
+    case _ => null
+
+  /** The position of the start of this sequence in the whole input. */
+  private[lexer] def position: Int = offset
+
   override def toString: String = underlying.subSequence(offset, underlying.length).toString
@@ -0,0 +1,25 @@
+package alpaca
+package internal
+package lexer
+
+/**
+ * A trait for contexts that track the offset in the input.
+ *
+ * This trait adds offset tracking to a lexer context. The offset is
+ * advanced by the length of every match, newlines included, so it costs
+ * a single addition per token. Lines and columns are computed only when
+ * needed, from the offset and a [[LineIndex]] of the input.
+ */
+trait OffsetTracking extends LexerCtx:
+  /** The number of characters consumed so far (0-based). */
+  var offset: Int
+
+object OffsetTracking:
+
+  /**
+   * OnTokenMatch instance that advances the offset past the match.
+   *
+   * This is automatically composed with other OnTokenMatch instances
+   * when the context extends OffsetTracking.
+   */
+  given OnTokenMatch[OffsetTracking] = (_, matched, ctx) => ctx.offset += matched.length
@@ -29,6 +29,14 @@ object OnTokenMatch:
    */
   inline given auto[Ctx <: LexerCtx]: OnTokenMatch[Ctx] = ${ autoImpl[Ctx] }
 
+  /**
+   * An instance derived by [[auto]] from the instances of the parents of a context.
+   *
+   * @param trackingOnly whether it only runs the instances of [[LexerCtx]], [[PositionTracking]],
+   *                     [[LineTracking]] and [[OffsetTracking]], which the lexer may then stand in for
+   */
+  private[alpaca] abstract class Derived[Ctx <: LexerCtx](val trackingOnly: Boolean) extends OnTokenMatch[Ctx]
+
   // $COVERAGE-OFF$
   private def autoImpl[Ctx <: LexerCtx: Type](using quotes: Quotes): Expr[OnTokenMatch[Ctx]] = withLog:
     import quotes.reflect.*
@@ -44,10 +52,10 @@ object OnTokenMatch:
       // we need to filter self type. Maybe I will change it in future since subtyping check does not work
       // and by symbol is disgusting :/
       .filterNot(_.typeSymbol == TypeRepr.of[Ctx].typeSymbol)
-      .map(_.asType)
       .toList
 
     val derivedOnTokenMatch = parents
+      .map(_.asType)
       .map:
         case '[type ctx >: Ctx <: LexerCtx; ctx] =>
           logger.trace(show"summoning OnTokenMatch for parent ${Type.of[ctx]}")
@@ -55,7 +63,20 @@ object OnTokenMatch:
             .summonIgnoring[OnTokenMatch[ctx]]('{ OnTokenMatch }.asTerm.symbol.methodMember("auto")*)
             .getOrElse(report.errorAndAbort(show"No OnTokenMatch instance found for ${Type.of[ctx]}"))
 
-    '{ (token, m, ctx) =>
-      ${ Expr.block(derivedOnTokenMatch.map(bs => '{ $bs.apply(token, m, ctx) }), '{}) }
+    // the instances the lexer can stand in for, each defined in the companion of its trait
+    val tracking = List(
+      TypeRepr.of[LexerCtx],
+      TypeRepr.of[PositionTracking],
+      TypeRepr.of[LineTracking],
+      TypeRepr.of[OffsetTracking],
+    ).map(_.typeSymbol)
+    val trackingOnly = parents.zip(derivedOnTokenMatch).forall: (parent, hook) =>
+      tracking.contains(parent.typeSymbol) &&
+        hook.asTerm.underlying.symbol.owner == parent.typeSymbol.companionModule.moduleClass
+
+    '{
+      new Derived[Ctx](${ Expr(trackingOnly) }):
+        override def apply(token: Token[?, Ctx, ?], m: String, ctx: Ctx): Unit =
+          ${ Expr.block(derivedOnTokenMatch.map(bs => '{ $bs.apply(token, m, ctx) }), '{}) }
     }
 // $COVERAGE-ON$
@@ -0,0 +1,370 @@
+package alpaca
+package internal
+package lexer
+
+import scala.annotation.constructorOnly
+
+/**
+ * A set of UTF-16 code units.
+ *
+ * The set is stored as sorted, disjoint and non-adjacent inclusive ranges.
+ *
+ * @param ranges the normalized ranges
+ */
+private[lexer] final case class CharRanges(ranges: List[(Int, Int)]):
+  def isEmpty: Boolean = ranges.isEmpty
+
+  def contains(c: Int): Boolean = ranges.exists((lo, hi) => lo <= c && c <= hi)
+
+  def union(other: CharRanges): CharRanges = CharRanges.normalize(ranges ::: other.ranges)
+
+  def complement: CharRanges =
+    val (gaps, next) = ranges.foldLeft((List.empty[(Int, Int)], 0)):
+      case ((acc, from), (lo, hi)) => (if lo > from then (from, lo - 1) :: acc else acc, hi + 1)
+    CharRanges((if next <= CharRanges.MaxChar then (next, CharRanges.MaxChar) :: gaps else gaps).reverse)
+
+private[lexer] object CharRanges:
+  final val MaxChar = 0xffff
+
+  val empty: CharRanges = CharRanges(Nil)
+
+  def of(c: Int): CharRanges = CharRanges((c, c) :: Nil)
+
+  def range(lo: Int, hi: Int): CharRanges = CharRanges((lo, hi) :: Nil)
+
+  def chars(cs: Char*): CharRanges = normalize(cs.iterator.map(c => (c.toInt, c.toInt)).toList)
+
+  def normalize(ranges: List[(Int, Int)]): CharRanges = CharRanges(
+    ranges
+      .sortBy(_._1)
+      .foldLeft(List.empty[(Int, Int)]):
+        case ((lo0, hi0) :: rest, (lo, hi)) if lo <= hi0 + 1 => (lo0, hi0 max hi) :: rest
+        case (acc, range) => range :: acc
+      .reverse,
+  )
+
+  /** `\d` without `UNICODE_CHARACTER_CLASS`. */
+  val Digit: CharRanges = range('0', '9')
+
+  /** `\w` without `UNICODE_CHARACTER_CLASS`. */
+  val Word: CharRanges = range('a', 'z').union(range('A', 'Z')).union(Digit).union(of('_'))
+
+  /** `\s` without `UNICODE_CHARACTER_CLASS`. */
+  val Space: CharRanges = chars(' ', '\t', '\n', '\u000b', '\f', '\r')
+
+  /** `.` without `DOTALL` and `UNIX_LINES`: everything except line terminators. */
+  val Dot: CharRanges = chars('\n', '\r', '\u0085', '\u2028', '\u2029').complement
+
+/**
+ * Syntax tree of the regular subset of `java.util.regex` that can be compiled into an automaton.
+ *
+ * Capturing groups are kept only for their grouping; lazy and possessive quantifiers,
+ * anchors, lookaround, backreferences, inline flags and class set operations are rejected
+ * with an [[UnsupportedPatternException]].
+ */
+private[lexer] enum RegexAst:
+  case Chars(set: CharRanges)
+  case Concat(parts: List[RegexAst])
+  case Alternation(options: List[RegexAst])
+  case Repeat(node: RegexAst, min: Int, max: Int)
+
+private[lexer] object RegexAst:
+  /** The `max` of a [[RegexAst.Repeat]] without an upper bound. */
+  final val Unbounded = -1
+
+  private final val MaxRepetition = 1000
+
+  /**
+   * Parses a pattern that has already been validated by `java.util.regex.Pattern`.
+   *
+   * @param pattern the pattern to parse
+   * @return the syntax tree of the pattern
+   * @throws UnsupportedPatternException if the pattern uses a non-regular construct
+   */
+  def parse(pattern: String)(using Log): RegexAst = new Parser(pattern).parseAll()
+
+  /**
+   * Computes the characters that can occur in a match at any position but the last one.
+   *
+   * A token can only span a character, i.e. match text that continues past it,
+   * if the character is in this set. The result is an over-approximation.
+   *
+   * @param ast the syntax tree of a pattern
+   * @return the characters that can be followed by more text within a match
+   */
+  def innerChars(ast: RegexAst): CharRanges = occurrences(ast).inner
+
+  /**
+   * Finds the only text a pattern matches, if it is a fixed string.
+   *
+   * @param ast the syntax tree of a pattern
+   * @return the text of every match, or null if the pattern can match different or empty texts
+   */
+  def literal(ast: RegexAst): String | Null = fixedText(ast) match
+    case null | "" => null
+    case text: String => text
+
+  private def fixedText(ast: RegexAst): String | Null = ast match
+    case Chars(CharRanges((lo, hi) :: Nil)) if lo == hi => Character.toString(lo)
+    case Concat(parts) =>
+      val texts = parts.map(fixedText)
+      if texts.contains(null) then null else texts.mkString
+    case Repeat(node, min, max) if min == max =>
+      fixedText(node) match
+        case null => null
+        case text: String => text * min
+    case _ => null
+
+  /**
+   * Splits a pattern that matches one character from each of some classes,
+   * followed by the longest run of characters from another class.
+   *
+   * @param ast the syntax tree of a pattern
+   * @return the classes of the leading characters, at least one, and the class of the run,
+   *         empty if there is none, or None if the pattern has another shape
+   */
+  def run(ast: RegexAst): Option[(head: List[CharRanges], tail: CharRanges)] =
+    val parts = ast match
+      case Concat(parts) => parts
+      case part => part :: Nil
+    val head = parts.takeWhile(_.isInstanceOf[Chars]).collect:
+      case Chars(set) => set
+    val run = parts.drop(head.size) match
+      case Nil => Some((head = head, tail = CharRanges.empty))
+      case Repeat(Chars(set), 0, Unbounded) :: Nil => Some((head = head, tail = set))
+      case Repeat(Chars(set), 1, Unbounded) :: Nil => Some((head = head :+ set, tail = set))
+      case _ => None
+    run.filter(_.head.nonEmpty)
+
+  /**
+   * Computes the characters a match can start with.
+   *
+   * A pattern that can match the empty text can match before any character,
+   * so every character is in its set.
+   *
+   * @param ast the syntax tree of a pattern
+   * @return the characters at which a match can start
+   */
+  def firstChars(ast: RegexAst): CharRanges =
+    val (first, nullable) = start(ast)
+    if nullable then CharRanges.range(0, CharRanges.MaxChar) else first
+
+  private type Start = (first: CharRanges, nullable: Boolean)
+
+  private def start(ast: RegexAst): Start = ast match
+    case Chars(set) => (first = set, nullable = false)
+    case Concat(parts) =>
+      parts.foldLeft[Start]((first = CharRanges.empty, nullable = true)): (prefix, part) =>
+        if !prefix.nullable then prefix
+        else
+          val next = start(part)
+          (first = prefix.first.union(next.first), nullable = next.nullable)
+    case Alternation(options) =>
+      options
+        .map(start)
+        .foldLeft[Start]((first = CharRanges.empty, nullable = false)): (acc, option) =>
+          (first = acc.first.union(option.first), nullable = acc.nullable || option.nullable)
+    case Repeat(node, min, max) =>
+      val once = start(node)
+      (first = if max == 0 then CharRanges.empty else once.first, nullable = min == 0 || once.nullable)
+
+  /**
+   * Computes the characters that can occur anywhere in a match.
+   *
+   * @param ast the syntax tree of a pattern
+   * @return the characters of all matches of the pattern
+   */
+  def chars(ast: RegexAst): CharRanges = occurrences(ast).all
+
+  private type Occurrences = (inner: CharRanges, all: CharRanges, nonEmpty: Boolean)
+
+  private val NoOccurrences: Occurrences = (inner = CharRanges.empty, all = CharRanges.empty, nonEmpty = false)
+
+  private def occurrences(ast: RegexAst): Occurrences = ast match
+    case Chars(set) => (inner = CharRanges.empty, all = set, nonEmpty = !set.isEmpty)
+    case Concat(parts) =>
+      parts
+        .map(occurrences)
+        .foldLeft(NoOccurrences): (prefix, part) =>
+          (
+            inner = prefix.inner.union(part.inner).union(if part.nonEmpty then prefix.all else CharRanges.empty),
+            all = prefix.all.union(part.all),
+            nonEmpty = prefix.nonEmpty || part.nonEmpty,
+          )
+    case Alternation(options) =>
+      options
+        .map(occurrences)
+        .foldLeft(NoOccurrences): (acc, option) =>
+          (
+            inner = acc.inner.union(option.inner),
+            all = acc.all.union(option.all),
+            nonEmpty = acc.nonEmpty || option.nonEmpty,
+          )
+    case Repeat(_, _, 0) => NoOccurrences
+    case Repeat(node, _, 1) => occurrences(node)
+    case Repeat(node, _, _) =>
+      val once = occurrences(node)
+      (
+        inner = once.inner.union(if once.nonEmpty then once.all else CharRanges.empty),
+        all = once.all,
+        nonEmpty = once.nonEmpty,
+      )
+
+  private final class Parser(pattern: String)(using Log):
+    private var pos = 0
+
+    def parseAll(): RegexAst =
+      val ast = alternation()
+      if !atEnd then unsupported(s"unexpected '$peek'")
+      ast
+
+    private def unsupported(reason: String): Nothing =
+      throw UnsupportedPatternException(pattern, s"$reason at index $pos")
+
+    private def atEnd: Boolean = pos >= pattern.length
+
+    private def peek: Char = pattern.charAt(pos)
+
+    private def next(): Char =
+      pos += 1
+      pattern.charAt(pos - 1)
+
+    private def accept(c: Char): Boolean =
+      val accepted = !atEnd && peek == c
+      if accepted then pos += 1
+      accepted
+
+    private def alternation(): RegexAst =
+      val first = concat()
+      if atEnd || peek != '|' then first
+      else
+        val options = List.newBuilder[RegexAst].addOne(first)
+        while accept('|') do options += concat()
+        Alternation(options.result())
+
+    private def concat(): RegexAst =
+      val parts = List.newBuilder[RegexAst]
+      while !atEnd && peek != '|' && peek != ')' do parts += quantified()
+      parts.result() match
+        case single :: Nil => single
+        case parts => Concat(parts)
+
+    private def quantified(): RegexAst =
+      var node = atom()
+      while !atEnd && "*+?{".indexOf(peek) >= 0 do
+        val (min, max) = next() match
+          case '*' => (0, Unbounded)
+          case '+' => (1, Unbounded)
+          case '?' => (0, 1)
+          case _ => bounds()
+        if !atEnd && (peek == '?' || peek == '+') then unsupported("lazy and possessive quantifiers")
+        node = Repeat(node, min, max)
+      node
+
+    private def bounds(): (Int, Int) =
+      val min = digits(10, 9, exact = false)
+      val max = if !accept(',') then min else if !atEnd && peek == '}' then Unbounded else digits(10, 9, exact = false)
+      if !accept('}') then unsupported("malformed repetition")
+      if min > MaxRepetition || max > MaxRepetition then unsupported(s"repetition above $MaxRepetition")
+      (min, max)
+
+    private def atom(): RegexAst = next() match
+      case '(' =>
+        if accept('?') then
+          if accept(':') then ()
+          else if !atEnd && peek == '<' && pos + 1 < pattern.length && pattern.charAt(pos + 1).isLetter then
+            pos = pattern.indexOf('>', pos) + 1
+          else unsupported("lookaround, inline flags and atomic groups")
+        val inner = alternation()
+        if !accept(')') then unsupported("unbalanced parenthesis")
+        inner
+      case '[' => Chars(charClass())
+      case '.' => Chars(CharRanges.Dot)
+      case '\\' => escape()
+      case '^' | '$' => unsupported("anchors")
+      case c @ ('*' | '+' | '?' | '{' | '|' | ')') => unsupported(s"dangling '$c'")
+      case c => Chars(CharRanges.of(c))
+
+    private def escape(): RegexAst =
+      if atEnd then unsupported("trailing backslash")
+      next() match
+        case 'Q' =>
+          val end = pattern.indexOf("\\E", pos) match
+            case -1 => pattern.length
+            case idx => idx
+          val quoted = pattern.substring(pos, end)
+          pos = math.min(end + 2, pattern.length)
+          Concat(quoted.toList.map(c => Chars(CharRanges.of(c))))
+        case c => Chars(escapedSet(c))
+
+    private def charClass(): CharRanges =
+      val negated = accept('^')
+      if !atEnd && peek == ']' then unsupported("leading ']' in character class")
+      var set = CharRanges.empty
+      while !accept(']') do
+        if atEnd then unsupported("unterminated character class")
+        if peek == '[' || pattern.startsWith("&&", pos) then unsupported("character class union and intersection")
+        set = set.union:
+          classAtom() match
+            case Left(ranges) => ranges
+            case Right(lo) if !atEnd && peek == '-' && pos + 1 < pattern.length && pattern.charAt(pos + 1) != ']' =>
+              pos += 1
+              classAtom() match
+                case Right(hi) => CharRanges.range(lo, hi)
+                case Left(_) => unsupported("predefined class used as a range bound")
+            case Right(c) => CharRanges.of(c)
+      if negated then set.complement else set
+
+    private def classAtom(): Either[CharRanges, Int] = next() match
+      case '\\' =>
+        if atEnd then unsupported("trailing backslash")
+        next() match
+          case c @ ('d' | 'D' | 's' | 'S' | 'w' | 'W') => Left(escapedSet(c))
+          case 'Q' => unsupported("quoting inside character classes")
+          case c => Right(escapedChar(c))
+      case c => Right(c.toInt)
+
+    private def escapedSet(c: Char): CharRanges = c match
+      case 'd' => CharRanges.Digit
+      case 'D' => CharRanges.Digit.complement
+      case 's' => CharRanges.Space
+      case 'S' => CharRanges.Space.complement
+      case 'w' => CharRanges.Word
+      case 'W' => CharRanges.Word.complement
+      case c => CharRanges.of(escapedChar(c))
+
+    private def escapedChar(c: Char): Int = c match
+      case 't' => '\t'
+      case 'n' => '\n'
+      case 'r' => '\r'
+      case 'f' => '\f'
+      case 'a' => '\u0007'
+      case 'e' => '\u001b'
+      case '0' => digits(8, if !atEnd && peek <= '3' then 3 else 2, exact = false)
+      case 'x' if accept('{') =>
+        val value = digits(16, 6, exact = false)
+        if !accept('}') || value > CharRanges.MaxChar then unsupported("supplementary code points")
+        value
+      case 'x' => digits(16, 2, exact = true)
+      case 'u' => digits(16, 4, exact = true)
+      case 'c' if !atEnd => next() ^ 64
+      case c if c.isLetterOrDigit => unsupported(s"escape sequence \\$c")
+      case c => c
+
+    private def digits(radix: Int, count: Int, exact: Boolean): Int =
+      val start = pos
+      while !atEnd && pos - start < count && Character.digit(peek, radix) >= 0 do pos += 1
+      if start == pos || exact && pos - start != count then unsupported("malformed numeric escape or repetition")
+      Integer.parseInt(pattern.substring(start, pos), radix)
+
+/**
+ * Exception thrown when a token pattern cannot be compiled into a deterministic automaton.
+ *
+ * @param pattern the offending pattern
+ * @param reason the construct that is not supported
+ */
+private[alpaca] final class UnsupportedPatternException(
+  pattern: String,
+  reason: String,
+)(using @constructorOnly log: Log,
+) extends AlpacaException(show"Pattern $pattern cannot be compiled into an automaton: $reason")
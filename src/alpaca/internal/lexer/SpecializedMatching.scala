@@ -0,0 +1,55 @@
+package alpaca
+package internal
+package lexer
+
+/**
+ * A marker trait for contexts whose lexer handles matches with code generated for its tokens.
+ *
+ * By default every match goes through the [[OnTokenMatch]] of the context, which calls the
+ * context update and the value of whatever token matched through the same function objects.
+ * When the context of a `lexer` mixes this trait in, the macro generates a [[MatchHandler]] instead,
+ * with a branch per token selected by a `@switch` on its index. Each branch calls the [[OnTokenMatch]]
+ * instances of the parents of the context, the context update and the value of its own token,
+ * and builds the lexeme from the fields of the context directly, so the JIT sees a single target
+ * at every call site. The branches are split into handlers of [[MatchHandler.ChunkSize]] tokens each,
+ * so the generated methods stay small enough to be compiled however many tokens the lexer has.
+ *
+ * The handler replaces the [[OnTokenMatch]] derived for the context, so a context mixing this trait in
+ * cannot define its own; define it for a trait the context extends instead. A hook passed to `lexer`
+ * explicitly is run instead of the handler.
+ */
+trait SpecializedMatching:
+  this: LexerCtx =>
+
+/**
+ * Handles a match of one of the tokens of a lexer like the [[OnTokenMatch]] derived for its context.
+ *
+ * @tparam Ctx the global context type
+ */
+private[alpaca] trait MatchHandler[Ctx <: LexerCtx]:
+
+  /**
+   * Updates the context for a match and creates its lexeme.
+   *
+   * @param tokens the tokens of the lexer
+   * @param index the index of the matched token in `tokens`
+   * @param raw the matched text
+   * @param ctx the lexer context
+   * @return the lexeme of a defined token, or null if the token is ignored
+   */
+  def apply(tokens: Array[Token[?, Ctx, ?]], index: Int, raw: String, ctx: Ctx): Lexeme[?, ?] | Null
+
+private[alpaca] object MatchHandler:
+
+  /** The number of tokens handled by each generated handler. */
+  final val ChunkSize = 16
+
+  /**
+   * Combines the handlers of consecutive chunks of [[ChunkSize]] tokens into one.
+   *
+   * @param chunks the handlers of the chunks, in the order of their tokens
+   * @return a handler that calls the one of the chunk of the matched token
+   */
+  def chunked[Ctx <: LexerCtx](chunks: Array[MatchHandler[Ctx]]): MatchHandler[Ctx] =
+    if chunks.length == 1 then chunks(0)
+    else (tokens, index, raw, ctx) => chunks(index / ChunkSize)(tokens, index, raw, ctx)
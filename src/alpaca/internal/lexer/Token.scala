@@ -5,6 +5,7 @@ package lexer
 import java.util.concurrent.atomic.AtomicInteger
 import scala.annotation.unchecked.uncheckedVariance as uv
 import scala.annotation.{compileTimeOnly, publicInBinary, unused}
+import scala.util.control.NonFatal
 
 /**
  * Type alias for context manipulation functions.
@@ -15,6 +16,9 @@ import scala.annotation.{compileTimeOnly, publicInBinary, unused}
  */
 private[lexer] type CtxManipulation[Ctx <: LexerCtx] = Ctx => Unit
 
+/** The context manipulation of tokens defined without a block, which leaves the context as it is. */
+private[lexer] val NoCtxManipulation: CtxManipulation[LexerCtx] = _ => ()
+
 /**
  * Information about a token definition.
  *
@@ -23,9 +27,17 @@ private[lexer] type CtxManipulation[Ctx <: LexerCtx] = Ctx => Unit
  * @param name the token name
  * @param regexGroupName a unique name for the regex capture group
  * @param pattern the regex pattern that matches this token
+ * @param literal the only text the pattern matches, or null if it is not a fixed string
+ * @param keyword whether the token is a keyword, recognized by the text another token matched
  */
 //todo: should it contain info about ignored? for perf? https://github.com/halotukozak/alpaca/issues/231
-private[lexer] final case class TokenInfo(name: String, regexGroupName: String, pattern: String)
+private[lexer] final case class TokenInfo(
+  name: String,
+  regexGroupName: String,
+  pattern: String,
+  literal: String | Null = null,
+  keyword: Boolean = false,
+)
 
 private[lexer] object TokenInfo:
   private val counter = AtomicInteger(0)
@@ -47,7 +59,7 @@ private[lexer] object TokenInfo:
     ValidName.check(name)
     (
       ConstantType(StringConstant(name)).asType.asInstanceOf[Type[? <: ValidName]],
-      TokenInfo(name, nextRegexGroupName(), pattern),
+      TokenInfo(name, nextRegexGroupName(), pattern, literalOf(pattern)),
     )
 
   /**
@@ -57,13 +69,23 @@ private[lexer] object TokenInfo:
    */
   private def nextRegexGroupName(): String = s"token${counter.getAndIncrement()}"
 
+  // the pattern has not been validated yet, an invalid one is reported by the lexer macro
+  private def literalOf(pattern: String)(using Log): String | Null =
+    try RegexAst.literal(RegexAst.parse(pattern))
+    catch case NonFatal(_) => null
+
   given Default[TokenInfo] = () => TokenInfo("", "", "")
 
   given Showable[TokenInfo] = Showable.fromToString
 
   given ToExpr[TokenInfo]:
     def apply(x: TokenInfo)(using Quotes): Expr[TokenInfo] =
-      '{ TokenInfo(${ Expr(x.name) }, ${ Expr(x.regexGroupName) }, ${ Expr(x.pattern) }) }
+      val literal: Expr[String | Null] = x.literal match
+        case null => '{ null }
+        case text: String => Expr(text)
+      '{
+        TokenInfo(${ Expr(x.name) }, ${ Expr(x.regexGroupName) }, ${ Expr(x.pattern) }, $literal, ${ Expr(x.keyword) })
+      }
 // $COVERAGE-ON$
 /**
  * Base trait for all token types.
@@ -103,6 +125,9 @@ private[alpaca] final case class DefinedToken[Name <: ValidName, +Ctx <: LexerCt
   private[lexer] ctxManipulation: CtxManipulation[Ctx @uv],
   private[lexer] remapping: (Ctx @uv) => Value,
 ) extends Token[Name, Ctx, Value]:
+  /** The id of the token name in [[TokenIds]], interned once per lexer rather than per match. */
+  private[alpaca] val id: Int = TokenIds.of(info.name)
+
   type LexemeTpe <: Lexeme[Name, Value @uv] // & LexemeRefinement
 
   @compileTimeOnly(RuleOnly)
@@ -0,0 +1,36 @@
+package alpaca
+package internal
+package lexer
+
+import java.util.concurrent.ConcurrentHashMap
+import java.util.concurrent.atomic.AtomicInteger
+
+/**
+ * A process-wide registry of dense integer ids for token names.
+ *
+ * Lexers and parsers are compiled independently of each other, so an id space
+ * fixed by one macro expansion could not be shared with another. Instead, every
+ * token name is interned here the first time a lexer or a parse table is loaded.
+ * Equal names always get the same id, which lets the parser translate the id of
+ * a [[Lexeme]] to its table column with a single array read.
+ *
+ * Ids are assigned consecutively starting at 0, which is reserved for the end of input.
+ */
+private[alpaca] object TokenIds:
+  /** The id of the end-of-input token `$`. */
+  final val EOF = 0
+
+  private val ids = new ConcurrentHashMap[String, Integer]
+  private val counter = AtomicInteger(EOF + 1)
+  ids.put("$", EOF)
+
+  /**
+   * Returns the id of a token name, assigning a new one if the name is seen for the first time.
+   *
+   * @param name the token name
+   * @return the id of the name
+   */
+  def of(name: String): Int = ids.computeIfAbsent(name, _ => counter.getAndIncrement()).intValue
+
+  /** The number of ids assigned so far; every id is smaller than this. */
+  def count: Int = counter.get
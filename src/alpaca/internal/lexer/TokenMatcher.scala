@@ -0,0 +1,229 @@
+package alpaca
+package internal
+package lexer
+
+import java.util.BitSet
+import java.util.regex.Pattern
+import scala.util.boundary
+import scala.util.boundary.break
+
+/**
+ * Finds the token at the beginning of the remaining input.
+ *
+ * A matcher is stateful and belongs to a single tokenization run.
+ *
+ * @tparam Ctx the global context type
+ */
+private[lexer] trait TokenMatcher[Ctx <: LexerCtx]:
+
+  /**
+   * Tries to match a token at the very beginning of `text`.
+   *
+   * @param text the remaining input
+   * @return true if a token matched; [[index]], [[token]] and [[end]] then describe the match
+   */
+  def lookingAt(text: CharSequence): Boolean
+
+  /** The index in the tokens of the lexer of the token of the last successful [[lookingAt]]. */
+  def index: Int
+
+  /** The token of the last successful [[lookingAt]]. */
+  def token: Token[?, Ctx, ?]
+
+  /** The end offset of the last successful [[lookingAt]]. */
+  def end: Int
+
+  /**
+   * Whether the last [[lookingAt]] or [[find]] looked at the end of the text,
+   * so that more text could change its result.
+   *
+   * @return true if the result of the last [[lookingAt]] or [[find]] depends on what follows the text
+   */
+  def hitEnd: Boolean
+
+  /**
+   * Finds the first offset in `text` at which some token matches.
+   *
+   * @param text the remaining input
+   * @return the offset, or -1 if no token matches anywhere
+   */
+  def find(text: CharSequence): Int
+
+/**
+ * A matcher backed by the alternation of all token patterns.
+ *
+ * Before the alternation, the first character of the text is looked up in `dispatch`.
+ * Its literal tokens are tried in the order of the alternation, and the first one the text
+ * starts with wins, as it would in the alternation. If none does, the token with another
+ * pattern that comes next in the alternation is tried if it matches a [[CharRun]]. When
+ * neither matches, or the character has no entry, the alternation is matched.
+ *
+ * @param pattern the compiled alternation, with one named group per token
+ * @param tokens the tokens of the lexer
+ * @param groupToIndex the index in `tokens` of the token of every top-level named group, indexed by group number
+ * @param dispatch the tokens to try first, indexed by the first character of the text
+ */
+private[lexer] final class RegexTokenMatcher[Ctx <: LexerCtx](
+  pattern: Pattern,
+  tokens: Array[Token[?, Ctx, ?]],
+  groupToIndex: Array[Int],
+  dispatch: Array[CharDispatch] = Array.empty,
+) extends TokenMatcher[Ctx]:
+  private val matcher = pattern.matcher("")
+  private var found = -1
+  private var dispatchedEnd = -1
+  private var dispatchedHitEnd = false
+
+  override def lookingAt(text: CharSequence): Boolean =
+    dispatchedEnd = -1
+    dispatchedHitEnd = false
+    lookingAtDispatched(text) || {
+      matcher.reset(text)
+      matcher.lookingAt && {
+        found = boundary:
+          for i <- 1 to matcher.groupCount if matcher.start(i) != -1 do break(groupToIndex(i))
+          throw AlgorithmError(s"${matcher.pattern} matched but no token defined for it")
+        true
+      }
+    }
+
+  override def index: Int = found
+
+  override def token: Token[?, Ctx, ?] = tokens(found)
+
+  override def end: Int = if dispatchedEnd >= 0 then dispatchedEnd else matcher.end
+
+  override def hitEnd: Boolean = if dispatchedEnd >= 0 then dispatchedHitEnd else matcher.hitEnd
+
+  private def lookingAtDispatched(text: CharSequence): Boolean =
+    if text.length == 0 || text.charAt(0) >= dispatch.length then false
+    else
+      val entry = dispatch(text.charAt(0))
+      boundary:
+        for candidate <- entry.literals do
+          val literal = tokens(candidate).info.literal.nn
+          val common = commonPrefix(text, literal)
+          if common == literal.length then
+            found = candidate
+            dispatchedEnd = common
+            break(true)
+          // an earlier token cut off by the end of the text could still match with more text
+          if common == text.length then dispatchedHitEnd = true
+        val run = entry.run
+        if run == null then false
+        else
+          val runEnd = run.end(text)
+          if runEnd >= 0 then
+            found = run.index
+            dispatchedEnd = runEnd
+            dispatchedHitEnd ||= runEnd == text.length && run.extendable
+          runEnd >= 0
+
+  private def commonPrefix(text: CharSequence, literal: String): Int =
+    val limit = math.min(text.length, literal.length)
+    var i = 0
+    while i < limit && text.charAt(i) == literal.charAt(i) do i += 1
+    i
+
+  override def find(text: CharSequence): Int =
+    dispatchedEnd = -1
+    matcher.reset(text)
+    if matcher.find then matcher.start else -1
+
+/**
+ * The tokens a [[RegexTokenMatcher]] tries first for some first character of the text.
+ *
+ * @param literals the indices of the literal tokens that can start with the character, in the order of the alternation
+ * @param run the token to try after them, or null if the regex has to be matched
+ */
+private[lexer] final class CharDispatch(val literals: Array[Int], val run: CharRun | Null)
+
+/**
+ * A token whose pattern matches one character from each of some classes,
+ * followed by the longest run of characters from another class, like `\\s+` or `//[^\\n]*`.
+ *
+ * Such a match needs no backtracking, so it is found with one lookup per character.
+ *
+ * @param index the index of the token in the tokens of the lexer
+ * @param head the classes of the leading characters
+ * @param tail the class of the run, empty if there is none
+ */
+private[lexer] final class CharRun(val index: Int, head: Array[BitSet], tail: BitSet):
+
+  /** Whether more text can extend a match that reaches the end of the text. */
+  def extendable: Boolean = !tail.isEmpty
+
+  /**
+   * Matches the token at the beginning of the text.
+   *
+   * @param text the remaining input
+   * @return the end offset of the match, or -1 if the token does not match
+   */
+  def end(text: CharSequence): Int =
+    var end = 0
+    while end < head.length && end < text.length && head(end).get(text.charAt(end)) do end += 1
+    if end < head.length then -1
+    else
+      while end < text.length && tail.get(text.charAt(end)) do end += 1
+      end
+
+private[lexer] object CharRun:
+  /**
+   * Decodes the runs produced by the lexer macro.
+   *
+   * For every token, the encoding holds its index, the number of head classes, then every
+   * head class and the tail class, each as the number of ranges followed by inclusive `lo, hi` pairs.
+   *
+   * @param encoded the encoded runs
+   * @return the runs, by the index of their token
+   */
+  def decode(encoded: Array[Int]): Map[Int, CharRun] =
+    val ints = encoded.iterator
+    def chars(): BitSet =
+      val set = BitSet()
+      for _ <- 0 until ints.next() do set.set(ints.next(), ints.next() + 1)
+      set
+    Iterator
+      .continually(ints)
+      .takeWhile(_.hasNext)
+      .map: _ =>
+        val index = ints.next()
+        val head = Array.fill(ints.next())(chars())
+        index -> CharRun(index, head, chars())
+      .toMap
+
+/**
+ * A matcher backed by a [[Dfa]] compiled from all token patterns.
+ *
+ * @param dfa the automaton
+ * @param tokens the tokens, indexed by the accepting token numbers of the automaton
+ */
+private[lexer] final class DfaTokenMatcher[Ctx <: LexerCtx](
+  dfa: Dfa,
+  tokens: Array[Token[?, Ctx, ?]],
+) extends TokenMatcher[Ctx]:
+  private var matched: Long = Dfa.NoMatch
+  private var text: CharSequence = ""
+  private var tried: Int = 0 // the number of offsets of `text` the last lookingAt or find tried to match at
+
+  override def lookingAt(text: CharSequence): Boolean =
+    this.text = text
+    tried = 1
+    matched = dfa.matchAt(text, 0)
+    matched != Dfa.NoMatch
+
+  override def index: Int = Dfa.token(matched)
+
+  override def token: Token[?, Ctx, ?] = tokens(index)
+
+  override def end: Int = Dfa.end(matched)
+
+  override def hitEnd: Boolean = (0 until tried).exists(dfa.reachesEnd(text, _))
+
+  override def find(text: CharSequence): Int =
+    this.text = text
+    val found = boundary:
+      for from <- 0 until text.length if dfa.matchAt(text, from) != Dfa.NoMatch do break(from)
+      -1
+    tried = if found == -1 then text.length + 1 else found + 1
+    found
@@ -4,11 +4,12 @@ package lexer
 
 import alpaca.internal.lexer.ErrorHandling.Strategy
 
+import java.nio.charset.{Charset, CharsetDecoder, CoderResult, CodingErrorAction, StandardCharsets}
+import java.nio.{ByteBuffer, CharBuffer}
 import scala.NamedTuple.{AnyNamedTuple, NamedTuple}
-import scala.annotation.publicInBinary
-import scala.collection.mutable
-import scala.util.boundary
-import scala.util.boundary.break
+import scala.annotation.{publicInBinary, unused}
+import scala.concurrent.duration.Duration
+import scala.concurrent.{Await, ExecutionContext, Future}
 
 /**
  * The result of compiling a lexer definition.
@@ -53,69 +54,727 @@ transparent abstract class Tokenization[Ctx <: LexerCtx](
    * @return a tuple of (ctx, lexemes) where ctx is the final lexer context and lexemes is the list of matched tokens
    */
   final def tokenize(input: CharSequence): (ctx: Ctx, lexemes: List[Lexeme]) =
-    val globalCtx = empty()
-    globalCtx.text = OffsetCharSequence(input)
-
-    val matcher = compiled.matcher(globalCtx.text)
-    val acc = mutable.ListBuffer.empty[Lexeme]
-
-    while !globalCtx.text.isEmpty do
-      matcher.reset(globalCtx.text)
-
-      // noinspection ScalaUnreachableCode
-      val (token, matched) = if matcher.lookingAt then
-        val matched = matcher.group(0)
-        globalCtx.lastRawMatched = matched
-        globalCtx.text = globalCtx.text.from(matcher.end)
-
-        val found = boundary:
-          for i <- 1 to matcher.groupCount if matcher.start(i) != -1 do break(groupToTokenMap(i))
-          throw AlgorithmError(s"${matcher.pattern} matched but no token defined for it")
-
-        (found, matched)
-      else
-        errorHandling(globalCtx) match
-          case Strategy.Throw(ex) =>
-            throw ex
-
-          case Strategy.IgnoreToken if matcher.find =>
-            val firstMatching = matcher.start
-            val matched = globalCtx.text.subSequence(0, firstMatching).toString
-            globalCtx.lastRawMatched = matched
-            globalCtx.text = globalCtx.text.from(firstMatching)
-            (RecoveredToken(matched), matched)
-
-          case Strategy.IgnoreChar | Strategy.IgnoreToken =>
-            val matched = globalCtx.text.charAt(0).toString
-            globalCtx.lastRawMatched = matched
-            globalCtx.text = globalCtx.text.from(1)
-            (RecoveredToken(matched), matched)
-
-          case Strategy.Stop =>
-            globalCtx.text = ""
-            (null, null)
-
-      if token != null && matched != null then
-        betweenStages(token, matched, globalCtx)
-        if token.isInstanceOf[DefinedToken[?, Ctx, ?]] then acc.addOne(globalCtx.lastLexeme.nn.asInstanceOf[Lexeme])
-
-    (globalCtx, acc.toList)
+    val iterator = tokenizeIterator(input)
+    val lexemes = iterator.toList
+    (iterator.ctx, lexemes)
+
+  /**
+   * Tokenizes ASCII bytes without decoding them to chars.
+   *
+   * The bytes between the position and the limit of the buffer are read in place, one char
+   * per byte, so a heap, direct or memory-mapped buffer is never copied as a whole. Only lexers
+   * whose context mixes in [[AsciiMatching]], checked to match nothing but ASCII, accept bytes.
+   *
+   * @param input the bytes to tokenize, left unmodified
+   * @return a tuple of (ctx, lexemes) where ctx is the final lexer context and lexemes is the list of matched tokens
+   */
+  final def tokenizeBytes(input: ByteBuffer)(using @unused ascii: Ctx <:< AsciiMatching)
+    : (ctx: Ctx, lexemes: List[Lexeme]) = tokenize(AsciiBytes(input))
+
+  /**
+   * Tokenizes ASCII bytes without decoding them to chars.
+   *
+   * @param input the bytes to tokenize
+   * @return a tuple of (ctx, lexemes) where ctx is the final lexer context and lexemes is the list of matched tokens
+   */
+  final def tokenizeBytes(input: Array[Byte])(using @unused ascii: Ctx <:< AsciiMatching)
+    : (ctx: Ctx, lexemes: List[Lexeme]) = tokenize(AsciiBytes(ByteBuffer.wrap(input)))
+
+  /**
+   * Tokenizes the input character sequence in chunks, in parallel.
+   *
+   * The input is split into chunks of roughly `chunkSize` characters, each ending right
+   * after a `boundary` character, and every chunk is tokenized with [[tokenize]] on the
+   * given executor. The lexemes are concatenated in order, and the `offset`, `line` and `position`
+   * fields of their snapshots, as well as of the returned context, are rebased as if the
+   * input had been tokenized at once.
+   *
+   * This is only sound if no token can match text that continues past the boundary, which is
+   * checked against the patterns analysed by the `lexer` macro. For example, `'\n'` is a valid
+   * boundary for a lexer that matches newlines with a separate `"\n"` token, but not for one
+   * that ignores whitespace with `"\\s+"`.
+   *
+   * @note Every chunk starts with an empty context, so state other than `offset`, `line` and `position`
+   *       is not carried over from one chunk to the next, and error handling applies to each chunk
+   *       on its own. Position is rebased only for contexts that also track lines.
+   *       Inputs consumed while being read, i.e. [[LazyReader]] and [[MappedInput]], are tokenized sequentially.
+   * @param input the input to tokenize
+   * @param boundary the character after which the input may be split
+   * @param chunkSize the minimal number of characters in a chunk
+   * @param executor the executor running the chunks
+   * @return a tuple of (ctx, lexemes) where ctx is the final lexer context and lexemes is the list of matched tokens
+   * @throws IllegalArgumentException if a token can span the boundary or the chunk size is not positive
+   */
+  final def tokenizeParallel(
+    input: CharSequence,
+    boundary: Char = '\n',
+    chunkSize: Int = Tokenization.DefaultChunkSize,
+    executor: ExecutionContext = ExecutionContext.global,
+  ): (ctx: Ctx, lexemes: List[Lexeme]) =
+    require(chunkSize > 0, s"Chunk size must be positive, got $chunkSize")
+    require(
+      !Tokenization.contains(innerChars, boundary),
+      f"Cannot split after U+${boundary.toInt}%04X, some token can match text that continues past it",
+    )
+    input match
+      case _: LazyReader | _: MappedInput => tokenize(input)
+      case _ if input.length <= chunkSize => tokenize(input)
+      case _ =>
+        given ExecutionContext = executor
+        val chunks = Tokenization.split(input, boundary, chunkSize)
+        val results = Await.result(Future.traverse(chunks)(chunk => Future(tokenize(chunk))), Duration.Inf)
+        stitch(results)
+
+  /**
+   * Concatenates the results of consecutive chunks, rebasing their offset, line and position snapshots.
+   *
+   * A local offset `o` of a chunk is `o` plus the offset the chunk starts at.
+   * A local line `l` of a chunk starting at `(line, position)` is `l + line - 1`, and a local position `p`
+   * is `p + position - 1` until the first newline of the chunk, after which it is already absolute.
+   */
+  private def stitch(results: List[(ctx: Ctx, lexemes: List[Lexeme])]): (ctx: Ctx, lexemes: List[Lexeme]) =
+    val lexemes = List.newBuilder[Lexeme]
+    var offset = 0
+    var line = 1
+    var position = 1
+
+    results.foreach: result =>
+      result.ctx match
+        case tracked: OffsetTracking =>
+          result.lexemes.foreach: lexeme =>
+            val offsetIndex = lexeme.fieldNames.indexOf("offset")
+            if offsetIndex >= 0 then
+              lexeme.fieldValues(offsetIndex) = lexeme.fieldValues(offsetIndex).asInstanceOf[Int] + offset
+          tracked.offset += offset
+          offset = tracked.offset
+        case _ => ()
+
+      result.ctx match
+        case tracked: LineTracking =>
+          result.lexemes.foreach: lexeme =>
+            val lineIndex = lexeme.fieldNames.indexOf("line")
+            val positionIndex = lexeme.fieldNames.indexOf("position")
+            if lineIndex >= 0 then
+              val localLine = lexeme.fieldValues(lineIndex).asInstanceOf[Int]
+              lexeme.fieldValues(lineIndex) = localLine + line - 1
+              if positionIndex >= 0 && localLine == 1 then
+                lexeme.fieldValues(positionIndex) = lexeme.fieldValues(positionIndex).asInstanceOf[Int] + position - 1
+            lexemes += lexeme
+
+          val localLine = tracked.line
+          tracked.line = localLine + line - 1
+          line = tracked.line
+          tracked match
+            case positioned: PositionTracking =>
+              if localLine == 1 then positioned.position += position - 1
+              position = positioned.position
+            case _ => ()
+        case _ => lexemes ++= result.lexemes
+
+    val all = lexemes.result()
+    val ctx = results.last.ctx
+    if ctx.lastLexeme == null && all.nonEmpty then ctx.lastLexeme = all.last
+    (ctx, all)
+
+  /**
+   * Tokenizes the input character sequence lazily.
+   *
+   * Lexemes are matched on demand, one `next` at a time, with the same
+   * `OnTokenMatch` and `ErrorHandling` semantics as [[tokenize]]. Combined with
+   * a [[LazyReader]] this consumes arbitrarily large inputs with bounded memory,
+   * as neither the consumed text nor the produced lexemes are retained.
+   *
+   * @param input the input to tokenize
+   * @return an iterator over the matched lexemes that also exposes the lexer context
+   */
+  final def tokenizeIterator(input: CharSequence): LexemeIterator = new LexemeIterator(input)
+
+  /**
+   * Tokenizes the input character sequence, keeping what [[relex]] needs to update the result after edits.
+   *
+   * The input is tokenized line by line, recording a snapshot of the context at the start
+   * of every line. This requires that no token can match text that continues past a newline.
+   *
+   * @param input the input to tokenize
+   * @return the lexemes and the final context, which can be updated with [[relex]]
+   * @throws IllegalArgumentException if a token can span a newline
+   */
+  final def tokenizeIncremental(input: CharSequence)(using Copyable[Ctx]): IncrementalTokens =
+    requireLineSplittable()
+    val lines = Vector.newBuilder[Line]
+    var ctx = empty()
+    Tokenization
+      .lines(input.toString, last = true)
+      .foreach: text =>
+        val (line, end) = lexLine(text, ctx)
+        lines += line
+        ctx = end
+    val tree = lineTree(lines.result())
+    new IncrementalTokens(tree, ctx, (start = 0, removed = 0, inserted = tree.count))
+
+  /**
+   * Updates a previous result of [[tokenizeIncremental]] after an edit of its input.
+   *
+   * Tokenization restarts at the beginning of the first edited line, from the context
+   * snapshot taken there, and stops at the first following line whose start context equals
+   * the old one; the rest of the old result is reused as is. The lines are kept in a balanced tree
+   * indexed by their offsets, so the work done is proportional to the size of the edit and only
+   * logarithmic in the size of the document. Reading [[IncrementalTokens.lexemes]] walks the whole result.
+   *
+   * @note A context that tracks lines only re-synchronises if the edit keeps the number of lines,
+   *       and one that tracks offsets only if it keeps the length of the input,
+   *       otherwise every following line is tokenized again.
+   * @param previous the result to update
+   * @param offset the offset of the edit in the previous input
+   * @param removed the number of characters removed at the offset
+   * @param inserted the text inserted at the offset
+   * @return the lexemes and the final context of the edited input, with the lexemes the edit replaced
+   * @throws IllegalArgumentException if the edit is out of the bounds of the previous input
+   */
+  final def relex(
+    previous: IncrementalTokens,
+    offset: Int,
+    removed: Int,
+    inserted: CharSequence,
+  )(using Copyable[Ctx],
+  ): IncrementalTokens =
+    val lines = previous.lines
+    val end = offset + removed
+    require(
+      offset >= 0 && removed >= 0 && end <= lines.length,
+      s"Invalid edit: offset=$offset, removed=$removed, length=${lines.length}",
+    )
+
+    val first = lines.locate(offset)
+    val last = lines.locate(end)
+    val edited = lines(first.index).text.substring(0, offset - first.start).nn +
+      inserted.toString + lines(last.index).text.substring(end - last.start).nn
+
+    val relexed = Vector.newBuilder[Line]
+    var ctx = lines(first.index).start
+    Tokenization
+      .lines(edited, last = last.index == lines.size - 1)
+      .foreach: text =>
+        val (line, lineEnd) = lexLine(text, ctx)
+        relexed += line
+        ctx = lineEnd
+
+    var next = last.index + 1
+    while next < lines.size && lines(next).start != ctx do
+      val (line, lineEnd) = lexLine(lines(next).text, ctx)
+      relexed += line
+      ctx = lineEnd
+      next += 1
+
+    val replaced = lineTree(relexed.result())
+    val start = lines.countBefore(first.index)
+    new IncrementalTokens(
+      lines.take(first.index) ++ replaced ++ lines.drop(next),
+      if next < lines.size then previous.ctx else ctx,
+      (start = start, removed = lines.countBefore(next) - start, inserted = replaced.count),
+    )
+
+  /**
+   * The result of [[tokenizeIncremental]] or [[relex]].
+   *
+   * @param lines the tokenized lines of the input
+   * @param ctx the final lexer context
+   * @param edit the lexemes of the previous result replaced by this one: from the index `start`,
+   *             `removed` lexemes were replaced by `inserted` new ones, and all others are the same instances.
+   *             A result of [[tokenizeIncremental]] replaced no lexemes with all of its own.
+   */
+  final class IncrementalTokens private[Tokenization] (
+    private[Tokenization] val lines: LineTree[Line],
+    val ctx: Ctx,
+    val edit: (start: Int, removed: Int, inserted: Int),
+  ):
+
+    /** The matched lexemes of the whole input. */
+    def lexemes: List[Lexeme] = lines.iterator.flatMap(_.lexemes).toList
+
+    /** The tokenized input. */
+    def text: String = lines.iterator.map(_.text).mkString
+
+    /** The number of characters in the tokenized input. */
+    def length: Int = lines.length
+
+  /**
+   * A line of an incrementally tokenized input.
+   *
+   * @param text the text of the line, including its newline unless it is the last one
+   * @param start a snapshot of the context before the line
+   * @param lexemes the lexemes matched in the line
+   */
+  private[Tokenization] final class Line(val text: String, val start: Ctx, val lexemes: List[Lexeme])
+
+  private def lexLine(text: String, start: Ctx)(using copy: Copyable[Ctx]): (line: Line, end: Ctx) =
+    val iterator = new LexemeIterator(text, copy(start))
+    val lexemes = iterator.toList
+    (line = Line(text, start, lexemes), end = iterator.ctx)
+
+  private def lineTree(lines: Vector[Line]): LineTree[Line] = LineTree.from(lines)(_.text.length, _.lexemes.length)
+
+  private def requireLineSplittable(): Unit =
+    require(
+      !Tokenization.contains(innerChars, '\n'),
+      "Cannot tokenize incrementally, some token can match text that continues past a newline",
+    )
+
+  /**
+   * Creates a session that tokenizes many inputs, one at a time, reusing its buffers.
+   *
+   * @return a new session, to be used by a single thread
+   */
+  final def session(): Session = new Session
+
+  /**
+   * Runs an action with a session taken from a pool kept by this lexer, creating one if none is free.
+   *
+   * The session is returned to the pool afterwards, so sessions outlive the tasks and threads that use them.
+   *
+   * @param action the action using the session
+   * @return the result of the action
+   */
+  private[alpaca] def withPooledSession[A](action: Session => A): A =
+    val pooled = sessionPool.poll()
+    val session = if pooled == null then new Session else pooled
+    try action(session)
+    finally sessionPool.offer(session)
+
+  private lazy val sessionPool = new java.util.concurrent.ConcurrentLinkedQueue[Session]
+
+  /**
+   * A reusable tokenizer for many small inputs.
+   *
+   * The token matcher and the wrapper advancing over the input are allocated once and
+   * reset for every input, instead of once per [[tokenize]] call. The context is still
+   * created for every input, as it is returned to the caller.
+   *
+   * A session is not thread-safe; use one per thread.
+   */
+  final class Session private[Tokenization]:
+    private val matcher = newMatcher()
+    private val text = OffsetCharSequence("")
+
+    /**
+     * Tokenizes the input like [[Tokenization.tokenize]].
+     *
+     * @param input the input to tokenize
+     * @return a tuple of (ctx, lexemes) where ctx is the final lexer context and lexemes is the list of matched tokens
+     */
+    def tokenize(input: CharSequence): (ctx: Ctx, lexemes: List[Lexeme]) =
+      val iterator = input match
+        case _: LazyReader | _: MappedInput => new LexemeIterator(input, empty(), matcher)
+        case _ => new LexemeIterator(text.reset(input), empty(), matcher)
+      val lexemes = iterator.toList
+      text.reset("") // do not retain the input
+      (iterator.ctx, lexemes)
+
+  /**
+   * Creates a lexer that is fed the input chunk by chunk, e.g. as it arrives from the network.
+   *
+   * @param charset the encoding of the byte chunks
+   * @return a new push lexer
+   */
+  final def pushLexer(charset: Charset = StandardCharsets.UTF_8): PushLexer = new PushLexer(charset)
+
+  /**
+   * A lexer that is pushed the input in chunks instead of pulling it.
+   *
+   * Every call to [[feed]] returns the lexemes that are complete so far. A token is complete once
+   * the matcher has decided on it without looking at the end of the buffered input, as more input
+   * could still extend it or select another token. Likewise, unexpected input is only handed to the
+   * error handling once the next match after it is found without looking at the end. Only the text of
+   * such partial tokens is kept between chunks, so the whole input is never buffered. [[end]] then
+   * tokenizes whatever is left.
+   *
+   * @param charset the encoding of the byte chunks
+   */
+  final class PushLexer private[Tokenization] (charset: Charset):
+
+    /** The lexer context, reflecting the input consumed so far. */
+    val ctx: Ctx = empty()
+
+    private val matcher = newMatcher()
+    private val buffer = new java.lang.StringBuilder
+    private val decoder: CharsetDecoder = charset.newDecoder
+      .onMalformedInput(CodingErrorAction.REPORT)
+      .onUnmappableCharacter(CodingErrorAction.REPORT)
+    private var carry: ByteBuffer = ByteBuffer.allocate(0)
+    private var stopped = false
+
+    /**
+     * Appends a chunk of text to the input.
+     *
+     * @param chunk the next chunk
+     * @return the lexemes completed by the chunk
+     */
+    def feed(chunk: CharSequence): List[Lexeme] =
+      buffer.append(chunk)
+      drain(last = false)
+
+    /**
+     * Appends a chunk of encoded text to the input.
+     *
+     * A character split between two chunks is decoded once its last byte arrives.
+     *
+     * @param chunk the next chunk, consumed by this call
+     * @return the lexemes completed by the chunk
+     */
+    def feed(chunk: ByteBuffer): List[Lexeme] =
+      val in =
+        if carry.hasRemaining then ByteBuffer.allocate(carry.remaining + chunk.remaining).put(carry).put(chunk).flip()
+        else chunk
+      val out = CharBuffer.allocate((in.remaining * decoder.maxCharsPerByte).ceil.toInt + 1)
+      check(decoder.decode(in, out, false))
+      carry = ByteBuffer.allocate(in.remaining).put(in).flip()
+      feed(out.flip())
+
+    /**
+     * Marks the end of the input.
+     *
+     * @return the remaining lexemes
+     */
+    def end(): List[Lexeme] =
+      val out = CharBuffer.allocate((carry.remaining * decoder.maxCharsPerByte).ceil.toInt + 1)
+      check(decoder.decode(carry, out, true))
+      check(decoder.flush(out))
+      buffer.append(out.flip())
+      drain(last = true)
+
+    private def drain(last: Boolean): List[Lexeme] =
+      val lexemes = List.newBuilder[Lexeme]
+      if !stopped then
+        val window = OffsetCharSequence(buffer)
+        ctx.text = window
+        var complete = true
+        while complete && !ctx.text.isEmpty do
+          val matched = matcher.lookingAt(ctx.text)
+          // without a match, recovering looks for the next one, which more input could move as well
+          complete = last || !matcher.hitEnd && (matched || matcher.find(ctx.text) != -1 && !matcher.hitEnd)
+          if complete then
+            val lexeme = step(ctx, matcher, matched)
+            if lexeme != null then lexemes += lexeme
+        stopped = ctx.text ne window // Strategy.Stop drops the rest of the input
+        buffer.delete(0, buffer.length - ctx.text.length)
+      lexemes.result()
+
+    private def check(result: CoderResult): Unit = if result.isError then result.throwException()
+
+  /**
+   * A pull-based iterator over the lexemes of an input.
+   *
+   * @param input the input to tokenize
+   * @param ctx the lexer context, reflecting the input consumed so far
+   * @param matcher the token matcher, used by this iterator only
+   */
+  final class LexemeIterator private[Tokenization] (
+    input: CharSequence,
+    val ctx: Ctx = empty(),
+    matcher: TokenMatcher[Ctx] = newMatcher(),
+  ) extends Iterator[Lexeme]:
+
+    ctx.text = input match
+      case reader: LazyReader => reader // LazyReader drops consumed characters by itself
+      case mapped: MappedInput => mapped
+      case offset: OffsetCharSequence => offset // reused by a session
+      case _ => OffsetCharSequence(input)
+
+    private var pending: Lexeme | Null = null
+
+    override def hasNext: Boolean =
+      while pending == null && !ctx.text.isEmpty do advance()
+      pending != null
+
+    override def next(): Lexeme =
+      if !hasNext then throw new NoSuchElementException("No more lexemes")
+      val lexeme = pending.nn
+      pending = null
+      lexeme
+
+    private def advance(): Unit = pending = step(ctx, matcher, matcher.lookingAt(ctx.text))
+
+  /**
+   * Consumes one token, or recovers from an unexpected character, at the beginning of the remaining text.
+   *
+   * @param ctx the lexer context
+   * @param matcher the token matcher
+   * @param matched the result of `matcher.lookingAt(ctx.text)`
+   * @return the lexeme of a defined token, or null if the token was ignored
+   */
+  private def step(ctx: Ctx, matcher: TokenMatcher[Ctx], matched: Boolean): Lexeme | Null =
+    if matched && skipped(matcher.index) then
+      skip(ctx, matcher.end)
+      null
+    else if matched && lazyText(matcher.index) && inputOf(ctx.text) != null then
+      matchLazily(ctx, tokenArray(matcher.index), matcher.end)
+    else if matched then
+      val raw = matcher.token.info.literal match
+        case null if matcher.end == 1 && ctx.text.charAt(0) < Tokenization.DispatchChars =>
+          Tokenization.AsciiTexts(ctx.text.charAt(0))
+        case null => ctx.text.subSequence(0, matcher.end).toString
+        case literal: String => literal // shared by every match, so fixed tokens allocate no text
+      ctx.lastRawMatched = raw
+      ctx.text = ctx.text.from(matcher.end)
+      val keyword = if checksKeywords(matcher.index) then keywords(raw) else -1
+      val index = if keyword == -1 then matcher.index else firstKeyword + keyword
+      val handler = derivedHandler
+      if handler == null then onMatch(tokenArray(index), raw, ctx)
+      else handler(tokenArray, index, raw, ctx).asInstanceOf[Lexeme | Null]
+    else
+      lazy val firstMatching = matcher.find(ctx.text)
+      errorHandling(ctx) match
+        case Strategy.Throw(ex) =>
+          throw ex
+
+        case Strategy.IgnoreToken if firstMatching != -1 =>
+          val raw = ctx.text.subSequence(0, firstMatching).toString
+          ctx.lastRawMatched = raw
+          ctx.text = ctx.text.from(firstMatching)
+          onMatch(RecoveredToken(raw), raw, ctx)
+
+        case Strategy.IgnoreChar | Strategy.IgnoreToken =>
+          val raw = ctx.text.charAt(0).toString
+          ctx.lastRawMatched = raw
+          ctx.text = ctx.text.from(1)
+          onMatch(RecoveredToken(raw), raw, ctx)
+
+        case Strategy.Stop =>
+          ctx.text = ""
+          null
+
+  /**
+   * Consumes a match like the tracking hooks run by [[betweenStages]] would,
+   * but updating the tracked counters at once and without creating the text of the match.
+   *
+   * Like the hooks of [[PositionTracking]] and [[LineTracking]], a newline only starts a new line
+   * when it is matched on its own. `lastRawMatched` is left as it is.
+   *
+   * @param ctx the lexer context
+   * @param length the length of the match
+   */
+  private def skip(ctx: Ctx, length: Int): Unit =
+    val newline = length == 1 && ctx.text.charAt(0) == '\n'
+    ctx match
+      case tracking: PositionTracking => if newline then tracking.position = 1 else tracking.position += length
+      case _ => ()
+    ctx match
+      case tracking: LineTracking if newline => tracking.line += 1
+      case _ => ()
+    ctx match
+      case tracking: OffsetTracking => tracking.offset += length
+      case _ => ()
+    ctx.text = ctx.text.from(length)
+
+  /**
+   * Consumes the match of a token that never reads its text like [[betweenStages]] would with the tracking hooks,
+   * but creating a lexeme that takes its text from the input only when it is read.
+   *
+   * @param ctx the lexer context, whose remaining text is an [[OffsetCharSequence]] over a `String`
+   * @param token the matched token
+   * @param length the length of the match
+   * @return the lexeme of a defined token, or null if the token is ignored
+   */
+  private def matchLazily(ctx: Ctx, token: Token[?, Ctx, ?], length: Int): Lexeme | Null =
+    val text = ctx.text.asInstanceOf[OffsetCharSequence]
+    val input = text.input
+    val start = text.position
+    skip(ctx, length)
+    token match
+      case defined: DefinedToken[?, Ctx, ?] =>
+        defined.ctxManipulation(ctx)
+        ctx.lastLexeme = Lexeme(
+          name = defined.info.name,
+          value = defined.remapping(ctx),
+          matched = null,
+          fieldNames = LexerCtx.fieldNames(ctx),
+          fieldValues = ctx.productIterator.toArray,
+          id = defined.id,
+          source = input,
+          start = start,
+          end = start + length,
+        )
+        ctx.lastLexeme.nn.asInstanceOf[Lexeme]
+      case _ =>
+        token.ctxManipulation(ctx)
+        null
+
+  private def inputOf(text: CharSequence): String | Null = text match
+    case text: OffsetCharSequence => text.input
+    case _ => null
+
+  /**
+   * Runs [[betweenStages]] for a consumed token.
+   *
+   * @param token the matched or recovered token
+   * @param raw the consumed text
+   * @param ctx the lexer context
+   * @return the lexeme of a defined token, or null if the token was ignored
+   */
+  private def onMatch(token: Token[?, Ctx, ?], raw: String, ctx: Ctx): Lexeme | Null =
+    betweenStages(token, raw, ctx)
+    if token.isInstanceOf[DefinedToken[?, Ctx, ?]] then ctx.lastLexeme.nn.asInstanceOf[Lexeme] else null
 
   /** The compiled pattern that matches all defined tokens. */
   protected def compiled: java.util.regex.Pattern
 
-  private lazy val groupToTokenMap: Array[Token[?, Ctx, ?]] =
+  /**
+   * The characters some token can match at any position but the last one, as inclusive `lo, hi` pairs.
+   *
+   * The lexer may only be split after characters outside of these ranges.
+   */
+  @publicInBinary
+  private[alpaca] def innerChars: Array[Int] = Tokenization.AllChars
+
+  /**
+   * The tokens to try before the regex, for every character below [[Tokenization.DispatchChars]].
+   *
+   * For each character in turn, the number of entries followed by the indices in [[tokens]]
+   * of literal tokens, and possibly by the bitwise complement of the index of a token in [[runTable]].
+   */
+  @publicInBinary
+  private[alpaca] def dispatchTable: Array[Int] = Array.emptyIntArray
+
+  /** The tokens matching a run of characters, as encoded for [[CharRun.decode]]. */
+  @publicInBinary
+  private[alpaca] def runTable: Array[Int] = Array.emptyIntArray
+
+  /**
+   * The perfect hash table of the keyword tokens, built by [[Keywords.table]].
+   *
+   * Keywords come last in [[tokens]], in the order of the texts the table was built from.
+   */
+  @publicInBinary
+  private[alpaca] def keywordTable: Array[Int] = Array.emptyIntArray
+
+  /** The indices in [[tokens]] of the tokens matching the text of some keyword, the only ones looked up in it. */
+  @publicInBinary
+  private[alpaca] def keywordSources: Array[Int] = Array.emptyIntArray
+
+  /** The automaton that matches all defined tokens, if the context opted into [[DfaMatching]]. */
+  @publicInBinary
+  private[alpaca] def dfa: Dfa | Null = null
+
+  /** The indices in [[tokens]] of the tokens never reading the matched text, if the context opted into [[LazyText]]. */
+  @publicInBinary
+  private[alpaca] def textFree: Array[Int] = Array.emptyIntArray
+
+  /** The handler of matches generated for the tokens, if the context opted into [[SpecializedMatching]]. */
+  @publicInBinary
+  private[alpaca] def matchHandler: MatchHandler[Ctx] | Null = null
+
+  private def newMatcher(): TokenMatcher[Ctx] = dfa match
+    case null => RegexTokenMatcher(compiled, tokenArray, groupToIndex, dispatch)
+    case dfa: Dfa => DfaTokenMatcher(dfa, tokenArray)
+
+  private lazy val tokenArray: Array[Token[?, Ctx, ?]] = tokens.toArray
+
+  /**
+   * Whether [[betweenStages]] is derived from no other hooks than the ones of [[LexerCtx]],
+   * [[PositionTracking]], [[LineTracking]] and [[OffsetTracking]], so that [[skip]] can stand for it.
+   * A hook passed to `lexer` explicitly is always run.
+   */
+  private lazy val trackingOnly: Boolean = betweenStages match
+    case derived: OnTokenMatch.Derived[?] => derived.trackingOnly
+    case _ => false
+
+  // the generated handler composes the same hooks as the derived one, so a hook passed explicitly is run instead
+  private lazy val derivedHandler: MatchHandler[Ctx] | Null = betweenStages match
+    case _: OnTokenMatch.Derived[?] => matchHandler
+    case _ => null
+
+  private lazy val groupToIndex: Array[Int] =
     val matcher = compiled.matcher("")
     val totalGroups = matcher.groupCount
-    val map = new Array[Token[?, Ctx, ?]](totalGroups + 1)
+    val map = Array.fill(totalGroups + 1)(-1)
 
-    tokens.foreach: token =>
+    tokens.iterator.zipWithIndex.foreach: (token, index) =>
       val groupIndex = compiled.namedGroups.get(token.info.regexGroupName)
-      if groupIndex != null then map(groupIndex) = token
+      if groupIndex != null then map(groupIndex) = index
     map
 
+  private lazy val keywords: Keywords[Ctx] = Keywords(keywordTable, tokenArray.filter(_.info.keyword))
+
+  private lazy val firstKeyword: Int = tokenArray.indexWhere(_.info.keyword)
+
+  // the ignored tokens defined without a block, whose matches the tracking hooks alone would handle
+  private lazy val skipped: Array[Boolean] = tokenArray.map: token =>
+    trackingOnly && token.isInstanceOf[IgnoredToken[?, ?]] && (token.ctxManipulation eq NoCtxManipulation)
+
+  private lazy val checksKeywords: Array[Boolean] =
+    val checks = new Array[Boolean](tokenArray.length)
+    keywordSources.foreach(checks(_) = true)
+    checks
+
+  // the tokens whose lexemes take their text from the input when it is read, as the tracking hooks only need its length
+  private lazy val lazyText: Array[Boolean] =
+    val lazyText = new Array[Boolean](tokenArray.length)
+    if trackingOnly then textFree.foreach(index => lazyText(index) = !checksKeywords(index))
+    lazyText
+
+  private lazy val dispatch: Array[CharDispatch] =
+    val runs = CharRun.decode(runTable)
+    val encoded = dispatchTable
+    val table = Array.newBuilder[CharDispatch]
+    var i = 0
+    while i < encoded.length do
+      val entries = encoded.slice(i + 1, i + 1 + encoded(i))
+      val run: CharRun | Null = entries.lastOption match
+        case Some(entry) if entry < 0 => runs(~entry)
+        case _ => null
+      table += CharDispatch(entries.filter(_ >= 0), run)
+      i += 1 + entries.length
+    table.result()
+
+private[lexer] object Tokenization:
+  /** The default number of characters in a chunk of [[Tokenization.tokenizeParallel]]. */
+  final val DefaultChunkSize = 1 << 20
+
+  /** The characters for which tokens are looked up before matching the regex. */
+  final val DispatchChars = 128
+
+  /** The texts of single ASCII characters, shared by all their matches. */
+  private val AsciiTexts: Array[String] = Array.tabulate(DispatchChars)(_.toChar.toString)
+
+  /** Every UTF-16 code unit, for lexers whose patterns could not be analysed. */
+  private[lexer] val AllChars: Array[Int] = Array(0, CharRanges.MaxChar)
+
+  private def contains(ranges: Array[Int], c: Char): Boolean =
+    (0 until ranges.length by 2).exists(i => ranges(i) <= c && c <= ranges(i + 1))
+
+  /**
+   * Splits a text into lines, each ending with a newline.
+   *
+   * @param text the text to split
+   * @param last whether the text is the end of the input, in which case the remainder after
+   *             the last newline is a line too, even if it is empty
+   * @return the lines of the text
+   */
+  private def lines(text: String, last: Boolean): List[String] =
+    val lines = List.newBuilder[String]
+    var start = 0
+    var newline = text.indexOf('\n')
+    while newline >= 0 do
+      lines += text.substring(start, newline + 1).nn
+      start = newline + 1
+      newline = text.indexOf('\n', start)
+    if last || start < text.length then lines += text.substring(start).nn
+    lines.result()
+
+  /** Splits the input into chunks of at least `chunkSize` characters, each but the last ending with `boundary`. */
+  private def split(input: CharSequence, boundary: Char, chunkSize: Int): List[CharSequence] =
+    val chunks = List.newBuilder[CharSequence]
+    var start = 0
+    while start < input.length do
+      var end = math.min(start + chunkSize, input.length)
+      while end < input.length && input.charAt(end - 1) != boundary do end += 1
+      chunks += input.subSequence(start, end)
+      start = end
+    chunks.result()
+
 extension (input: CharSequence)
   private[alpaca] def from(pos: Int): CharSequence = input match
     case ocs: OffsetCharSequence => ocs.from(pos)
     case lfr: LazyReader => lfr.from(pos)
+    case mapped: MappedInput => mapped.from(pos)
     case _ => input.subSequence(pos, input.length)
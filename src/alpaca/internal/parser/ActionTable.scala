@@ -5,8 +5,10 @@ package parser
 /**
  * Type alias for semantic actions in the parser.
  *
- * An action is a function that takes the parser context and a sequence
- * of child values (from recognized symbols) and produces a result value.
+ * An action is a function that takes the parser context and the child values
+ * (from recognized symbols) and produces a result value. The children are read
+ * in place from the parser's value stack: the value of the i-th symbol of the
+ * production's right-hand side is at index `base + i` of the given array.
  * Actions define how to build the abstract syntax tree or other output
  * from the parsed input.
  *
@@ -17,7 +19,7 @@ package parser
  * @tparam Ctx the parser context type
  * @tparam R the result type
  */
-private[parser] type Action[-Ctx <: ParserCtx] = (Ctx, RevertedArray[Any]) => Any
+private[parser] type Action[-Ctx <: ParserCtx] = (Ctx, Array[Any], Int) => Any
 
 /**
  * An opaque type representing the parser action table.
@@ -26,27 +28,28 @@ private[parser] type Action[-Ctx <: ParserCtx] = (Ctx, RevertedArray[Any]) => An
  * When a production is reduced during parsing, its action is executed
  * to compute the result value for the non-terminal on the left-hand side.
  *
+ * Productions are numbered at compile time, the same way as in the [[ParseTable]],
+ * so the actions are stored in an array indexed by production number.
+ *
  * @tparam Ctx the parser context type
- * @tparam R the result type
  */
-opaque private[parser] type ActionTable[Ctx <: ParserCtx] =
-  Map[Production, Action[Ctx]] // todo: Action should be based on Production type
+opaque private[parser] type ActionTable[Ctx <: ParserCtx] = Array[Action[Ctx]]
 
 private[parser] object ActionTable:
 
   /**
-   * Creates an ActionTable from a map of productions to actions.
+   * Creates an ActionTable from the actions of the numbered productions.
    *
-   * @param table the map of productions to their actions
+   * @param actions the actions, indexed by production number
    * @return an ActionTable
    */
-  def apply[Ctx <: ParserCtx](table: Map[Production, Action[Ctx]]): ActionTable[Ctx] = table
+  def apply[Ctx <: ParserCtx](actions: Array[Action[Ctx]]): ActionTable[Ctx] = actions
 
-  extension [Ctx <: ParserCtx, R](table: ActionTable[Ctx])
+  extension [Ctx <: ParserCtx](table: ActionTable[Ctx])
     /**
      * Gets the action for a production.
      *
-     * @param production the production to get the action for
+     * @param production the number of the production
      * @return the semantic action for that production
      */
-    def apply(production: Production): Action[Ctx] = table(production)
+    def apply(production: Int): Action[Ctx] = table(production)
@@ -0,0 +1,83 @@
+package alpaca
+package internal
+package parser
+
+import alpaca.internal.lexer.Lexeme
+
+/**
+ * The result of parsing with `parseIncremental` or `reparse`.
+ *
+ * Besides the result, it keeps the parsed lexemes and snapshots of the parser stack and
+ * context taken every [[IncrementalParse.Interval]] lexemes, so that parsing an edited
+ * input can resume from the last snapshot before the first changed lexeme.
+ *
+ * @tparam Ctx the parser context type
+ * @tparam R the result type
+ * @param ctx the final parser context
+ * @param result the result of the root rule, or null on parse failure
+ * @param lexemes the parsed lexemes, without the trailing EOF
+ * @param checkpoints the snapshots, ordered by the index of the lexeme they precede
+ */
+final class IncrementalParse[Ctx <: ParserCtx, +R] private[parser] (
+  val ctx: Ctx,
+  val result: R | Null,
+  private[parser] val lexemes: Array[Lexeme[?, ?]],
+  private[parser] val checkpoints: Vector[IncrementalParse.Checkpoint[Ctx]],
+)
+
+private[parser] object IncrementalParse:
+  /** The number of lexemes between two snapshots. */
+  final val Interval = 64
+
+  /**
+   * The state of the parser right before consuming a lexeme.
+   *
+   * @param index the index of the lexeme
+   * @param stack the entries of the parser stack
+   * @param ctx a copy of the parser context, never mutated
+   */
+  final class Checkpoint[Ctx](val index: Int, val stack: ParseStack.Snapshot, val ctx: Ctx):
+    def shifted(delta: Int): Checkpoint[Ctx] = if delta == 0 then this else Checkpoint(index + delta, stack, ctx)
+
+  /**
+   * Counts the leading lexemes that are the same in both inputs.
+   *
+   * @param previous the lexemes parsed before
+   * @param current the lexemes to parse now
+   * @return the length of the common prefix
+   */
+  def commonPrefix(previous: Array[Lexeme[?, ?]], current: Array[Lexeme[?, ?]]): Int =
+    var i = 0
+    while i < previous.length && i < current.length && same(previous(i), current(i)) do i += 1
+    i
+
+  /**
+   * Counts the trailing lexemes that are the same in both inputs, not overlapping the common prefix.
+   *
+   * @param previous the lexemes parsed before
+   * @param current the lexemes to parse now
+   * @param prefix the length of the common prefix
+   * @return the length of the common suffix
+   */
+  def commonSuffix(previous: Array[Lexeme[?, ?]], current: Array[Lexeme[?, ?]], prefix: Int): Int =
+    val limit = math.min(previous.length, current.length) - prefix
+    var i = 0
+    while i < limit && same(previous(previous.length - 1 - i), current(current.length - 1 - i)) do i += 1
+    i
+
+  /**
+   * Compares values on the parser stack, lexemes by their token, value and text, and anything else with `==`.
+   *
+   * The fields of the lexer context captured by lexemes are not compared, as an edit shifts the lines,
+   * positions and offsets of all the lexemes after it.
+   *
+   * @param a a value
+   * @param b another value
+   * @return true if the values are equal
+   */
+  def sameValue(a: Any, b: Any): Boolean = (a, b) match
+    case (a: Lexeme[?, ?], b: Lexeme[?, ?]) => same(a, b)
+    case _ => a == b
+
+  private def same(a: Lexeme[?, ?], b: Lexeme[?, ?]): Boolean =
+    (a eq b) || a.id == b.id && a.value == b.value && a.sameText(b)
@@ -0,0 +1,117 @@
+package alpaca
+package internal
+package parser
+
+/**
+ * The stack of an LR parser.
+ *
+ * States and values are kept in two parallel, growable arrays, so states are never
+ * boxed and shifted lexemes and reduced values are stored as they are, without any
+ * wrapper. Entries are addressed by their depth, 0 being the top of the stack.
+ *
+ * The stack starts with the initial state 0 and can be [[reset]] to be reused for another input,
+ * or restored from a [[ParseStack.Snapshot]] to resume parsing from an earlier point.
+ */
+private[parser] final class ParseStack:
+  private var states = new Array[Int](ParseStack.InitialCapacity)
+  private var values = new Array[Any](ParseStack.InitialCapacity)
+  private var size = 0
+  push(0, null)
+
+  /** The state on top of the stack. */
+  def state: Int = states(size - 1)
+
+  /**
+   * Gets a state below the top of the stack.
+   *
+   * @param depth the number of entries above the requested one
+   * @return the state at the given depth
+   */
+  def state(depth: Int): Int = states(size - 1 - depth)
+
+  /**
+   * Gets a value below the top of the stack.
+   *
+   * @param depth the number of entries above the requested one
+   * @return the value at the given depth
+   */
+  def value(depth: Int): Any = values(size - 1 - depth)
+
+  /**
+   * The array holding the values, bottom first.
+   *
+   * It is replaced when the stack grows, so it is only valid until the next [[push]].
+   */
+  def valueArray: Array[Any] = values
+
+  /**
+   * Gets the index in [[valueArray]] of the deepest of the top entries.
+   *
+   * @param count the number of top entries
+   * @return the index of the value at depth `count - 1`
+   */
+  def base(count: Int): Int = size - count
+
+  /**
+   * Pushes a state with its value.
+   *
+   * @param state the state
+   * @param value the shifted lexeme or the reduced value
+   */
+  def push(state: Int, value: Any): Unit =
+    if size == states.length then
+      states = Array.copyOf(states, size * 2)
+      values = Array.copyOf(values, size * 2)
+    states(size) = state
+    values(size) = value
+    size += 1
+
+  /**
+   * Pops entries from the top of the stack.
+   *
+   * @param count the number of entries to pop
+   */
+  def pop(count: Int): Unit =
+    val newSize = size - count
+    while size > newSize do
+      size -= 1
+      values(size) = null // do not retain popped values
+
+  /** Drops every entry but the initial state, keeping the allocated arrays. */
+  def reset(): Unit =
+    pop(size - 1)
+    states(0) = 0
+
+  /** Copies the entries of the stack, bottom first. */
+  def snapshot(): ParseStack.Snapshot = ParseStack.Snapshot(Array.copyOf(states, size), Array.copyOf(values, size))
+
+  /**
+   * Replaces the entries of the stack with the ones of a snapshot.
+   *
+   * @param snapshot the entries to restore
+   */
+  def restore(snapshot: ParseStack.Snapshot): Unit =
+    pop(size)
+    for i <- snapshot.states.indices do push(snapshot.states(i), snapshot.values(i))
+
+  /**
+   * Checks whether the stack holds the same entries as a snapshot.
+   *
+   * @param snapshot the entries to compare with
+   * @param same the equality of values
+   * @return true if the states are equal and the values are the same
+   */
+  def matches(snapshot: ParseStack.Snapshot, same: (Any, Any) => Boolean): Boolean =
+    size == snapshot.states.length &&
+      (0 until size).forall(i => states(i) == snapshot.states(i) && same(values(i), snapshot.values(i)))
+
+private[parser] object ParseStack:
+  private final val InitialCapacity = 64
+
+  /**
+   * The entries of a stack at some point of parsing.
+   *
+   * @param states the states, bottom first
+   * @param values the values, bottom first
+   */
+  final class Snapshot(val states: Array[Int], val values: Array[Any])
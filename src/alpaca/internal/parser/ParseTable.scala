@@ -2,6 +2,7 @@ package alpaca
 package internal
 package parser
 
+import alpaca.internal.lexer.{Lexeme, TokenIds}
 import alpaca.internal.parser.ParseAction.*
 
 import scala.annotation.tailrec
@@ -11,54 +12,186 @@ import scala.util.boundary
 import boundary.break
 
 /**
- * An opaque type representing the LR parse table.
+ * The LR parse table in a packed, row-displacement form.
  *
- * State IDs are dense consecutive integers starting at 0, so the table is
- * stored as an array indexed by state, with each cell holding a symbol ->
- * action map. Lookup is a single array index plus one symbol hash, with no
- * boxing on the state key.
+ * States and grammar symbols are numbered densely and every action is encoded as an `Int`:
+ * `0` for no action, `state + 1` for a shift or goto, and `~production` for a reduction.
+ * Identical rows are stored once, and the distinct rows are overlaid in a single `values`
+ * array (comb compression): the action of `state` on `column` is at `base(state) + column`,
+ * and belongs to that state only if `check` at the same index holds `base(state)`.
+ * Distinct rows get distinct bases, so a lookup is a couple of array reads.
+ *
+ * Terminals are additionally indexed by their [[TokenIds]] id, which lets the parser find
+ * the action for a lexeme without hashing or comparing token names.
+ *
+ * @param symbols the grammar symbols, indexed by column
+ * @param productions the productions of the grammar, indexed by production number
+ * @param base the displacement of the row of every state
+ * @param check the base of the row owning every slot, or -1 for free slots
+ * @param values the encoded action in every slot
  */
-opaque private[parser] type ParseTable = Array[Map[Symbol, ParseAction]]
+private[parser] final class ParseTable(
+  private val symbols: Array[Symbol],
+  private val productions: Array[Production],
+  private val base: Array[Int],
+  private val check: Array[Int],
+  private val values: Array[Int],
+):
+  private val columns: Map[Symbol, Int] = symbols.iterator.zipWithIndex.toMap
+
+  private val tokenColumns: Array[Int] =
+    val terminals = symbols.iterator.zipWithIndex
+      .collect:
+        case (Terminal(name), column) => (TokenIds.of(name), column)
+      .toList
+    Array.fill(terminals.iterator.map(_._1 + 1).maxOption.getOrElse(0))(-1).tap: array =>
+      terminals.foreach((id, column) => array(id) = column)
+
+  private val lhsColumns: Array[Int] = productions.map(production => columns.getOrElse(production.lhs, -1))
+
+  private val arities: Array[Int] = productions.map:
+    case Production.NonEmpty(_, rhs, _) => rhs.size
+    case Production.Empty(_, _) => 0
+
+  /** The number of the augmented start production, whose reduction accepts the input. */
+  val startProduction: Int = productions.indexWhere(_.lhs == Symbol.Start)
+
+  /** The number of states. */
+  def stateCount: Int = base.length
+
+  /**
+   * Gets the parse action for a given state and symbol.
+   *
+   * @param state the current parser state
+   * @param symbol the symbol being processed
+   * @return the parse action to take
+   * @throws AlgorithmError if no action is defined for this state/symbol combination
+   */
+  def apply(state: Int, symbol: Symbol): ParseAction =
+    encoded(state, columns.getOrElse(symbol, -1), symbol.name) match
+      case code if code >= 0 => Shift(code)
+      case code => Reduction(productions(~code))
+
+  /**
+   * Gets the parse action for a given state and lookahead lexeme.
+   *
+   * @param state the current parser state
+   * @param lexeme the lookahead lexeme
+   * @return the state to shift to if non-negative, otherwise `~production` of the production to reduce
+   * @throws AlgorithmError if no action is defined for this state and the lexeme's token
+   */
+  def action(state: Int, lexeme: Lexeme[?, ?]): Int =
+    val id = lexeme.id
+    encoded(state, if id < tokenColumns.length then tokenColumns(id) else -1, lexeme.name)
+
+  /**
+   * Gets the state entered after a reduction.
+   *
+   * @param state the state uncovered by popping the right-hand side
+   * @param production the number of the reduced production
+   * @return the target state of the goto on the production's left-hand side
+   */
+  def goto(state: Int, production: Int): Int = slot(state, lhsColumns(production)) - 1
+
+  /**
+   * Gets a production by its number.
+   *
+   * @param index the production number, as encoded in a reduction
+   * @return the production
+   */
+  def production(index: Int): Production = productions(index)
+
+  /**
+   * Gets the length of the right-hand side of a production.
+   *
+   * @param production the production number
+   * @return the number of stack entries the reduction pops
+   */
+  def arity(production: Int): Int = arities(production)
+
+  private def slot(state: Int, column: Int): Int =
+    val index = base(state) + column
+    if check(index) == base(state) then values(index) else 0
+
+  private def encoded(state: Int, column: Int, name: => String): Int =
+    val code = if column == -1 then 0 else slot(state, column)
+    if code > 0 then code - 1
+    else if code < 0 then code
+    else
+      val expected = symbols.indices.filter(slot(state, _) != 0).map(symbols(_).name).to(SortedSet)
+      throw AlgorithmError(s"Unexpected symbol '$name' in state $state. Expected one of: ${expected.mkString(", ")}")
+
+  private def row(state: Int): Map[Symbol, ParseAction] =
+    symbols.indices.iterator
+      .filter(slot(state, _) != 0)
+      .map(column => (symbols(column), apply(state, symbols(column))))
+      .toMap
+
+  /**
+   * Converts the parse table to CSV format for debugging.
+   *
+   * Creates a table with states as rows and symbols as columns,
+   * showing the action for each state/symbol combination.
+   *
+   * @return a Csv representation of the parse table
+   */
+  // it shouldn't be eager
+  def toCsv(using Log): Csv =
+    val headers = show"State" :: symbols.toList.map(_.show)
+    val rows = (0 until stateCount)
+      .map: i =>
+        val row = this.row(i)
+        show"$i" :: symbols.toList.map(s => row.get(s).fold[Shown]("")(_.show))
+      .toList
+
+    Csv(headers, rows)
 
 private[parser] object ParseTable:
-  extension (table: ParseTable)
-    /**
-     * Gets the parse action for a given state and symbol.
-     *
-     * @param state the current parser state
-     * @param symbol the symbol being processed
-     * @return the parse action to take
-     * @throws AlgorithmError if no action is defined for this state/symbol combination
-     */
-    def apply(state: Int, symbol: Symbol): ParseAction = table(state).get(symbol) match
-      case Some(action) => action
-      case None =>
-        val expected = table(state).keysIterator.map(_.name).to(SortedSet).mkString(", ")
-        throw AlgorithmError(s"Unexpected symbol '${symbol.name}' in state $state. Expected one of: $expected")
-
-    private def allSymbols: List[Symbol] =
-      table.iterator.flatMap(_.keysIterator).distinct.toList
-
-    /**
-     * Converts the parse table to CSV format for debugging.
-     *
-     * Creates a table with states as rows and symbols as columns,
-     * showing the action for each state/symbol combination.
-     *
-     * @return a Csv representation of the parse table
-     */
-    // it shouldn't be eager
-    def toCsv(using Log): Csv =
-      val symbols = table.allSymbols
-
-      val headers = show"State" :: symbols.map(_.show)
-      val rows = table.indices
-        .map: i =>
-          val row = table(i)
-          show"$i" :: symbols.map(s => row.get(s).fold[Shown]("")(_.show))
-        .toList
-
-      Csv(headers, rows)
+
+  /**
+   * Packs a table given as one action map per state.
+   *
+   * Symbols are numbered in the order of their first appearance.
+   * Rows are placed from the densest to the sparsest, each at the lowest base where
+   * none of its slots is taken yet.
+   *
+   * @param rows the actions of every state
+   * @param productions the productions of the grammar, indexed by production number
+   * @return the packed parse table
+   */
+  private[parser] def packed(rows: Array[Map[Symbol, ParseAction]], productions: Array[Production]): ParseTable =
+    val symbols = rows.iterator.flatMap(_.keysIterator).distinct.toArray
+    val columns = symbols.iterator.zipWithIndex.toMap
+    val productionIds = productions.iterator.zipWithIndex.toMap
+
+    val encodedRows = rows.map: row =>
+      row.toList
+        .map:
+          case (symbol, Shift(state)) => (columns(symbol), state + 1)
+          case (symbol, Reduction(production)) => (columns(symbol), ~productionIds(production))
+        .sortBy(_._1)
+
+    val bases = mutable.HashMap.empty[List[(Int, Int)], Int]
+    val occupied = mutable.BitSet.empty
+    val usedBases = mutable.BitSet.empty
+    var firstFree = 0
+    for row <- encodedRows.distinct.sortBy(-_.size) do
+      var base = math.max(0, firstFree - row.headOption.fold(0)(_._1))
+      while usedBases(base) || row.exists((column, _) => occupied(base + column)) do base += 1
+      usedBases += base
+      row.foreach((column, _) => occupied += base + column)
+      while occupied(firstFree) do firstFree += 1
+      bases(row) = base
+
+    val base = encodedRows.map(bases(_))
+    val size = base.maxOption.getOrElse(0) + symbols.length
+    val check = Array.fill(size)(-1)
+    val values = new Array[Int](size)
+    for (row, rowBase) <- bases; (column, code) <- row do
+      check(rowBase + column) = rowBase
+      values(rowBase + column) = code
+
+    new ParseTable(symbols, productions, base, check, values)
 
   /**
    * Constructs the LR(1) parse table from a list of productions.
@@ -66,6 +199,7 @@ private[parser] object ParseTable:
    * This implements the LR(1) parser construction algorithm. It builds
    * states by computing closures of item sets and constructs the parse
    * table that maps (state, symbol) pairs to actions (shift or reduce).
+   * Productions are numbered by their position in `productions`.
    *
    * @param productions the grammar productions
    * @return the constructed parse table
@@ -141,10 +275,10 @@ private[parser] object ParseTable:
 
       currStateId += 1
 
-    Array.better.tabulate(tableRows.length)(tableRows(_).toMap)
+    packed(Array.better.tabulate(tableRows.length)(tableRows(_).toMap), productions.toArray)
 
   given Showable[ParseTable] = Showable: table =>
-    val symbols = table.allSymbols
+    val symbols = table.symbols
 
     def centerText(text: String, width: Int = 10): String =
       if text.length >= width then text
@@ -161,8 +295,8 @@ private[parser] object ParseTable:
       result.append(centerText(s.show))
       result.append("|")
 
-    for i <- table.indices do
-      val row = table(i)
+    for i <- 0 until table.stateCount do
+      val row = table.row(i)
       result.append('\n')
       result.append(centerText(i.toString))
       result.append("|")
@@ -174,19 +308,26 @@ private[parser] object ParseTable:
 
   // $COVERAGE-OFF$
   given ToExpr[ParseTable] with
-    def apply(entries: ParseTable)(using quotes: Quotes): Expr[ParseTable] =
-      type Row = Map[parser.Symbol, ParseAction]
-      type RowBuilder = mutable.Builder[(parser.Symbol, ParseAction), Row]
-
-      def rowExpr(row: Row): Expr[Row] = avoidTooLargeMethod[(parser.Symbol, ParseAction), Row, RowBuilder](
-        builder = '{ Map.newBuilder },
-        elements = row.map(Expr(_)),
-        empty = '{ Map.empty },
+    def apply(table: ParseTable)(using quotes: Quotes): Expr[ParseTable] =
+      val symbols = avoidTooLargeMethod[parser.Symbol, Array[parser.Symbol], mutable.ArrayBuilder[parser.Symbol]](
+        builder = '{ mutable.ArrayBuilder.make[parser.Symbol] },
+        elements = table.symbols.toList.map(Expr(_)),
+        empty = '{ Array.empty[parser.Symbol] },
       )
 
-      avoidTooLargeMethod[Row, Array[Row], mutable.ArrayBuilder[Row]](
-        builder = '{ mutable.ArrayBuilder.ofRef[Row].tap(_.sizeHint(${ Expr(entries.length) })) },
-        elements = entries.map(rowExpr),
-        empty = '{ Array.empty[Row] },
+      val productions = avoidTooLargeMethod[Production, Array[Production], mutable.ArrayBuilder[Production]](
+        builder = '{ mutable.ArrayBuilder.ofRef[Production].tap(_.sizeHint(${ Expr(table.productions.length) })) },
+        elements = table.productions.toList.map(Expr(_)),
+        empty = '{ Array.empty[Production] },
       )
+
+      '{
+        new ParseTable(
+          $symbols,
+          $productions,
+          ${ PackedInts.expr(table.base) },
+          ${ PackedInts.expr(table.check) },
+          ${ PackedInts.expr(table.values) },
+        )
+      }
 // $COVERAGE-ON$
@@ -3,12 +3,15 @@ package internal
 package parser
 
 import alpaca.internal.*
-import alpaca.internal.lexer.Lexeme
+import alpaca.internal.lexer.{Lexeme, Tokenization}
 import alpaca.internal.parser.*
 
 import scala.NamedTuple.NamedTuple
 import scala.annotation.{compileTimeOnly, tailrec}
 import scala.collection.mutable
+import scala.concurrent.duration.Duration
+import scala.concurrent.{Await, ExecutionContext, Future}
+import scala.util.{Success, Try}
 
 /**
  * A trait that provides compile-time access to named productions for use in conflict resolution definitions.
@@ -79,72 +82,258 @@ abstract class Parser[Ctx <: ParserCtx](
   inline protected final def ctx: Ctx = dummy
 
   /**
-   * Parses a list of lexemes using the defined grammar.
+   * Parses a stream of lexemes using the defined grammar.
    *
    * This method builds the parse table at compile time and uses it to
-   * parse the input lexemes using an LR parsing algorithm.
+   * parse the input lexemes using an LR parsing algorithm. Lexemes are pulled
+   * from the iterator only when the parser needs the next lookahead, so a lazy
+   * tokenizer can feed the parser without materializing the token list.
    *
    * @tparam R the result type
-   * @param lexemes the list of lexemes to parse
+   * @param lexemes the lexemes to parse, without the trailing EOF
    * @return a tuple of (context, result), where result may be null on parse failure
    */
-  private[alpaca] def unsafeParse[R](lexemes: List[Lexeme[?, ?]]): (ctx: Ctx, result: R | Null) =
-    enum Node:
-      case Result(value: Any)
-      case Token(lexeme: Lexeme[?, ?])
+  private[alpaca] def unsafeParse[R](lexemes: Iterator[Lexeme[?, ?]]): (ctx: Ctx, result: R | Null) =
+    parseWith[R](ParseStack(), lexemes)
 
-      def get: Any = this match
-        case Node.Result(value) => value
-        case Node.Token(lexeme) => lexeme
+  /**
+   * Creates a session that parses many inputs, one at a time, reusing its stack.
+   *
+   * @tparam R the result type
+   * @return a new session, to be used by a single thread
+   */
+  private[alpaca] def newSession[R](): Session[R] = new Session[R]
+
+  /**
+   * Runs an action with a session taken from a pool kept by this parser, creating one if none is free.
+   *
+   * The session is returned to the pool afterwards, so sessions outlive the tasks and threads that use them.
+   *
+   * @tparam R the result type
+   * @param action the action using the session
+   * @return the result of the action
+   */
+  private def withPooledSession[R, A](action: Session[R] => A): A =
+    val pooled = sessionPool.poll()
+    val session = if pooled == null then newSession[R]() else pooled.asInstanceOf[Session[R]]
+    try action(session)
+    finally sessionPool.offer(session)
+
+  // sessions keep no state typed by the result between parses, so one pool serves every result type
+  private lazy val sessionPool = new java.util.concurrent.ConcurrentLinkedQueue[Session[?]]
+
+  /**
+   * A reusable parser for many small inputs.
+   *
+   * The parser stack is allocated once and reset for every input, so it keeps the capacity
+   * it has grown to. The context is still created for every input, as it is returned to the caller.
+   *
+   * A session is not thread-safe; use one per thread.
+   *
+   * @tparam R the result type
+   */
+  final class Session[R] private[Parser]:
+    private val stack = ParseStack()
+
+    /**
+     * Parses a list of lexemes like `parse`.
+     *
+     * @param lexemes the lexemes to parse
+     * @return a tuple of (context, result), where result may be null on parse failure
+     */
+    def parse(lexemes: List[Lexeme[?, ?]]): (ctx: Ctx, result: R | Null) =
+      stack.reset()
+      val result = parseWith[R](stack, lexemes.iterator)
+      stack.reset() // do not retain the values
+      result
+
+  /**
+   * Creates a parser that is offered the lexemes one at a time.
+   *
+   * @tparam R the result type
+   * @return a new push parser
+   */
+  private[alpaca] def newPushParser[R](): PushParser[R] = new PushParser[R]
+
+  /**
+   * A parser driven by the producer of the lexemes instead of pulling them.
+   *
+   * Every [[offer]] advances the LR automaton by one lexeme, keeping the stack between
+   * calls, so parsing can be paused while waiting for more input and no input is buffered.
+   * [[finish]] then completes the parse at the end of input.
+   *
+   * @tparam R the result type
+   */
+  final class PushParser[R] private[Parser]:
+
+    /** The parser context, reflecting the lexemes offered so far. */
+    val ctx: Ctx = empty()
+
+    private val stack = ParseStack()
+    private var accepted = false
+    private var finished = false
+
+    /**
+     * Advances the parser by one lexeme.
+     *
+     * Lexemes offered after the root rule has been completed are ignored, like `parse` does.
+     *
+     * @param lexeme the next lexeme
+     * @return true if the input has been accepted
+     * @throws IllegalStateException if the parser has already finished
+     */
+    def offer(lexeme: Lexeme[?, ?]): Boolean =
+      if finished then throw new IllegalStateException("The parser has already finished")
+      if !accepted then accepted = consume(stack, ctx, lexeme)
+      accepted
+
+    /**
+     * Completes the parse at the end of input.
+     *
+     * @return a tuple of (context, result), where result may be null on parse failure
+     */
+    def finish(): (ctx: Ctx, result: R | Null) =
+      if !finished then
+        consume(stack, ctx, Lexeme.EOF)
+        finished = true
+      (ctx, stack.value(0).asInstanceOf[R | Null])
+
+  /**
+   * Tokenizes and parses independent inputs in parallel.
+   *
+   * Every input is processed by a separate task on the executor. Each task takes a lexer and a parser
+   * session from the pools kept by the lexer and the parser, and returns them when done, so no two tasks
+   * share a session and sessions are reused across tasks and calls, whatever threads run them.
+   *
+   * @tparam R the result type
+   * @param lexer the lexer producing the lexemes
+   * @param inputs the inputs to tokenize and parse
+   * @param executor the executor running the tasks
+   * @return the outcome for every input, in input order, a failure not affecting the other inputs
+   */
+  private[alpaca] def unsafeParseAll[R](
+    lexer: Tokenization[?],
+    inputs: Iterable[CharSequence],
+    executor: ExecutionContext,
+  ): List[Try[(ctx: Ctx, result: R | Null)]] =
+    given ExecutionContext = executor
+    val results = Future.traverse(inputs.toList): input =>
+      Future:
+        val lexemes = lexer.withPooledSession(_.tokenize(input).lexemes)
+        withPooledSession[R, (ctx: Ctx, result: R | Null)](_.parse(lexemes))
+      .transform(Success(_))
+    Await.result(results, Duration.Inf)
 
+  private def parseWith[R](stack: ParseStack, lexemes: Iterator[Lexeme[?, ?]]): (ctx: Ctx, result: R | Null) =
     val ctx = empty()
+    while lexemes.hasNext && !consume(stack, ctx, lexemes.next()) do ()
+    consume(stack, ctx, Lexeme.EOF)
+    (ctx, stack.value(0).asInstanceOf[R | Null])
+
+  /**
+   * Parses a list of lexemes, reusing the work done for a previous version of the input.
+   *
+   * Parsing resumes from the last snapshot of the previous parse taken within the common prefix
+   * of both inputs. Within their common suffix, whenever the stack and the context equal the ones
+   * of a previous snapshot at the same position, the rest of the input is known to be parsed like
+   * before, so the previous result is returned without running the remaining semantic actions.
+   * The common prefix and suffix are given by the edit if it is known, and found by comparing
+   * the lexemes of both inputs otherwise.
+   *
+   * @tparam R the result type
+   * @param lexemes the lexemes to parse, without the trailing EOF
+   * @param previous the result of parsing the previous version of the input, or null
+   * @param edit the lexemes of the previous input replaced by the new ones, or null if unknown
+   * @return the result along with the snapshots for the next reparse
+   */
+  private[alpaca] def unsafeParseIncremental[R](
+    lexemes: List[Lexeme[?, ?]],
+    previous: IncrementalParse[Ctx, R] | Null,
+    edit: (start: Int, removed: Int, inserted: Int) | Null = null,
+  )(using copy: Copyable[Ctx],
+  ): IncrementalParse[Ctx, R] =
+    import IncrementalParse.{Checkpoint, Interval}
+
+    val input = lexemes.toArray
+    val (old, oldCheckpoints) =
+      if previous == null then (Array.empty[Lexeme[?, ?]], Vector.empty[Checkpoint[Ctx]])
+      else (previous.lexemes, previous.checkpoints)
+    val (prefix, suffixStart) =
+      if edit == null then
+        val prefix = IncrementalParse.commonPrefix(old, input)
+        (prefix, input.length - IncrementalParse.commonSuffix(old, input, prefix))
+      else
+        val (start, removed, inserted) = edit.nn
+        require(
+          start + removed <= old.length && old.length - removed + inserted == input.length,
+          s"Replacing $removed of ${old.length} lexemes from $start with $inserted does not give ${input.length}",
+        )
+        (start, start + inserted)
+    val delta = input.length - old.length
+
+    val stack = ParseStack()
+    val reused = oldCheckpoints.takeWhile(_.index <= prefix)
+    val checkpoints = Vector.newBuilder[Checkpoint[Ctx]].addAll(reused)
+    val restart = reused.lastOption.getOrElse:
+      Checkpoint(0, stack.snapshot(), copy(empty())).tap(checkpoints.addOne)
+    stack.restore(restart.stack)
+    val ctx = copy(restart.ctx)
+
+    var i = restart.index
+    var lastCheckpoint = i
+    var next = reused.length // the first previous snapshot not reused yet
+    var accepted = false
+    var converged = false
+    while !accepted && !converged && i < input.length do
+      while next < oldCheckpoints.length && oldCheckpoints(next).index + delta < i do next += 1
+      converged = i >= suffixStart && next < oldCheckpoints.length &&
+        oldCheckpoints(next).index + delta == i &&
+        stack.matches(oldCheckpoints(next).stack, IncrementalParse.sameValue) && ctx == oldCheckpoints(next).ctx
+      if !converged then
+        if i - lastCheckpoint >= Interval then
+          checkpoints += Checkpoint(i, stack.snapshot(), copy(ctx))
+          lastCheckpoint = i
+        accepted = consume(stack, ctx, input(i))
+        i += 1
+
+    if converged then
+      val previousParse = previous.nn
+      checkpoints ++= oldCheckpoints.drop(next).map(_.shifted(delta))
+      IncrementalParse(previousParse.ctx, previousParse.result, input, checkpoints.result())
+    else
+      consume(stack, ctx, Lexeme.EOF)
+      IncrementalParse(ctx, stack.value(0).asInstanceOf[R | Null], input, checkpoints.result())
+
+  /**
+   * Advances the LR automaton by one lookahead lexeme.
+   *
+   * Performs every reduction the lookahead triggers and then shifts it,
+   * unless the reductions complete the root rule.
+   *
+   * @param stack the parser stack
+   * @param ctx the parser context
+   * @param lexeme the lookahead lexeme
+   * @return true if the input has been accepted, with the result on top of the stack
+   */
+  private def consume(stack: ParseStack, ctx: Ctx, lexeme: Lexeme[?, ?]): Boolean =
+    val parseTable = tables.parseTable
+
+    @tailrec def loop(): Boolean =
+      val action = parseTable.action(stack.state, lexeme)
+      if action >= 0 then
+        stack.push(action, lexeme)
+        false
+      else
+        val productionId = ~action
+        if productionId == parseTable.startProduction then true
+        else
+          val n = parseTable.arity(productionId)
+          val result = tables.actionTable(productionId)(ctx, stack.valueArray, stack.base(n))
+          stack.pop(n)
+          stack.push(parseTable.goto(stack.state, productionId), result)
+          loop()
 
-    val stateStack = mutable.ArrayDeque.empty[Int]
-    val nodeStack = mutable.ArrayDeque.empty[Node]
-    stateStack += 0
-    nodeStack += Node.Result(null)
-
-    @tailrec def loop(remaining: List[Lexeme[?, ?]]): Node =
-      val current = if remaining.isEmpty then Lexeme.EOF else remaining.head
-      val nextSymbol = Terminal(current.name)
-      tables.parseTable(stateStack.last, nextSymbol) match
-        case ParseAction.Shift(gotoState) =>
-          stateStack += gotoState
-          nodeStack += Node.Token(current)
-          loop(if remaining.isEmpty then Nil else remaining.tail)
-
-        case ParseAction.Reduction(prod @ Production.NonEmpty(lhs, rhs, name)) =>
-          val n = rhs.size
-          val newStateIdx = stateStack(stateStack.size - 1 - n)
-
-          if lhs == Symbol.Start && newStateIdx == 0 then nodeStack.last
-          else
-            val top = nodeStack.size - 1
-            val children = Array.better.tabulate(n)(i => nodeStack(top - i).get)
-            stateStack.dropRightInPlace(n)
-            nodeStack.dropRightInPlace(n)
-
-            val ParseAction.Shift(gotoState) = tables.parseTable(newStateIdx, lhs).runtimeChecked
-            val result = tables.actionTable(prod)(ctx, RevertedArray(children))
-            stateStack += gotoState
-            nodeStack += Node.Result(result)
-            loop(remaining)
-
-        case ParseAction.Reduction(Production.Empty(Symbol.Start, name)) if stateStack.last == 0 =>
-          nodeStack.last
-
-        case ParseAction.Reduction(prod @ Production.Empty(lhs, name)) =>
-          val ParseAction.Shift(gotoState) = tables.parseTable(stateStack.last, lhs).runtimeChecked
-          val result = tables.actionTable(prod)(ctx, RevertedArray.empty)
-          stateStack += gotoState
-          nodeStack += Node.Result(result)
-          loop(remaining)
-
-    val result = loop(lexemes) match
-      case Node.Result(value) => value.asInstanceOf[R]
-      case Node.Token(lexeme) => null
-
-    (ctx, result)
+    loop()
 
 private val cachedProductions: mutable.Map[Type[? <: AnyKind], (Type[? <: AnyKind], Type[? <: AnyKind])] =
   mutable.Map.empty
@@ -96,7 +96,7 @@ private[parser] final class ParserExtractors[Q <: Quotes, Ctx <: ParserCtx: Type
           ),
           (
             production = Production.NonEmpty(fresh, NEL(nonEmpty)),
-            action = '{ identityAction },
+            action = '{ freezeAction },
           ),
           (
             production = Production.NonEmpty(nonEmpty, NEL(NonTerminal(name))),
@@ -135,13 +135,22 @@ private[parser] final class ParserExtractors[Q <: Quotes, Ctx <: ParserCtx: Type
     case Extractor.Symbol(name, bind, Names.List) =>
       logger.trace(show"extracted repeated: $name")
       val fresh = NonTerminal.fresh(name)
+      val nonEmpty = NonTerminal.fresh(show"${name}_nonEmpty")
       (
         symbol = fresh,
         bind = bind,
         others = List(
           (production = Production.Empty(fresh), action = '{ emptyRepeatedAction }),
           (
-            production = Production.NonEmpty(fresh, NEL(fresh, NonTerminal(name))),
+            production = Production.NonEmpty(fresh, NEL(nonEmpty)),
+            action = '{ freezeAction },
+          ),
+          (
+            production = Production.NonEmpty(nonEmpty, NEL(NonTerminal(name))),
+            action = '{ headAction },
+          ),
+          (
+            production = Production.NonEmpty(nonEmpty, NEL(nonEmpty, NonTerminal(name))),
             action = '{ repeatedAction },
           ),
         ),
@@ -158,20 +167,24 @@ private object ParserExtractors:
     final val SeparatedBy = "SeparatedBy"
     final val AsInstanceOf = "$asInstanceOf$"
 
-  val repeatedAction: Action[ParserCtx] = (_, args) =>
-    val RevertedArray(newElem, currList: List[?]) = args.runtimeChecked
-    currList.appended(newElem)
+  // Repetitions accumulate their elements in a reversed List carried on the value stack,
+  // prepended to and reversed once the whole repetition is reduced. This keeps building
+  // a list of n elements O(n) instead of copying it on every element, while the values
+  // on the stack stay immutable, so stack snapshots taken by incremental parsing stay valid.
+  private type Accumulator = List[Any]
+
+  val headAction: Action[ParserCtx] = (_, values, base) => values(base) :: Nil
 
-  val headAction: Action[ParserCtx] = (_, args) => List(args.head)
+  val repeatedAction: Action[ParserCtx] = (_, values, base) =>
+    values(base + 1) :: values(base).asInstanceOf[Accumulator]
 
-  val identityAction: Action[ParserCtx] = (_, args) => args.head
+  val separatedByAction: Action[ParserCtx] = (_, values, base) =>
+    values(base + 2) :: values(base + 1) :: values(base).asInstanceOf[Accumulator]
 
-  val separatedByAction: Action[ParserCtx] = (_, args) =>
-    val RevertedArray(newElem, separator, currList: List[?]) = args.runtimeChecked
-    currList.appendedAll(List(separator, newElem))
+  val freezeAction: Action[ParserCtx] = (_, values, base) => values(base).asInstanceOf[Accumulator].reverse
 
-  val emptyRepeatedAction: Action[ParserCtx] = (_, _) => Nil
+  val emptyRepeatedAction: Action[ParserCtx] = (_, _, _) => Nil
 
-  val someAction: Action[ParserCtx] = (_, args) => Some(args.head)
+  val someAction: Action[ParserCtx] = (_, values, base) => Some(values(base))
 
-  val noneAction: Action[ParserCtx] = (_, _) => None
+  val noneAction: Action[ParserCtx] = (_, _, _) => None
@@ -71,15 +71,16 @@ private def createTablesImpl[Ctx <: ParserCtx: Type](
     : PartialFunction[Expr[Rule[?]], Seq[(production: Production, action: Expr[Action[Ctx]])]] =
     case '{ rule(${ Varargs(cases) }*) } =>
       def createAction(binds: Seq[Option[Bind]], rhs: Term) = createLambda[Action[Ctx]]:
-        case (methSym, (ctx: Term) :: (param: Term) :: Nil) =>
-          val paramExpr = param.asExprOf[RevertedArray[Any]]
+        case (methSym, (ctx: Term) :: (values: Term) :: (base: Term) :: Nil) =>
+          val valuesExpr = values.asExprOf[Array[Any]]
+          val baseExpr = base.asExprOf[Int]
           val replacements = (find = ctxSymbol, replace = ctx) ::
             binds.iterator.zipWithIndex
               .collect:
                 case (Some(bind), idx) => ((bind.symbol, bind.symbol.typeRef.asType), Expr(idx))
               .unsafeFlatMap:
                 case ((bind, '[t]), idx) =>
-                  Some((find = bind, replace = '{ $paramExpr($idx).asInstanceOf[t] }.asTerm))
+                  Some((find = bind, replace = '{ $valuesExpr($baseExpr + $idx).asInstanceOf[t] }.asTerm))
               .toList
 
           replaceRefs(replacements*).transformTerm(rhs)(methSym)
@@ -228,16 +229,16 @@ private def createTablesImpl[Ctx <: ParserCtx: Type](
 
   logger.trace("Root production identified, generating parse and action tables.")
 
+  // productions are numbered by position, so the action of production i is actionTable(i);
+  // the start production goes last, it is never reduced by an action
   val parseTable = Expr:
     ParseTable(
-      Production.NonEmpty(parser.Symbol.Start, NEL(root.lhs)) :: table.map(_.production),
+      table.map(_.production) :+ Production.NonEmpty(parser.Symbol.Start, NEL(root.lhs)),
       conflictResolutionTable,
     ).tap: parseTable =>
       logger.toFile(s"$parserName/parseTable.dbg.csv", true)(parseTable.toCsv)
 
-  val actionTable = Expr.ofList:
-    table.map:
-      case (production, action) => Expr.ofTuple(Expr(production) -> action)
+  val actionTable = Expr.ofList(table.map(_.action))
 
-  '{ ($parseTable: ParseTable, ActionTable($actionTable.toMap)) }
+  '{ ($parseTable: ParseTable, ActionTable($actionTable.toArray)) }
 // $COVERAGE-ON$
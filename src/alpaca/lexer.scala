@@ -87,6 +87,23 @@ object Token:
   @compileTimeOnly("Should never be called outside the lexer definition")
   def apply[Name <: ValidName](value: Any)(using ctx: LexerCtx): Token[Name, ctx.type, value.type] = dummy
 
+  /**
+   * Creates a keyword token, recognized by the text another token matched.
+   *
+   * Its pattern must be a fixed string that some other token, typically an identifier,
+   * matches in full. The keyword adds no alternative to the lexer regex; instead, every
+   * match whose text is a keyword is turned into the keyword token with a single lookup
+   * in a perfect hash table, so lexing does not slow down as keywords are added.
+   *
+   * This is compile-time only and should only be used inside lexer definitions.
+   *
+   * @tparam Name the token name
+   * @param ctx the lexer context
+   * @return a token definition
+   */
+  @compileTimeOnly("Should never be called outside the lexer definition")
+  def Keyword[Name <: ValidName](using ctx: LexerCtx): Token[Name, ctx.type, String] = dummy
+
 /** Propagates the lexer context through the DSL so that token constructors can access it implicitly. */
 transparent inline def ctx(using c: LexerCtx): c.type = c
 
@@ -139,23 +156,32 @@ object LexerCtx:
    * - Applies any context modifications
    */
   given OnTokenMatch[LexerCtx] with
-    private val fieldNameCache = new java.util.concurrent.ConcurrentHashMap[Class[?], Array[String]]
-
     override def apply(token: LexerToken[?, LexerCtx, ?], raw: String, ctx: LexerCtx): Unit = token match
-      case DefinedToken(info, modifyCtx, remapping) =>
+      case defined @ DefinedToken(info, modifyCtx, remapping) =>
         modifyCtx(ctx)
-        val fieldNames = fieldNameCache.computeIfAbsent(ctx.getClass, _ => ctx.productElementNames.toArray)
         ctx.lastLexeme = Lexeme(
           name = info.name,
           value = remapping(ctx),
-          text = raw,
-          fieldNames = fieldNames,
+          matched = raw,
+          fieldNames = fieldNames(ctx),
           fieldValues = ctx.productIterator.toArray,
+          id = defined.id,
         )
 
       case InternalIgnoredToken(_, modifyCtx) =>
         modifyCtx(ctx)
 
+  private val fieldNameCache = new java.util.concurrent.ConcurrentHashMap[Class[?], Array[String]]
+
+  /**
+   * The names of the fields of a context, as stored in its lexemes.
+   *
+   * @param ctx the lexer context
+   * @return the names of the fields, shared by all contexts of the same class
+   */
+  private[alpaca] def fieldNames(ctx: LexerCtx): Array[String] =
+    fieldNameCache.computeIfAbsent(ctx.getClass, _ => ctx.productElementNames.toArray)
+
   /** Default error handler for any [[LexerCtx]] that throws on the first unrecognised character. */
   given ErrorHandling[LexerCtx] = ctx =>
     ErrorHandling.Strategy.Throw(new RuntimeException(s"Unexpected character: '${ctx.text.charAt(0)}'"))
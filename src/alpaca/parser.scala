@@ -1,11 +1,13 @@
 package alpaca
 
 import alpaca.internal.*
-import alpaca.internal.lexer.{Lexeme, Token}
+import alpaca.internal.lexer.{Lexeme, Token, Tokenization}
 import alpaca.internal.parser.*
 
 import scala.annotation.{compileTimeOnly, unused}
+import scala.concurrent.ExecutionContext
 import scala.deriving.Mirror
+import scala.util.Try
 
 type Parser[Ctx <: ParserCtx] = alpaca.internal.parser.Parser[Ctx]
 
@@ -249,4 +251,138 @@ extension [Ctx <: ParserCtx](parser: Parser[Ctx])
     result: (parser.root.type match
       case Rule[t] => t
     ) | Null,
-  ) = parser.unsafeParse(lexems)
+  ) = parser.unsafeParse(lexems.iterator)
+
+  /**
+   * Creates a session that parses many inputs, one at a time, keeping its stack allocated.
+   *
+   * Together with a lexer session, this avoids most per-input allocations when parsing many small inputs:
+   * {{{
+   *   val lexerSession = MyLexer.session()
+   *   val parserSession = MyParser.session()
+   *   messages.map(message => parserSession.parse(lexerSession.tokenize(message).lexemes).result)
+   * }}}
+   *
+   * @return a new session, to be used by a single thread
+   */
+  inline def session(): parser.Session[
+    (parser.root.type match
+      case Rule[t] => t
+    ),
+  ] = parser.newSession()
+
+  /**
+   * Creates a parser that is offered the lexemes one at a time, e.g. by an event loop.
+   *
+   * {{{
+   *   val parser = MyParser.pushParser()
+   *   lexemes.foreach(parser.offer)
+   *   val (ctx, result) = parser.finish()
+   * }}}
+   *
+   * @return a new push parser
+   */
+  inline def pushParser(): parser.PushParser[
+    (parser.root.type match
+      case Rule[t] => t
+    ),
+  ] = parser.newPushParser()
+
+  /**
+   * Parses a list of lexemes, keeping what [[reparse]] needs to parse an edited version of it quickly.
+   *
+   * @note Snapshots share the semantic values and shallow copies of the context, so both
+   *       should be immutable, or at least not mutated after they are created.
+   * @param lexems the list of lexems to parse
+   * @return the context and the result, which may be null on parse failure, along with the snapshots
+   */
+  inline def parseIncremental(lexems: List[Lexeme[?, ?]])(using Copyable[Ctx]): IncrementalParse[
+    Ctx,
+    (parser.root.type match
+      case Rule[t] => t
+    ),
+  ] = parser.unsafeParseIncremental(lexems, null)
+
+  /**
+   * Parses an edited version of a previously parsed list of lexemes.
+   *
+   * Parsing resumes from the last snapshot before the first lexeme that differs from the previous
+   * input, so the semantic actions of the unchanged prefix are not run again. If the parser state
+   * becomes equal to the previous one in the unchanged suffix, the previous result is reused.
+   * Combined with [[Tokenization.relex]], pass the `edit` of its result, so the changed lexemes are known
+   * without comparing the inputs:
+   * {{{
+   *   val tokens = MyLexer.relex(previousTokens, offset, removed, inserted)
+   *   val parsed = MyParser.reparse(previousParse, tokens.lexemes, tokens.edit)
+   * }}}
+   *
+   * @note Lexemes are compared by their token, value and text, not by the lexer context fields they captured,
+   *       so a reused result may refer to lexemes at their previous lines, positions or offsets.
+   * @param previous the result of parsing the previous version of the input
+   * @param lexems the list of lexems to parse
+   * @param edit the lexemes of the previous input replaced by the new ones, as returned by `relex`, if known
+   * @return the context and the result, which may be null on parse failure, along with the snapshots
+   */
+  inline def reparse(
+    previous: IncrementalParse[
+      Ctx,
+      (parser.root.type match
+        case Rule[t] => t
+      ),
+    ],
+    lexems: List[Lexeme[?, ?]],
+    edit: (start: Int, removed: Int, inserted: Int) | Null = null,
+  )(using Copyable[Ctx],
+  ): IncrementalParse[
+    Ctx,
+    (parser.root.type match
+      case Rule[t] => t
+    ),
+  ] = parser.unsafeParseIncremental(lexems, previous, edit)
+
+  /**
+   * Tokenizes and parses the input in a single pass.
+   *
+   * The parser pulls every lexeme from the lexer only when it needs the next
+   * lookahead, so no intermediate list of lexemes is built and shifted lexemes
+   * become garbage as soon as the parser is done with them.
+   *
+   * @param lexer the lexer producing the lexemes
+   * @param input the input to tokenize and parse
+   * @return a tuple of (context, result), where result may be null on parse failure
+   */
+  inline def parse(lexer: Tokenization[?], input: CharSequence): (
+    ctx: Ctx,
+    result: (parser.root.type match
+      case Rule[t] => t
+    ) | Null,
+  ) = parser.unsafeParse(lexer.tokenizeIterator(input))
+
+  /**
+   * Tokenizes and parses many independent inputs in parallel.
+   *
+   * Every input is tokenized and parsed by a separate task on the executor. A task borrows a lexer and
+   * a parser session from pools owned by the lexer and the parser, and returns them once done, so there
+   * are never more sessions than tasks running at once, whatever threads run them. The compiled pattern
+   * and tables are immutable, so the tasks only share the pools. An input that fails to tokenize or
+   * parse only fails its own result.
+   *
+   * @param lexer the lexer producing the lexemes
+   * @param inputs the inputs to tokenize and parse
+   * @param executor the executor running the tasks, e.g. one backed by virtual threads
+   * @return the outcome for every input, in input order
+   */
+  inline def parseAll(
+    lexer: Tokenization[?],
+    inputs: Iterable[CharSequence],
+    executor: ExecutionContext = ExecutionContext.global,
+  ): List[
+    Try[
+      (
+        ctx: Ctx,
+        result: (parser.root.type match
+          case Rule[t] => t
+        ) | Null,
+      ),
+    ],
+  ] = parser.unsafeParseAll(lexer, inputs, executor)
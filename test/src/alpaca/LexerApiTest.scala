@@ -104,4 +104,28 @@ final class LexerApiTest extends AnyFunSuite with Matchers {
     val (_, lexemes) = Lexer.tokenize("inc check inc inc check")
     lexemes.map(_.value) shouldBe List(1, 1, 2, 3, 3)
   }
+
+  test("tokenizeIterator matches lexemes on demand") {
+    val Lexer = lexer:
+      case x @ "[0-9]+" => Token["int"](x.toInt)
+      case x @ "[a-z]+" => Token["id"](x)
+      case "=" => Token["assign"]
+      case "\n" => Token.Ignored
+      case " " => Token.Ignored
+
+    val lexemes = Lexer.tokenizeIterator("x = 1\ny = x")
+    lexemes.next().value shouldBe "x"
+    lexemes.ctx.text.toString shouldBe " = 1\ny = x"
+    lexemes.ctx.line shouldBe 1
+
+    lexemes.map(_.name).toList shouldBe List("assign", "int", "id", "assign", "id")
+    lexemes.ctx.line shouldBe 2
+    lexemes.hasNext shouldBe false
+    intercept[NoSuchElementException](lexemes.next())
+
+    withLazyReader("a = 1\n" * 1000): reader =>
+      val streamed = Lexer.tokenizeIterator(reader)
+      streamed.count(_.name == "int") shouldBe 1000
+      streamed.ctx.line shouldBe 1001
+  }
 }
@@ -29,6 +29,11 @@ final class ParserApiTest extends AnyFunSuite with Matchers:
       ctx.line += newline.count(_ == '\n')
       Token.Ignored
 
+  val LineLexer = lexer:
+    case number @ "\\d+" => Token["NUMBER"](number.toInt)
+    case " " => Token.Ignored
+    case "\n" => Token.Ignored
+
   case class CalcContext(
     names: mutable.Map[String, Int] = mutable.Map.empty,
     errors: mutable.ListBuffer[(tpe: String, value: Any, line: Int)] = mutable.ListBuffer.empty,
@@ -84,6 +89,14 @@ final class ParserApiTest extends AnyFunSuite with Matchers:
       case (_, 47) =>
   }
 
+  test("parse pulls lexemes directly from the lexer") {
+    CalcApiParser.parse(CalcLexer, "a = 3 + 4 * (5 + 6)") should matchPattern:
+      case (ctx: CalcContext, _) if ctx.names("a") == 47 =>
+
+    CalcApiParser.parse(CalcLexer, "a(2+3,4+5)") should matchPattern:
+      case (_, ("a", Some(Seq(5, 9)))) =>
+  }
+
   test("ebnf") {
     CalcApiParser.parse(CalcLexer.tokenize("a()").lexemes) should matchPattern:
       case (_, ("a", None)) =>
@@ -117,6 +130,122 @@ final class ParserApiTest extends AnyFunSuite with Matchers:
       case (_, (1, None, List(3))) =>
   }
 
+  test("long repetitions keep their order") {
+    object ListParser extends Parser[CalcContext]:
+      val Num = rule:
+        case CalcLexer.NUMBER(n) => n.value
+
+      val root = rule:
+        case (Num.List(nums), CalcLexer.COMMA(_), Num.SeparatedBy[CalcLexer.PLUS](sum)) =>
+          (nums, sum)
+
+    val count = 100000
+    val input = (1 to count).mkString(" ") + "," + (1 to count).mkString("+")
+
+    val (_, (nums, sum)) = ListParser.parse(CalcLexer, input).runtimeChecked
+    nums shouldBe (1 to count).toList
+    sum.collect { case n: Int => n } shouldBe (1 to count).toList
+    sum.size shouldBe 2 * count - 1
+  }
+
+  test("reparse gives the same result as parsing the edited input") {
+    object SumParser extends Parser[CalcContext]:
+      val Num = rule:
+        case CalcLexer.NUMBER(n) => n.value
+
+      val root = rule:
+        case Num.SeparatedBy[CalcLexer.PLUS](nums) => nums.collect { case n: Int => n }.sum
+
+    val input = (100 to 999).mkString("+")
+    val previous = SumParser.parseIncremental(CalcLexer.tokenize(input).lexemes)
+    previous.result shouldBe (100 to 999).sum
+
+    for (offset, removed, inserted) <- List((0, 3, "1"), (2000, 3, "7+7"), (input.length - 3, 3, "1")) do
+      val lexemes = CalcLexer.tokenize(input.patch(offset, inserted, removed)).lexemes
+      SumParser.reparse(previous, lexemes).result shouldBe SumParser.parse(lexemes).result
+  }
+
+  test("reparse reuses the previous result once the parser state converges") {
+    object UnitParser extends Parser[CalcContext]:
+      val Num = rule:
+        case CalcLexer.NUMBER(_) => ()
+
+      val root = rule:
+        case Num.List(nums) => nums
+
+    val input = (100 to 999).mkString(" ")
+    val previous = UnitParser.parseIncremental(CalcLexer.tokenize(input).lexemes)
+    val reparsed = UnitParser.reparse(previous, CalcLexer.tokenize(input.patch(400, "555", 3)).lexemes)
+
+    reparsed.result should be theSameInstanceAs previous.result
+    UnitParser.reparse(reparsed, CalcLexer.tokenize(input + " 1").lexemes).result.nn should have size 901
+  }
+
+  test("reparse reuses the previous result after an edit that shifts the positions of the lexemes") {
+    object UnitParser extends Parser[CalcContext]:
+      val Num = rule:
+        case CalcLexer.NUMBER(_) => ()
+
+      val root = rule:
+        case Num.List(nums) => nums
+
+    val input = (100 to 999).mkString(" ")
+    val previous = UnitParser.parseIncremental(CalcLexer.tokenize(input).lexemes)
+    val reparsed = UnitParser.reparse(previous, CalcLexer.tokenize(input.patch(0, "1000", 3)).lexemes)
+
+    reparsed.result should be theSameInstanceAs previous.result
+  }
+
+  test("reparse takes the changed lexemes from relex") {
+    object LineParser extends Parser[CalcContext]:
+      val Num = rule:
+        case LineLexer.NUMBER(_) => ()
+
+      val root = rule:
+        case Num.List(nums) => nums
+
+    val input = (100 to 999).grouped(10).map(_.mkString(" ")).mkString("\n")
+    val previousTokens = LineLexer.tokenizeIncremental(input)
+    val previous = LineParser.parseIncremental(previousTokens.lexemes)
+    val tokens = LineLexer.relex(previousTokens, 44, 3, "5555")
+    val reparsed = LineParser.reparse(previous, tokens.lexemes, tokens.edit)
+
+    tokens.edit.toTuple shouldBe (10, 10, 10)
+    reparsed.result should be theSameInstanceAs previous.result
+    val appended = (start = 900, removed = 0, inserted = 1)
+    LineParser.reparse(reparsed, tokens.lexemes :+ tokens.lexemes.head, appended).result.nn should have size 901
+  }
+
+  test("sessions parse many inputs like parse") {
+    val lexerSession = CalcLexer.session()
+    val parserSession = CalcApiParser.session()
+
+    for input <- List("1 + 2", "a(2+3,4+5)", "7 * (1 + 1)", "a()") do
+      val lexemes = lexerSession.tokenize(input).lexemes
+      lexemes.map(_.name) shouldBe CalcLexer.tokenize(input).lexemes.map(_.name)
+      parserSession.parse(lexemes).result shouldBe CalcApiParser.parse(lexemes).result
+  }
+
+  test("parseAll keeps the input order and isolates failures") {
+    val inputs = (1 to 200).map(i => s"$i * 2") :+ "1 + $"
+    val results = CalcApiParser.parseAll(CalcLexer, inputs)
+
+    results.init.map(_.get.result) shouldBe (1 to 200).map(_ * 2)
+    results.last.isFailure shouldBe true
+  }
+
+  test("push parser is driven by a push lexer") {
+    val lexer = CalcLexer.pushLexer()
+    val parser = CalcApiParser.pushParser()
+
+    for chunk <- "a(2+3".grouped(2) ++ Iterator(",4", "+5)") do lexer.feed(chunk).foreach(parser.offer)
+    lexer.end().foreach(parser.offer)
+
+    parser.finish() should matchPattern:
+      case (_, ("a", Some(Seq(5, 9)))) =>
+    intercept[IllegalStateException](parser.offer(CalcLexer.tokenize("1").lexemes.head))
+  }
+
   test("parse error") {
     @unused
     val lexems = CalcLexer.tokenize("a 123 4 + 5").lexemes
@@ -0,0 +1,19 @@
+package alpaca.internal
+
+import org.scalatest.funsuite.AnyFunSuite
+import org.scalatest.matchers.should.Matchers
+
+final class PackedIntsTest extends AnyFunSuite with Matchers:
+
+  test("pack and unpack round-trip extreme and negative values") {
+    val values = Array(0, 1, -1, 31, 32, -32, 1000, Int.MaxValue, Int.MinValue, 42)
+    PackedInts.unpack(values.length, PackedInts.pack(values)*) shouldBe values
+  }
+
+  test("large arrays are split into several chunks") {
+    val values = Array.tabulate(100000)(i => i * 7919 - 50000)
+    val chunks = PackedInts.pack(values)
+
+    chunks.size should be > 1
+    PackedInts.unpack(values.length, chunks*) shouldBe values
+  }
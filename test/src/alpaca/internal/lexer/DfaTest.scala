@@ -0,0 +1,118 @@
+package alpaca
+package internal
+package lexer
+
+import org.scalatest.funsuite.AnyFunSuite
+import org.scalatest.matchers.should.Matchers
+
+final case class DfaCtx(var position: Int = 1, var line: Int = 1)
+  extends LexerCtx
+    with PositionTracking
+    with LineTracking
+    with DfaMatching
+
+final class DfaTest extends AnyFunSuite with Matchers:
+  private given DebugSettings = DebugSettings.default
+
+  private def matchAt(dfa: Dfa, text: String): Option[(Int, Int)] =
+    dfa.matchAt(text, 0) match
+      case Dfa.NoMatch => None
+      case packed => Some((Dfa.token(packed), Dfa.end(packed)))
+
+  test("earlier tokens win and the longest match of the winner is taken") {
+    withLog:
+      val dfa = DfaBuilder(List("if", "[a-z]+", "\\d+(\\.\\d+)?"))
+      matchAt(dfa, "if(") shouldBe Some((0, 2))
+      matchAt(dfa, "iffy") shouldBe Some((0, 2))
+      matchAt(dfa, "else ") shouldBe Some((1, 4))
+      matchAt(dfa, "3.14+") shouldBe Some((2, 4))
+      matchAt(dfa, "3.x") shouldBe Some((2, 1))
+      matchAt(dfa, "!") shouldBe None
+  }
+
+  test("supports classes, escapes, bounded repetition and alternation") {
+    withLog:
+      val dfa = DfaBuilder(List("\\x41|\\u0042|\\Q*+\\E", "[\\s-]+", "[^\"\\\\]{2,3}"))
+      matchAt(dfa, "B") shouldBe Some((0, 1))
+      matchAt(dfa, "*+") shouldBe Some((0, 2))
+      matchAt(dfa, " - \t") shouldBe Some((1, 4))
+      matchAt(dfa, "abcd") shouldBe Some((2, 3))
+      matchAt(dfa, "a\"") shouldBe None
+  }
+
+  test("rejects non-regular constructs") {
+    withLog:
+      List("a+?", "a++", "^a", "(?=a)", "(a)\\1", "(?i)a", "[a&&b]", "\\bword").foreach: pattern =>
+        intercept[UnsupportedPatternException]:
+          DfaBuilder(List(pattern))
+        .getMessage should include(pattern)
+  }
+
+  test("DFA lexer produces the same lexemes as the regex lexer") {
+    val RegexLexer = lexer:
+      case "\\s+" => Token.Ignored
+      case "let" => Token["let"]
+      case x @ "[a-z_][a-z0-9_]*" => Token["id"](x)
+      case x @ "[0-9]+" => Token["int"](x.toInt)
+      case "==" => Token["eq"]
+      case "=" => Token["assign"]
+
+    val DfaLexer = lexer[DfaCtx]:
+      case "\\s+" => Token.Ignored
+      case "let" => Token["let"]
+      case x @ "[a-z_][a-z0-9_]*" => Token["id"](x)
+      case x @ "[0-9]+" => Token["int"](x.toInt)
+      case "==" => Token["eq"]
+      case "=" => Token["assign"]
+
+    val input = "let letter = 42\nlet x == letter"
+    val expected = RegexLexer.tokenize(input).lexemes
+    val actual = DfaLexer.tokenize(input).lexemes
+
+    actual.map(_.name) shouldBe expected.map(_.name)
+    actual.map(_.value) shouldBe expected.map(_.value)
+    actual.map(_.text) shouldBe expected.map(_.text)
+    actual.map(_.fieldValues.toList) shouldBe expected.map(_.fieldValues.toList)
+  }
+
+  test("inner chars are the ones a match can continue after") {
+    withLog:
+      def inner(pattern: String) = RegexAst.innerChars(RegexAst.parse(pattern))
+      inner("\\n") shouldBe CharRanges.empty
+      inner("[a-z]+\\n?") shouldBe CharRanges.range('a', 'z')
+      inner("\\s+").contains('\n') shouldBe true
+      inner("//[^\\n]*\\n") shouldBe CharRanges.of('\n').complement
+  }
+
+  test("literal patterns are recognized with their text") {
+    withLog:
+      def literal(pattern: String) = RegexAst.literal(RegexAst.parse(pattern))
+      literal("\\+=") shouldBe "+="
+      literal("(if)") shouldBe "if"
+      literal("a{3}") shouldBe "aaa"
+      literal("[x]y") shouldBe "xy"
+      literal("a+") shouldBe null
+      literal("a|b") shouldBe null
+      literal("(ab)?") shouldBe null
+  }
+
+  test("first chars are the ones a match can start with") {
+    withLog:
+      def first(pattern: String) = RegexAst.firstChars(RegexAst.parse(pattern))
+      first("-?[0-9]+") shouldBe CharRanges.of('-').union(CharRanges.Digit)
+      first("(ab|c)d") shouldBe CharRanges.chars('a', 'c')
+      first("a*") shouldBe CharRanges.range(0, CharRanges.MaxChar)
+  }
+
+  test("runs are split into their leading classes and the class of the run") {
+    withLog:
+      def run(pattern: String) = RegexAst.run(RegexAst.parse(pattern)).map(run => (run.head, run.tail))
+      run("\\s+") shouldBe Some((CharRanges.Space :: CharRanges.Space :: Nil, CharRanges.Space))
+      run("[a-z][a-z0-9]*") shouldBe Some(
+        (CharRanges.range('a', 'z') :: Nil, CharRanges.range('a', 'z').union(CharRanges.Digit)),
+      )
+      run("#") shouldBe Some((CharRanges.of('#') :: Nil, CharRanges.empty))
+      run("[0-9]*") shouldBe None
+      run("a|b") shouldBe None
+      run("a+b") shouldBe None
+  }
@@ -94,3 +94,20 @@ final class ErrorHandlingStrategyTest extends AnyFunSuite with Matchers:
     // Default context has position tracking
     ctx.position shouldBe 4 // 'a' (1) + '!' (2) + 'a' (3) -> next is 4
   }
+
+  test("Strategy.IgnoreToken skips the same text when the input is pushed in chunks") {
+    var ignoredTokens = 0
+    given ErrorHandling[LexerCtx.Default] = _ =>
+      ignoredTokens += 1
+      ErrorHandling.Strategy.IgnoreToken
+
+    val L = lexer:
+      case "a" => Token["A"]
+      case "b" => Token["B"]
+
+    val push = L.pushLexer()
+    val lexemes = List("aa..", ".b", "b..", "a").flatMap(chunk => push.feed(chunk)) ++ push.end()
+    lexemes.map(_.name) shouldBe List("A", "A", "B", "B", "A")
+    ignoredTokens shouldBe 2
+    push.ctx.position shouldBe 11
+  }
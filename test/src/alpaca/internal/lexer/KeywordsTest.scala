@@ -0,0 +1,30 @@
+package alpaca
+package internal
+package lexer
+
+import org.scalatest.funsuite.AnyFunSuite
+import org.scalatest.matchers.should.Matchers
+
+final class KeywordsTest extends AnyFunSuite with Matchers:
+
+  private def keywordsOf(texts: List[String]): Keywords[LexerCtx] =
+    val tokens = texts.map: text =>
+      DefinedToken[ValidName, LexerCtx, Unit](TokenInfo(text, text, text, text, keyword = true), _ => (), _ => ())
+    Keywords(Keywords.table(texts), tokens.toArray)
+
+  test("every keyword is found in its own slot") {
+    val texts = List.tabulate(500)(i => s"kw$i")
+    val keywords = keywordsOf(texts)
+
+    texts.zipWithIndex.foreach: (text, index) =>
+      keywords(text) shouldBe index
+  }
+
+  test("other texts are not keywords") {
+    val keywords = keywordsOf(List("if", "else", "while"))
+
+    keywords("iff") shouldBe -1
+    keywords("") shouldBe -1
+    keywords("whilst") shouldBe -1
+    keywordsOf(Nil)("if") shouldBe -1
+  }
@@ -109,3 +109,40 @@ final class LazyReaderTest extends AnyFunSuite:
       lazyReader.from(6)
       assert(lazyReader.toString == "world")
   }
+
+  test("window slides over input larger than the buffer") {
+    val content = Iterator.tabulate(100000)(i => ('a' + i % 26).toChar).mkString
+    val lazyReader = new LazyReader(new StringReader(content), content.length)
+    var consumed = 0
+    while consumed < content.length - 1000 do
+      assert(lazyReader.subSequence(0, 1000) == content.substring(consumed, consumed + 1000))
+      lazyReader.from(777)
+      consumed += 777
+    assert(lazyReader.charAt(0) == content.charAt(consumed))
+    assert(lazyReader.toString == content.substring(consumed))
+  }
+
+  test("window grows to fit a lookahead longer than the buffer") {
+    val content = "x" * 50000 + "y"
+    val lazyReader = new LazyReader(new StringReader(content), content.length)
+    lazyReader.from(10)
+    assert(lazyReader.charAt(49990) == 'y')
+    assert(lazyReader.subSequence(0, 49991).toString == content.substring(10))
+  }
+
+  test("LazyReader.from should use the decoded length for multi-byte files") {
+    withLazyReader("zażółć 😀"): lazyReader =>
+      assert(lazyReader.length == 9)
+      assert(lazyReader.toString == "zażółć 😀")
+  }
+
+  test("size is only evaluated when the length is needed") {
+    var evaluated = false
+    Using.resource(new LazyReader(new StringReader("ab"), () => { evaluated = true; 2L })): lazyReader =>
+      assert(!lazyReader.isEmpty)
+      lazyReader.from(2)
+      assert(lazyReader.isEmpty)
+      assert(!evaluated)
+      assert(lazyReader.length == 0)
+      assert(evaluated)
+  }
@@ -4,6 +4,41 @@ package internal.lexer
 import org.scalatest.funsuite.AnyFunSuite
 import org.scalatest.matchers.should.Matchers
 
+import java.nio.ByteBuffer
+import java.nio.charset.StandardCharsets
+import scala.deriving.Mirror
+
+final case class AsciiCtx(var position: Int = 1, var line: Int = 1)
+  extends LexerCtx
+    with PositionTracking
+    with LineTracking
+    with AsciiMatching
+
+final case class OffsetCtx(var offset: Int = 0) extends LexerCtx with OffsetTracking
+
+trait Depth:
+  var depth: Int
+
+final case class DepthCtx(var position: Int = 1, var line: Int = 1, var depth: Int = 0)
+  extends LexerCtx
+    with PositionTracking
+    with LineTracking
+    with Depth
+
+final case class SpecializedCtx(var position: Int = 1, var line: Int = 1, var depth: Int = 0)
+  extends LexerCtx
+    with PositionTracking
+    with LineTracking
+    with Depth
+    with SpecializedMatching
+
+final case class LazyTextCtx(var position: Int = 1, var line: Int = 1, var depth: Int = 0)
+  extends LexerCtx
+    with PositionTracking
+    with LineTracking
+    with Depth
+    with LazyText
+
 final class LexerTest extends AnyFunSuite with Matchers:
 
   extension (lexeme: Lexeme[?, ?])
@@ -13,6 +48,32 @@ final class LexerTest extends AnyFunSuite with Matchers:
       fields = lexeme.fieldNames.iterator.zip(lexeme.fieldValues.iterator).toMap + ("text" -> lexeme.text),
     )
 
+  // the same lexer for every context, to compare how the traits mixed into it change the matching
+  private transparent inline def depthLexer[Ctx <: LexerCtx & Depth](using Mirror.ProductOf[Ctx]) = lexer[Ctx]:
+    case x @ ("if" | "else") => Token.Keyword[x.type]
+    case "\\(" =>
+      ctx.depth += 1
+      Token["("](ctx.depth)
+    case "\\)" =>
+      ctx.depth -= 1
+      Token[")"]
+    case id @ "[a-z]+" => Token["ID"](id)
+    case "[0-9]+" => Token["NUM"]
+    case "#[^\\n]*" => Token.Ignored
+    case "[ \\t]+" => Token.Ignored
+    case "\n" => Token.Ignored
+
+  private val depthInput = "if (x (12)) 345 # note\nelse iffy\n  (7)"
+
+  private def outcome[Ctx <: PositionTracking & LineTracking & Depth](
+    result: (ctx: Ctx, lexemes: List[Lexeme[?, ?]]),
+  ) = (
+    lexemes = result.lexemes.map(_.shape),
+    position = result.ctx.position,
+    line = result.ctx.line,
+    depth = result.ctx.depth,
+  )
+
   test("selectDynamic returns ctx fields and throws for missing keys") {
     val lexeme: Lexeme[?, ?] =
       new Lexeme("IDENTIFIER", "hello", "hello", Array("position", "line"), Array(6, 1))
@@ -73,6 +134,125 @@ final class LexerTest extends AnyFunSuite with Matchers:
     assert(exception.getMessage.contains("Unexpected character at line 1, position 4: 'a'"))
   }
 
+  test("matches of a literal token share one text") {
+    val Lexer = lexer:
+      case number @ "[0-9]+" => Token["NUMBER"](number)
+      case "\\+" => Token["PLUS"]
+      case "\\s+" => Token.Ignored
+
+    val lexemes = Lexer.tokenize("1 + 2 + 3").lexemes
+    val pluses = lexemes.filter(_.name == "PLUS")
+
+    pluses.map(_.text) shouldBe List("+", "+")
+    pluses.head.text should be theSameInstanceAs pluses.last.text
+    lexemes.map(_.text) shouldBe List("1", "+", "2", "+", "3")
+  }
+
+  test("literal tokens keep the priority of the order they are defined in") {
+    val Lexer = lexer:
+      case "if" => Token["IF"]
+      case number @ "-?[0-9]+" => Token["NUMBER"](number.toInt)
+      case "-" => Token["MINUS"]
+      case "==" => Token["EQ"]
+      case "=" => Token["ASSIGN"]
+      case id @ "[a-z]+" => Token["ID"](id)
+      case " " => Token.Ignored
+
+    Lexer.tokenize("if ifx = -1 - 2 == x").lexemes.map(lexeme => (lexeme.name, lexeme.value)) shouldBe List(
+      ("IF", ()),
+      ("IF", ()),
+      ("ID", "x"),
+      ("ASSIGN", ()),
+      ("NUMBER", -1),
+      ("MINUS", ()),
+      ("NUMBER", 2),
+      ("EQ", ()),
+      ("ID", "x"),
+    )
+  }
+
+  test("tokens matching runs of characters are found without the regex like with it") {
+    val Lexer = lexer:
+      case "//[^\\n]*" => Token.Ignored
+      case "/" => Token["DIV"]
+      case id @ "[a-z][a-z0-9]*" => Token["ID"](id)
+      case number @ "[0-9]+" => Token["NUM"](number.toInt)
+      case "[ \\t]+" => Token.Ignored
+      case "\n" => Token.Ignored
+
+    val (ctx, lexemes) = Lexer.tokenize("x1 / y // note\nz9\t 42")
+
+    lexemes.map(lexeme => (lexeme.name, lexeme.value)) shouldBe List(
+      ("ID", "x1"),
+      ("DIV", ()),
+      ("ID", "y"),
+      ("ID", "z9"),
+      ("NUM", 42),
+    )
+    (ctx.line, ctx.position) shouldBe (2, 7)
+  }
+
+  test("ignored tokens without a block are skipped in bulk like they are matched") {
+    val Skipping = lexer[DepthCtx]:
+      case id @ "[a-z]+" => Token["ID"](id)
+      case "[ \\t]+" => Token.Ignored
+      case "\n" => Token.Ignored
+
+    val Matching = lexer[DepthCtx]:
+      case id @ "[a-z]+" => Token["ID"](id)
+      case "[ \\t]+" =>
+        ctx.depth += 0
+        Token.Ignored
+      case "\n" =>
+        ctx.depth += 0
+        Token.Ignored
+
+    val input = "ab  cd\n\t ef \n\ngh"
+    val (skippingCtx, skippingLexemes) = Skipping.tokenize(input)
+    val (matchingCtx, matchingLexemes) = Matching.tokenize(input)
+
+    skippingLexemes.map(_.shape) shouldBe matchingLexemes.map(_.shape)
+    (skippingCtx.position, skippingCtx.line) shouldBe (matchingCtx.position, matchingCtx.line)
+    (skippingCtx.position, skippingCtx.line) shouldBe (3, 4)
+  }
+
+  test("ignored tokens run an OnTokenMatch that is not derived for the context") {
+    var matches = List.empty[String]
+    given OnTokenMatch[DepthCtx] = (_, matched, _) => matches ::= matched
+
+    val Blanks = lexer[DepthCtx]:
+      case "[ \\t]+" => Token.Ignored
+      case "\n" => Token.Ignored
+
+    Blanks.tokenize(" \t\n  ")
+    matches.reverse shouldBe List(" \t", "\n", "  ")
+  }
+
+  test("keywords reclassify the identifiers that match them") {
+    val Lexer = lexer:
+      case x @ ("if" | "else" | "while") => Token.Keyword[x.type]
+      case id @ "[a-z]+" => Token["ID"](id)
+      case " " => Token.Ignored
+
+    Lexer.tokenize("if iffy else whilex while").lexemes.map(_.name) shouldBe List("if", "ID", "else", "ID", "while")
+  }
+
+  test("keywords must be matched in full by another token") {
+    """
+      |lexer:
+      |  case "if" => Token.Keyword["IF"]
+      |  case "[0-9]+" => Token["NUM"]
+      |""".stripMargin shouldNot compile
+  }
+
+  test("keywords must be matched in full by a token that is not ignored") {
+    """
+      |lexer:
+      |  case "if" => Token.Keyword["IF"]
+      |  case "[a-z]+" => Token.Ignored
+      |""".stripMargin shouldNot compile
+  }
+
   test("tokenize complex expression") {
     val Lexer = lexer:
       case number @ "[0-9]+" => Token["NUMBER"](number)
@@ -164,3 +344,222 @@ final class LexerTest extends AnyFunSuite with Matchers:
         ),
       )
   }
+
+  test("tokenizeParallel matches tokenize when tokens cannot span the boundary") {
+    val Lexer = lexer:
+      case number @ "[0-9]+" => Token["NUMBER"](number.toInt)
+      case id @ "[a-z]+" => Token["IDENTIFIER"](id)
+      case "\\n" => Token.Ignored
+      case "[ \\t]+" => Token.Ignored
+
+    val input = (1 to 200).map(i => s"line$i ${i * 7}\tx").mkString("\n")
+    val sequential = Lexer.tokenize(input)
+    val parallel = Lexer.tokenizeParallel(input, chunkSize = 64)
+
+    parallel.lexemes.map(_.shape) shouldBe sequential.lexemes.map(_.shape)
+    parallel.ctx.line shouldBe sequential.ctx.line
+    parallel.ctx.position shouldBe sequential.ctx.position
+  }
+
+  test("offsets are located with a line index, inside multi-line tokens too") {
+    val Lexer = lexer[OffsetCtx]:
+      case comment @ "/\\*[^*]*\\*/" => Token["COMMENT"](comment)
+      case id @ "[a-z]+" => Token["ID"](id)
+      case "\\s+" => Token.Ignored
+
+    val input = "a\n/* x\ny */ b"
+    val index = LineIndex(input)
+    val (ctx, lexemes) = Lexer.tokenize(input)
+    val spans = lexemes.map: lexeme =>
+      val end = lexeme.selectDynamic("offset").asInstanceOf[Int]
+      (index(end - lexeme.text.length), index(end))
+
+    ctx.offset shouldBe input.length
+    spans shouldBe List(
+      ((line = 1, column = 1), (line = 1, column = 2)),
+      ((line = 2, column = 1), (line = 3, column = 5)),
+      ((line = 3, column = 6), (line = 3, column = 7)),
+    )
+    intercept[IllegalArgumentException](index(input.length + 1))
+  }
+
+  test("tokenizeParallel rebases offsets") {
+    val Lexer = lexer[OffsetCtx]:
+      case id @ "[a-z0-9]+" => Token["ID"](id)
+      case "\\n" => Token.Ignored
+      case " " => Token.Ignored
+
+    val input = (1 to 100).map(i => s"line $i").mkString("\n")
+
+    Lexer.tokenizeParallel(input, chunkSize = 64).lexemes.map(_.shape) shouldBe
+      Lexer.tokenize(input).lexemes.map(_.shape)
+  }
+
+  test("tokenizeParallel rejects a boundary that a token can span") {
+    val Lexer = lexer:
+      case id @ "[a-z]+" => Token["IDENTIFIER"](id)
+      case "\\s+" => Token.Ignored
+
+    intercept[IllegalArgumentException](Lexer.tokenizeParallel("a\nb", chunkSize = 1))
+    Lexer.tokenizeParallel("a;b;c", boundary = ';', chunkSize = 1).lexemes should have size 3
+  }
+
+  test("relex matches tokenizing the edited input and reuses the lines after the edit") {
+    val Lexer = lexer:
+      case number @ "[0-9]+" => Token["NUMBER"](number.toInt)
+      case id @ "[a-z]+" => Token["IDENTIFIER"](id)
+      case "\\n" => Token.Ignored
+      case " +" => Token.Ignored
+
+    val input = "let x 1\nlet y 22\nlet z 333\n"
+    val previous = Lexer.tokenizeIncremental(input)
+    previous.lexemes.map(_.shape) shouldBe Lexer.tokenize(input).lexemes.map(_.shape)
+
+    val edits = List(
+      (6, 1, "42"),
+      (12, 0, "abc "),
+      (4, 12, ""),
+      (7, 1, " 5\nlet w"),
+      (input.length, 0, "tail"),
+    )
+    edits.foreach: (offset, removed, inserted) =>
+      val edited = input.patch(offset, inserted, removed)
+      val relexed = Lexer.relex(previous, offset, removed, inserted)
+      val expected = Lexer.tokenize(edited)
+
+      relexed.text shouldBe edited
+      relexed.lexemes.map(_.shape) shouldBe expected.lexemes.map(_.shape)
+      relexed.ctx.line shouldBe expected.ctx.line
+      relexed.ctx.position shouldBe expected.ctx.position
+
+    val relexed = Lexer.relex(previous, 6, 1, "9")
+    relexed.lexemes.last should be theSameInstanceAs previous.lexemes.last
+  }
+
+  test("push lexer emits the same lexemes as tokenize, whatever the chunks") {
+    val Lexer = lexer:
+      case number @ "[0-9]+" => Token["NUMBER"](number.toInt)
+      case id @ "[^\\s0-9+]+" => Token["IDENTIFIER"](id)
+      case "\\+" => Token["PLUS"]
+      case "\\s+" => Token.Ignored
+
+    val input = "zażółć 12 + gęślą\n 345 + x1"
+    val (ctx, expectedLexemes) = Lexer.tokenize(input)
+    val expected = expectedLexemes.map(_.shape)
+
+    for size <- List(1, 2, 5, input.length) do
+      val push = Lexer.pushLexer()
+      val lexemes = input.grouped(size).flatMap(chunk => push.feed(chunk)).toList ++ push.end()
+      lexemes.map(_.shape) shouldBe expected
+      push.ctx.line shouldBe ctx.line
+
+    val bytes = input.getBytes(java.nio.charset.StandardCharsets.UTF_8)
+    val push = Lexer.pushLexer()
+    val lexemes = bytes.grouped(3).flatMap(chunk => push.feed(java.nio.ByteBuffer.wrap(chunk))).toList ++ push.end()
+    lexemes.map(_.shape) shouldBe expected
+  }
+
+  test("push lexer holds back a token that the next chunk could extend") {
+    val Lexer = lexer:
+      case number @ "[0-9]+" => Token["NUMBER"](number.toInt)
+      case " " => Token.Ignored
+
+    val push = Lexer.pushLexer()
+    push.feed("12 3").map(_.value) shouldBe List(12)
+    push.feed("4 ").map(_.value) shouldBe List(34)
+    push.end() shouldBe Nil
+  }
+
+  test("specialised matching handles matches like OnTokenMatch") {
+    outcome(depthLexer[SpecializedCtx].tokenize(depthInput)) shouldBe outcome(depthLexer[DepthCtx].tokenize(depthInput))
+  }
+
+  test("specialised matching dispatches to the handler of the chunk of the matched token") {
+    val Specialized = lexer[SpecializedCtx]:
+      case "a" => Token["A"]
+      case "b" => Token["B"]
+      case "c" => Token["C"]
+      case "d" => Token["D"]
+      case "e" => Token["E"]
+      case "f" => Token["F"]
+      case "g" => Token["G"]
+      case "h" => Token["H"]
+      case "i" => Token["I"]
+      case "j" => Token["J"]
+      case "k" => Token["K"]
+      case "l" => Token["L"]
+      case "m" => Token["M"]
+      case "n" => Token["N"]
+      case "o" => Token["O"]
+      case "p" => Token["P"]
+      case "q" => Token["Q"]
+      case "r" => Token["R"]
+      case "s" => Token["S"]
+      case number @ "[0-9]+" => Token["NUM"](number.toInt)
+      case "[ \\t\\n]+" => Token.Ignored
+
+    val (ctx, lexemes) = Specialized.tokenize("a p q\ns 42 b")
+
+    lexemes.map(lexeme => (lexeme.name, lexeme.value)) shouldBe
+      List(("A", ()), ("P", ()), ("Q", ()), ("S", ()), ("NUM", 42), ("B", ()))
+    lexemes.map(_.text) shouldBe List("a", "p", "q", "s", "42", "b")
+    (ctx.position, ctx.line) shouldBe (7, 2)
+  }
+
+  test("specialised matching needs an OnTokenMatch derived from the parents of the context") {
+    """
+      |final case class OwnHookCtx() extends LexerCtx with SpecializedMatching
+      |given OnTokenMatch[OwnHookCtx] = (_, _, _) => ()
+      |lexer[OwnHookCtx]:
+      |  case "a" => Token["A"]
+      |""".stripMargin shouldNot compile
+  }
+
+  test("lexemes of lazy text contexts are the same as the ones with their text copied") {
+    val Lazy = depthLexer[LazyTextCtx]
+    val copied = outcome(depthLexer[DepthCtx].tokenize(depthInput))
+    val result = Lazy.tokenize(depthInput)
+
+    outcome(result) shouldBe copied
+    outcome(Lazy.tokenize(new StringBuilder(depthInput))) shouldBe copied
+    result.ctx.lastRawMatched shouldBe "iffy"
+  }
+
+  test("lazy text contexts copy the text of tokens passing the context to other methods") {
+    def textOf(context: LexerCtx) = context.lastRawMatched
+
+    val Lazy = lexer[LazyTextCtx]:
+      case "[a-z]+" =>
+        ctx.depth += textOf(ctx).length
+        Token["ID"]
+      case " " => Token.Ignored
+
+    val result = Lazy.tokenize("ab cde f")
+
+    result.ctx.depth shouldBe 6
+    result.lexemes.map(_.text) shouldBe List("ab", "cde", "f")
+  }
+
+  test("ASCII lexers tokenize bytes like the decoded text") {
+    val Lexer = lexer[AsciiCtx]:
+      case number @ "[0-9]+" => Token["NUMBER"](number.toInt)
+      case text @ "\"[ !#-~]*\"" => Token["STRING"](text)
+      case "[{}:,]" => Token.Ignored
+      case "\n" => Token.Ignored
+      case " +" => Token.Ignored
+
+    val input = "{\"a\": 1,\n \"b c\": 23}"
+    val bytes = input.getBytes(StandardCharsets.US_ASCII)
+    val expected = Lexer.tokenize(input).lexemes.map(_.shape)
+
+    Lexer.tokenizeBytes(bytes).lexemes.map(_.shape) shouldBe expected
+    val direct = ByteBuffer.allocateDirect(bytes.length).put(bytes).flip()
+    Lexer.tokenizeBytes(direct).lexemes.map(_.shape) shouldBe expected
+  }
+
+  test("ASCII lexers reject patterns matching other characters") {
+    """
+      |lexer[AsciiCtx]:
+      |  case text @ "\"[^\"]*\"" => Token["STRING"](text)
+      |""".stripMargin shouldNot compile
+  }
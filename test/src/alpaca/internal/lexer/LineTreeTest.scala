@@ -0,0 +1,42 @@
+package alpaca
+package internal
+package lexer
+
+import org.scalatest.funsuite.AnyFunSuite
+import org.scalatest.matchers.should.Matchers
+
+import scala.util.Random
+
+final class LineTreeTest extends AnyFunSuite with Matchers:
+
+  private def treeOf(lines: IndexedSeq[String]): LineTree[String] = LineTree.from(lines)(_.length, _.count(_ == ' '))
+
+  test("lines are found by index and by offset") {
+    val lines = Vector("ab\n", "\n", "cde\n", "f")
+    val tree = treeOf(lines)
+
+    tree.size shouldBe 4
+    tree.length shouldBe 9
+    lines.indices.foreach(i => tree(i) shouldBe lines(i))
+    (0 to 9).map(tree.locate(_).toTuple) shouldBe
+      Vector((0, 0), (0, 0), (0, 0), (1, 3), (2, 4), (2, 4), (2, 4), (2, 4), (3, 8), (3, 8))
+    an[IndexOutOfBoundsException] should be thrownBy tree(4)
+  }
+
+  test("splicing keeps the lines in order, their sums and the tree balanced") {
+    val random = new Random(42)
+    var lines = Vector.tabulate(200)(i => " " * (i % 3) + s"line$i\n")
+    var tree = treeOf(lines)
+
+    (1 to 300).foreach: step =>
+      val from = random.nextInt(lines.length + 1)
+      val until = from + random.nextInt(lines.length - from + 1)
+      val inserted = Vector.tabulate(random.nextInt(4))(i => s"edit$step $i\n")
+      lines = lines.take(from) ++ inserted ++ lines.drop(until)
+      tree = tree.take(from) ++ treeOf(inserted) ++ tree.drop(until)
+
+      tree.iterator.toVector shouldBe lines
+      tree.length shouldBe lines.map(_.length).sum
+      tree.countBefore(from) shouldBe lines.take(from).map(_.count(_ == ' ')).sum
+      tree.height should be <= (1.45 * math.log(lines.length + 2) / math.log(2)).ceil.toInt
+  }
@@ -0,0 +1,60 @@
+package alpaca
+package internal.lexer
+
+import org.scalatest.funsuite.AnyFunSuite
+import org.scalatest.matchers.should.Matchers
+
+import java.nio.charset.{Charset, StandardCharsets}
+import java.nio.file.Files
+import scala.util.Using
+
+final class MappedInputTest extends AnyFunSuite with Matchers:
+
+  private def withMappedInput[A](
+    content: String,
+    charset: Charset = StandardCharsets.UTF_8,
+  )(
+    action: MappedInput => A,
+  ): A =
+    val tempFile = Files.createTempFile("mapped", ".txt")
+    try
+      Files.write(tempFile, content.getBytes(charset))
+      Using.resource(MappedInput.from(tempFile, charset))(action)
+    finally Files.deleteIfExists(tempFile)
+
+  test("ASCII content is served from the mapped bytes") {
+    withMappedInput("hello mapped world"): input =>
+      input.length shouldBe 18
+      input.charAt(6) shouldBe 'm'
+      input.subSequence(6, 12) shouldBe "mapped"
+      input.from(13)
+      input.length shouldBe 5
+      input.toString shouldBe "world"
+      intercept[IndexOutOfBoundsException](input.charAt(5))
+  }
+
+  test("multi-byte UTF-8 content has the length of the decoded text") {
+    val content = "zażółć gęślą jaźń 😀 ∑ end"
+    withMappedInput(content): input =>
+      input.length shouldBe content.length
+      input.toString shouldBe content
+      input.from(content.indexOf("😀"))
+      input.subSequence(0, 2) shouldBe "😀"
+      input.charAt(3) shouldBe '∑'
+  }
+
+  test("Latin-1 content maps bytes to chars directly") {
+    val content = "café crème brûlée"
+    withMappedInput(content, StandardCharsets.ISO_8859_1): input =>
+      input.length shouldBe content.length
+      input.toString shouldBe content
+  }
+
+  test("lexer tokenizes a mapped file") {
+    val Lexer = lexer:
+      case x @ "[^ ]+" => Token["word"](x)
+      case " " => Token.Ignored
+
+    withMappedInput("ala ma kota żółw"): input =>
+      Lexer.tokenize(input).lexemes.map(_.value) shouldBe List("ala", "ma", "kota", "żółw")
+  }
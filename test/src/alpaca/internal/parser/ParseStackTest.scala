@@ -0,0 +1,67 @@
+package alpaca
+package internal.parser
+
+import org.scalatest.funsuite.AnyFunSuite
+import org.scalatest.matchers.should.Matchers
+
+final class ParseStackTest extends AnyFunSuite with Matchers:
+
+  test("starts with the initial state and addresses entries by depth") {
+    val stack = ParseStack()
+    stack.state shouldBe 0
+
+    stack.push(3, "a")
+    stack.push(7, 42)
+
+    stack.state shouldBe 7
+    stack.state(1) shouldBe 3
+    stack.state(2) shouldBe 0
+    stack.value(0) shouldBe 42
+    stack.value(1) shouldBe "a"
+  }
+
+  test("top entries are read in place, bottom first, from the value array") {
+    val stack = ParseStack()
+    stack.push(1, "x")
+    stack.push(2, "y")
+    stack.push(3, "z")
+
+    val base = stack.base(2)
+    stack.valueArray(base) shouldBe "y"
+    stack.valueArray(base + 1) shouldBe "z"
+  }
+
+  test("grows past the initial capacity and pops back") {
+    val stack = ParseStack()
+    for i <- 1 to 1000 do stack.push(i, i.toString)
+
+    stack.state shouldBe 1000
+    stack.value(999) shouldBe "1"
+
+    stack.pop(990)
+    stack.state shouldBe 10
+    stack.value(0) shouldBe "10"
+  }
+
+  test("reset keeps only the initial state") {
+    val stack = ParseStack()
+    stack.push(5, "x")
+    stack.reset()
+
+    stack.state shouldBe 0
+    stack.push(2, "y")
+    stack.state(1) shouldBe 0
+  }
+
+  test("restores and matches snapshots") {
+    val stack = ParseStack()
+    stack.push(1, "x")
+    val snapshot = stack.snapshot()
+    stack.push(2, "y")
+
+    stack.matches(snapshot, _ == _) shouldBe false
+    stack.restore(snapshot)
+    stack.matches(snapshot, _ == _) shouldBe true
+    stack.state shouldBe 1
+    stack.value(0) shouldBe "x"
+  }
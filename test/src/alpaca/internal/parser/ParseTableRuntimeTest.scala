@@ -2,6 +2,7 @@ package alpaca
 package internal.parser
 
 import alpaca.internal.parser.ParseAction.*
+import alpaca.internal.lexer.{Lexeme, TokenIds}
 import alpaca.internal.{AlgorithmError, DebugSettings, Log, NEL}
 import org.scalatest.funsuite.AnyFunSuite
 import org.scalatest.matchers.should.Matchers
@@ -40,6 +41,46 @@ final class ParseTableRuntimeTest extends AnyFunSuite with Matchers:
     ex.getMessage should (include("Unexpected symbol").and(include("Expected one of:")))
   }
 
+  test("lexemes are looked up by the id of their token name") {
+    val table = ParseTable(productions, emptyResolutions)
+    val num = new Lexeme("Num", 1, "1", Array.empty, Array.empty)
+
+    num.id shouldBe TokenIds.of("Num")
+    Lexeme.EOF.id shouldBe TokenIds.EOF
+    table(0, Num) shouldBe Shift(table.action(0, num))
+
+    val ex = intercept[AlgorithmError](table.action(0, Lexeme.EOF))
+    ex.getMessage should include("Unexpected symbol '$'")
+  }
+
+  test("packed table shares duplicate rows and answers like the rows it was built from") {
+    val reduceNum = Reduction(productions(2))
+    val rows: Array[Map[Symbol, ParseAction]] = Array(
+      Map(Num -> Shift(2), E -> Shift(1)),
+      Map(Plus -> Shift(3), Symbol.EOF -> Reduction(productions(0))),
+      Map(Plus -> reduceNum, Symbol.EOF -> reduceNum),
+      Map(Num -> Shift(4)),
+      Map(Plus -> reduceNum, Symbol.EOF -> reduceNum),
+    )
+    val table = ParseTable.packed(rows, productions.toArray)
+
+    table.stateCount shouldBe rows.length
+    for
+      state <- rows.indices
+      symbol <- List[Symbol](Num, Plus, E, Symbol.EOF)
+    do
+      rows(state).get(symbol) match
+        case Some(action) => table(state, symbol) shouldBe action
+        case None => intercept[AlgorithmError](table(state, symbol))
+
+    val reduction = table.action(2, Lexeme.EOF)
+    reduction should be < 0
+    table.production(~reduction) shouldBe productions(2)
+    table.goto(0, ~reduction) shouldBe 1
+    table.arity(~reduction) shouldBe 1
+    table.startProduction shouldBe 0
+  }
+
   test("toCsv headers start with State and include all grammar symbols seen in the table") {
     val csv = ParseTable(productions, emptyResolutions).toCsv
 